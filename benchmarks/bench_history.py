@@ -0,0 +1,88 @@
+"""
+历史记录后端基准测试
+对比原有 dict+JSON 方案与 SQLite / 追加日志 / 按天分片后端在 10^5 ~ 10^6 条记录下的表现
+
+用法：python benchmarks/bench_history.py [--sizes 100000 1000000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import BACKENDS, open_history_backend, backend_path, storage_size, JsonHistoryBackend
+
+DAY = 24 * 3600
+
+
+def make_history(size, now):
+    """生成 size 条记录，seen_at 均匀分布在过去 15 天，14 天 TTL 下约有一天的量过期"""
+    data = {}
+    for i in range(size):
+        key = f"BV{i:010d}" if i % 4 else f"yt:{i:011d}"
+        data[key] = int(now - random.random() * 15 * DAY)
+    return data
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench_backend(backend, json_path, data, now):
+    # 准备：先用 json 写出原始数据，非 json 后端首次打开时迁移
+    seed = JsonHistoryBackend(json_path)
+    seed.data = dict(data)
+    seed.flush()
+    store, _ = timed(lambda: open_history_backend(backend, json_path))
+    store.close()
+
+    # 1. 冷启动打开
+    store, open_ms = timed(lambda: open_history_backend(backend, json_path))
+
+    # 2. 成员检查：一半命中一半不命中
+    keys = random.sample(list(data), 5000) + [f"BVmiss{i}" for i in range(5000)]
+    _, lookup_ms = timed(lambda: sum(1 for k in keys if k in store))
+
+    # 3. 批量插入一次运行的新增量
+    new_items = {f"BVnew{i:06d}": int(now) for i in range(1000)}
+    _, insert_ms = timed(lambda: (store.add_many(new_items), store.flush()))
+
+    # 4. TTL 过期 + 落盘（相当于 HistoryManager.commit）
+    removed, expire_ms = timed(lambda: (store.expire(now - 14 * DAY), store.flush())[0])
+    store.close()
+
+    size_mb = storage_size(backend_path(json_path, backend)) / 1024 / 1024
+    return {
+        'open': open_ms,
+        'lookup_10k': lookup_ms,
+        'insert_1k': insert_ms,
+        'expire': expire_ms,
+        'removed': removed,
+        'size_mb': size_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史记录后端基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    now = time.time()
+    print(f"{'条数':>9} {'后端':<7} {'打开(ms)':>10} {'查询1万(ms)':>12} {'插入1千(ms)':>12} {'过期+落盘(ms)':>14} {'删除条数':>9} {'文件(MB)':>9}")
+    for size in args.sizes:
+        data = make_history(size, now)
+        for backend in BACKENDS:
+            with tempfile.TemporaryDirectory() as tmp:
+                r = bench_backend(backend, os.path.join(tmp, 'history.json'), data, now)
+            print(f"{size:>9} {backend:<7} {r['open']:>10.1f} {r['lookup_10k']:>12.1f} {r['insert_1k']:>12.1f} "
+                  f"{r['expire']:>14.1f} {r['removed']:>9} {r['size_mb']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+历史记录文件格式基准测试
+对比原有 history.json（indent=2、按插入顺序）与按天分片格式（纯文本 / zstd）：
+- 文件大小、冷启动载入耗时
+- 提交到 git 的代价：模拟连续 N 天每天运行一次（新增一天的记录 + 过期清理）并提交，
+  统计每次提交改动的文件数、行数和新写入的文件大小，以及 git gc 后仓库 (.git) 的大小
+
+用法：python benchmarks/bench_history_format.py [--size 100000] [--days 14]
+zstd 需要安装 zstandard，未安装时跳过
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import open_history_backend, backend_path, storage_size, JsonHistoryBackend, DAY
+
+TTL_DAYS = 14
+
+
+def make_history(size, now):
+    """size 条记录均匀分布在过去 TTL_DAYS 天，返回 (历史记录, 每天新增条数)"""
+    data = {}
+    for i in range(size):
+        key = f"BV{i:010d}" if i % 4 else f"yt:{i:011d}"
+        data[key] = int(now - random.random() * TTL_DAYS * DAY)
+    return data, size // TTL_DAYS
+
+
+def git(repo, *args):
+    return subprocess.run(['git', '-C', repo, *args], check=True, capture_output=True, text=True).stdout
+
+
+def git_commit(repo, path):
+    """提交 path 的变化，返回 (改动文件数, 新增 + 删除行数, 改动后的文件字节数)"""
+    git(repo, 'add', '-A', path)
+    files = lines = written = 0
+    for line in git(repo, 'diff', '--cached', '--numstat').splitlines():
+        added, deleted, name = line.split('\t', 2)
+        files += 1
+        if added != '-':  # 二进制文件（zstd 分片）没有行数
+            lines += int(added) + int(deleted)
+        if os.path.exists(os.path.join(repo, name)):
+            written += os.path.getsize(os.path.join(repo, name))
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'update history record')
+    return files, lines, written
+
+
+def dir_size(path):
+    total = 0
+    for root, _, names in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+    return total
+
+
+def bench_format(repo, backend, compress, data, per_day, days, now):
+    json_path = os.path.join(repo, 'history.json')
+    seed = JsonHistoryBackend(json_path)
+    seed.data = dict(data)
+    seed.flush()
+    if backend != 'json':
+        open_history_backend(backend, json_path, compress=compress).close()
+        os.remove(json_path)
+    path = backend_path(json_path, backend)
+    git(repo, 'init', '-q')
+    git(repo, 'config', 'user.email', 'bench@example.com')
+    git(repo, 'config', 'user.name', 'bench')
+    git_commit(repo, os.path.basename(path))
+
+    start = time.perf_counter()
+    store = open_history_backend(backend, json_path, compress=compress)
+    load_ms = (time.perf_counter() - start) * 1000
+    size = storage_size(path)
+    store.close()
+
+    # 每天一次运行：新增一天的记录（同一时刻提交），清理过期记录，落盘后提交
+    rng = random.Random(42)  # 各格式新增相同的记录
+    files = lines = written = 0
+    for day in range(1, days + 1):
+        store = open_history_backend(backend, json_path, compress=compress)
+        run_at = int(now + day * DAY)
+        store.add_many({f"BV{rng.getrandbits(50):010x}": run_at for _ in range(per_day)})
+        store.expire(run_at - TTL_DAYS * DAY)
+        store.flush()
+        store.close()
+        f, l, w = git_commit(repo, os.path.basename(path))
+        files += f
+        lines += l
+        written += w
+    git(repo, 'gc', '-q', '--aggressive')
+    return {
+        'size_mb': size / 1024 / 1024,
+        'load_ms': load_ms,
+        'files': files / days,
+        'lines': lines / days,
+        'written_kb': written / days / 1024,
+        'repo_mb': dir_size(os.path.join(repo, '.git')) / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史记录文件格式基准测试")
+    parser.add_argument('--size', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=14, help="模拟的每日运行次数")
+    args = parser.parse_args()
+
+    formats = [('json', 'json', False), ('shards', 'shards', False)]
+    try:
+        import zstandard  # noqa: F401
+        formats.append(('shards+zstd', 'shards', True))
+    except ImportError:
+        print("未安装 zstandard，跳过 shards+zstd\n")
+
+    now = time.time()
+    data, per_day = make_history(args.size, now)
+    print(f"历史记录 {args.size} 条，每天新增 {per_day} 条，模拟 {args.days} 天（每天提交一次）")
+    print(f"{'格式':<12} {'文件(MB)':>9} {'载入(ms)':>9} {'每次提交改动文件':>16} {'改动行':>8} {'改动文件大小(KB)':>16} {'gc后仓库(MB)':>13}")
+    for name, backend, compress in formats:
+        with tempfile.TemporaryDirectory() as repo:
+            r = bench_format(repo, backend, compress, data, per_day, args.days, now)
+        print(f"{name:<12} {r['size_mb']:>9.2f} {r['load_ms']:>9.1f} {r['files']:>16.1f} "
+              f"{r['lines']:>8.0f} {r['written_kb']:>16.0f} {r['repo_mb']:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
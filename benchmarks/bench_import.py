@@ -0,0 +1,86 @@
+"""
+启动耗时基准测试
+用 python -X importtime 多次冷启动导入 main（以及 test_local），解析导入耗时：
+- 导入 main 的总耗时（取多次运行的中位数 / 最小值）
+- 自身耗时最高的模块
+- 较重的可选模块（平台 SDK、aiohttp、smtplib、sqlite3 等）是否在导入时就被加载
+
+用法：python benchmarks/bench_import.py [--runs 10] [--modules main test_local] [--top 15]
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 只应在用到对应功能时才加载的模块
+HEAVY_MODULES = (
+    'bilibili_api',
+    'googleapiclient',
+    'httplib2',
+    'aiohttp',
+    'youtube_feed',
+    'smtplib',
+    'email.mime.multipart',
+    'sqlite3',
+    'shard_queue',
+    'statistics',
+)
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 的输出，返回 [(模块名, 自身微秒, 累计微秒, 嵌套层级), ...]"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        # 模块名前的缩进表示嵌套层级：顶层 1 个空格，每深一层多 2 个
+        level = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        records.append((name.strip(), int(self_us), int(cumulative_us), level))
+    return records
+
+
+def measure(module, runs):
+    """冷启动导入 module runs 次，返回 (每次的累计微秒, 最后一次的解析结果)"""
+    totals = []
+    records = []
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='')
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                              cwd=ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise SystemExit(f"导入 {module} 失败：\n{proc.stderr[-2000:]}")
+        records = parse_importtime(proc.stderr)
+        totals.append(sum(cumulative for _, _, cumulative, level in records if level == 0))
+    return totals, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--modules', nargs='+', default=['main', 'test_local'])
+    parser.add_argument('--top', type=int, default=15, help="列出自身耗时最高的模块数")
+    args = parser.parse_args()
+
+    # 先导入一次，确保 __pycache__ 已生成，之后测的是不含编译的冷启动
+    subprocess.run([sys.executable, '-c', f"import {', '.join(args.modules)}"], cwd=ROOT, capture_output=True)
+
+    for module in args.modules:
+        totals, records = measure(module, args.runs)
+        print(f"import {module}: 中位数 {statistics.median(totals) / 1000:.1f} ms，"
+              f"最小 {min(totals) / 1000:.1f} ms（{args.runs} 次，共导入 {len(records)} 个模块）")
+        print(f"  自身耗时最高的 {args.top} 个模块:")
+        for name, self_us, cumulative_us, _ in sorted(records, key=lambda r: r[1], reverse=True)[:args.top]:
+            print(f"    {self_us / 1000:7.2f} ms（累计 {cumulative_us / 1000:7.2f} ms）  {name}")
+        loaded = {name for name, _, _, _ in records}
+        eager = [name for name in HEAVY_MODULES if name in loaded]
+        print(f"  导入时加载的重模块: {', '.join(eager) if eager else '无'}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+视频记录内存基准测试
+模拟抓取 N 个视频（一半 B站、一半 YouTube，按页解析 JSON），对比一直持有的内存：
+- 原实现：B站保留完整的 vlist 条目字典，YouTube 为手工构建的 7 个字段的字典
+- VideoRecord：在抓取层转换成 __slots__ 记录，原始数据随页释放
+
+用法：python benchmarks/bench_records.py [--count 100000] [--page-size 30]
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_record import VideoRecord, parse_published
+
+
+def bilibili_page(rng, uid, page, size, now):
+    """结构与 B站 get_videos 返回的 list.vlist 条目一致"""
+    vlist = []
+    for i in range(size):
+        vlist.append({
+            'comment': rng.randrange(1000), 'typeid': 201, 'play': rng.randrange(10 ** 6),
+            'pic': f"http://i0.hdslb.com/bfs/archive/{rng.getrandbits(160):040x}.jpg",
+            'subtitle': '', 'description': "简介" * rng.randint(0, 60), 'copyright': '1',
+            'title': f"第{page}-{i}期 AIGC 大模型实战", 'review': 0, 'author': f"UP主{uid}",
+            'mid': uid, 'created': now - rng.randrange(7 * 86400), 'length': '12:34',
+            'video_review': rng.randrange(100), 'aid': rng.getrandbits(40), 'bvid': f"BV{rng.getrandbits(50):013x}",
+            'hide_click': False, 'is_pay': 0, 'is_union_video': 0, 'is_steins_gate': 0, 'is_live_playback': 0,
+            'meta': None, 'is_avoided': 0, 'attribute': 16793984, 'is_charging_arc': False,
+            'vt': 0, 'enable_vt': 0, 'vt_display': '', 'playback_position': 0,
+        })
+    return json.dumps({'list': {'vlist': vlist}}, ensure_ascii=False)
+
+
+def youtube_page(rng, channel_id, size, now):
+    """结构与 playlistItems().list 的返回一致"""
+    items = []
+    for i in range(size):
+        items.append({'snippet': {
+            'resourceId': {'videoId': f"{rng.getrandbits(64):011x}"[:11]},
+            'title': f"Episode {i}: building with LLMs", 'description': "Description " * rng.randint(0, 60),
+            'publishedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now - rng.randrange(7 * 86400))),
+        }})
+    return json.dumps({'items': items})
+
+
+def make_pages(count, page_size):
+    rng = random.Random(42)
+    now = int(time.time())
+    pages = []
+    for n in range(0, count, page_size):
+        size = min(page_size, count - n)
+        if (n // page_size) % 2 == 0:
+            pages.append(('bilibili', 100000 + n, bilibili_page(rng, 100000 + n, n, size, now)))
+        else:
+            channel_id = f"UC{n:022d}"
+            pages.append(('youtube', channel_id, youtube_page(rng, channel_id, size, now)))
+    return pages
+
+
+def legacy(pages):
+    videos = []
+    for platform, channel, text in pages:
+        payload = json.loads(text)
+        if platform == 'bilibili':
+            videos.extend(payload['list']['vlist'])
+            continue
+        for item in payload['items']:
+            snippet = item['snippet']
+            videos.append({
+                'video_id': snippet['resourceId']['videoId'],
+                'title': snippet['title'],
+                'description': snippet.get('description', ''),
+                'created': parse_published(snippet['publishedAt']),
+                'author': f"Channel {channel}",
+                'platform': 'youtube',
+                'channel_id': channel,
+            })
+    return videos
+
+
+def records(pages):
+    videos = []
+    for platform, channel, text in pages:
+        payload = json.loads(text)
+        if platform == 'bilibili':
+            videos.extend(VideoRecord.from_bilibili(v, channel) for v in payload['list']['vlist'])
+            continue
+        for item in payload['items']:
+            snippet = item['snippet']
+            videos.append(VideoRecord.from_youtube(
+                snippet['resourceId']['videoId'], channel, f"Channel {channel}",
+                snippet['title'], snippet.get('description', ''), snippet['publishedAt'],
+            ))
+    return videos
+
+
+def measure(fn, pages):
+    """返回 (耗时秒, 结果持有的字节数, 峰值字节数, 视频数)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(pages)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, peak, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="视频记录内存基准测试")
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=30)
+    args = parser.parse_args()
+
+    pages = make_pages(args.count, args.page_size)
+    print(f"视频 {args.count} 条（B站 / YouTube 各半，每页 {args.page_size} 条）")
+    for name, fn in (("原实现（原始字典）", legacy), ("VideoRecord", records)):
+        elapsed, current, peak, count = measure(fn, pages)
+        print(f"{name}: 持有 {current / 1024 / 1024:.1f} MB（每条 {current / count:.0f} 字节），"
+              f"峰值 {peak / 1024 / 1024:.1f} MB，解析 + 转换 {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
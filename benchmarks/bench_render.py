@@ -0,0 +1,88 @@
+"""
+通知邮件渲染基准测试
+对比原有的 msg += f"<li>..." 拼接（全部列出、不转义）与 DigestRenderer（HTML + 纯文本、分组、截断）
+
+用法：python benchmarks/bench_render.py [--items 10000] [--authors 200]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from digest_renderer import DigestRenderer
+from video_record import VideoRecord
+
+
+def make_videos(rng, count, authors):
+    now = int(time.time())
+    videos = []
+    for i in range(count):
+        author = f"UP主<{rng.randrange(authors)}>"
+        title = f"第{i}期 AIGC & \"大模型\" <实战> " + "测试" * rng.randint(0, 40)
+        created = now - rng.randrange(7 * 86400)
+        if rng.random() < 0.5:
+            videos.append(VideoRecord(f"BV{i:010d}", 'bilibili', 1, author, title, '', created, ('AIGC',)))
+        else:
+            videos.append(VideoRecord(f"yt{i:09d}", 'youtube', 'UC', author, title, '', created))
+    return videos
+
+
+def legacy_render(videos):
+    """原 main() 中的实现（字段访问改为 VideoRecord 属性）"""
+    videos = sorted(videos, key=lambda x: x.created, reverse=True)
+    msg = "<ul>"
+    for v in videos:
+        time_str = time.strftime("%m-%d", time.localtime(v.created))
+        if v.platform == 'youtube':
+            video_url = f"https://www.youtube.com/watch?v={v.id}"
+            platform_tag = "[YouTube]"
+        else:
+            video_url = f"https://www.bilibili.com/video/{v.id}"
+            platform_tag = "[B站]"
+        keywords_tag = f" <small>({', '.join(v.matched_keywords)})</small>" if v.matched_keywords else ""
+        msg += f"<li style='margin-bottom:8px'>[{time_str}] {platform_tag} <b>{v.author}</b>: <a href='{video_url}'>{v.title}</a>{keywords_tag}</li>"
+    msg += "</ul>"
+    return msg
+
+
+def timed(fn, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通知邮件渲染基准测试")
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--authors', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    videos = make_videos(rng, args.items, args.authors)
+
+    legacy_s, legacy_html = timed(legacy_render, videos)
+    print(f"视频 {len(videos)} 条，作者 {args.authors} 个")
+    print(f"原实现（全部列出，仅 HTML）: {legacy_s * 1000:.1f} ms，{len(legacy_html.encode('utf-8')) / 1024:.0f} KB")
+
+    for max_items in (300, 1000, args.items):
+        renderer = DigestRenderer(max_items=max_items, max_per_author=max_items)
+        render_s, digest = timed(renderer.render, videos)
+        size = len(digest.html.encode('utf-8')) + len(digest.text.encode('utf-8'))
+        print(f"DigestRenderer（最多 {max_items} 条，HTML + 纯文本）: {render_s * 1000:.1f} ms，{size / 1024:.0f} KB")
+
+    # 线性：数据量翻倍时耗时大致翻倍
+    renderer = DigestRenderer()
+    for n in (args.items // 4, args.items // 2, args.items):
+        render_s, _ = timed(renderer.render, videos[:n])
+        print(f"  默认上限，输入 {n} 条: {render_s * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+离线回放基准测试
+用 replay.py 录制（或合成）的夹具回放 main()，注入延迟、错误和 -352 风控风暴，
+测量监控 10 / 100 / 1k / 10k 个UP主/频道时整次运行的耗时分布和吞吐量。
+
+用法：
+    python replay.py synth --fixtures fixtures            # 或 python replay.py record
+    python benchmarks/bench_replay.py --fixtures fixtures [--sizes 10 100 1000 10000] [--runs 5]
+        [--latency 0.05] [--jitter 0.5] [--error-rate 0.01] [--storm-rate 0.001] [--storm-duration 2]
+        [--rate-scale 100]
+
+--rate-scale 按倍数放宽各平台限流器的速率（真实限流下 10k 个UP主要跑一个小时，测的只是限流本身）
+"""
+
+import os
+import io
+import sys
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main as app
+from replay import FixtureStore, FaultProfile, install_replayer
+
+
+BASE_RATE_LIMIT_CONFIG = dict(app.RATE_LIMIT_CONFIG)
+
+
+def percentile(values, pct):
+    """最近秩法"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def reset_state():
+    """每次运行使用全新的状态（在临时目录中）"""
+    app.memory = app.HistoryManager()
+    app.cursors = app.CursorStore()
+    app.channel_cache = app.ChannelMetaCache()
+    app.channel_health = app.ChannelHealth(app.CHANNEL_HEALTH_FILE)  # 注入的错误不能跨运行触发熔断
+    app.response_cache = app.ResponseCache(app.RESPONSE_CACHE_DIR, ttls=app.RESPONSE_CACHE_TTL,
+                                           max_bytes=app.RESPONSE_CACHE_MAX_BYTES)
+    app.youtube_quota = app.QuotaBudget(daily_limit=10 ** 9)
+    app.metrics = app.RunMetrics()
+    app._notifier = None
+
+
+def configure(replayer, size, youtube_share, rate_scale):
+    youtube_count = int(size * youtube_share)
+    uids = replayer.synthetic_uids(size - youtube_count) if replayer.bilibili else []
+    channels = replayer.synthetic_channels(youtube_count) if (replayer.feeds or replayer.channels) else []
+    app.TARGET_UIDS = uids
+    app.YOUTUBE_CHANNELS = {cid: cid for cid in channels}
+    app.RATE_LIMIT_CONFIG = {
+        platform: dict(params,
+                       initial_rate=params['initial_rate'] * rate_scale,
+                       max_rate=params['max_rate'] * rate_scale,
+                       max_concurrency=max(params['max_concurrency'], int(params['max_concurrency'] * rate_scale ** 0.5)))
+        for platform, params in BASE_RATE_LIMIT_CONFIG.items()
+    }
+    return len(uids) + len(channels)
+
+
+def run_once():
+    buffer = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(buffer):
+        asyncio.run(app.main())
+    return time.perf_counter() - start, app.metrics.totals()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线回放基准测试")
+    parser.add_argument('--fixtures', default='fixtures')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--youtube-share', type=float, default=0.3, help="YouTube 频道占比")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--storm-rate', type=float, default=0.0)
+    parser.add_argument('--storm-duration', type=float, default=2.0)
+    parser.add_argument('--rate-scale', type=float, default=100.0)
+    args = parser.parse_args()
+
+    fixtures = os.path.abspath(args.fixtures)
+    store = FixtureStore(fixtures)
+    if not store.names('bilibili') and not store.names('youtube_feed'):
+        sys.exit(f"夹具目录 {fixtures} 为空，请先运行 python replay.py record 或 python replay.py synth")
+
+    os.environ.setdefault("GMAIL_SENDER", "bench@example.com")
+    os.environ.setdefault("GMAIL_APP_PASSWORD", "bench")
+    os.environ.setdefault("GMAIL_RECIPIENT", "bench@example.com")
+
+    print(f"延迟 {args.latency * 1000:.0f}ms ±{args.jitter * 100:.0f}%，错误率 {args.error_rate:.2%}，"
+          f"风控风暴概率 {args.storm_rate:.3%}（每次 {args.storm_duration}s），限流放宽 {args.rate_scale:g} 倍\n")
+    print(f"{'频道数':>8} {'p50(s)':>9} {'p99(s)':>9} {'频道/秒':>9} {'请求':>8} {'重试':>6} {'风控':>6} {'失败':>6}")
+    cwd = os.getcwd()
+    for size in args.sizes:
+        durations = []
+        totals = None
+        for run in range(args.runs):
+            faults = FaultProfile(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                  storm_rate=args.storm_rate, storm_duration=args.storm_duration, seed=run)
+            with tempfile.TemporaryDirectory() as tmp:
+                os.chdir(tmp)
+                try:
+                    replayer = install_replayer(app, store, faults)
+                    channels = configure(replayer, size, args.youtube_share, args.rate_scale)
+                    reset_state()
+                    seconds, totals = run_once()
+                finally:
+                    os.chdir(cwd)
+            durations.append(seconds)
+        p50 = percentile(durations, 50)
+        print(f"{channels:>8} {p50:>9.2f} {percentile(durations, 99):>9.2f} {channels / p50:>9.0f} "
+              f"{totals['requests']:>8} {totals['retries']:>6} {totals['throttled']:>6} {totals['failures']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+B站动态时间线抓取
+用一个关注了所有被监控UP主的账号（Cookie 中的 SESSDATA）读取"动态 - 视频"时间线：
+时间线按发布时间倒序汇总所有关注的UP主的投稿，翻几页就能覆盖整个时间窗口，
+请求数与UP主数量无关，不再每个UP主调用一次投稿列表接口（这是触发 -352 风控的主要原因）。
+
+- 关注列表 (x/relation/followings) 决定哪些UP主由时间线覆盖，结果按账号缓存，有效期内不重新查询
+- 时间线 (x/polymer/web-dynamic/v1/feed/all?type=video) 按 offset 翻页，翻到时间窗口起点为止
+- 共用一个 aiohttp 会话；请求节奏由自适应限流器控制，-352 / -412 时降速重试
+"""
+
+import json
+import contextlib
+
+import aiohttp
+
+from video_record import VideoRecord
+
+NAV_URL = "https://api.bilibili.com/x/web-interface/nav"
+FOLLOWINGS_URL = "https://api.bilibili.com/x/relation/followings"
+FEED_URL = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/all"
+FOLLOWINGS_PAGE_SIZE = 50
+HEADERS = {
+    'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/124.0 Safari/537.36",
+    'Referer': "https://t.bilibili.com/",
+}
+THROTTLE_CODES = (-352, -412)
+
+
+class FeedError(Exception):
+    """接口返回错误（未登录、风控重试用尽等）"""
+
+
+def parse_item(item):
+    """时间线中的一条动态 -> VideoRecord；不是视频投稿（转发、图文等）时返回 None"""
+    modules = item.get('modules') or {}
+    author = modules.get('module_author') or {}
+    major = (modules.get('module_dynamic') or {}).get('major') or {}
+    archive = major.get('archive')
+    if not archive or not archive.get('bvid') or not author.get('mid'):
+        return None
+    return VideoRecord(archive['bvid'], 'bilibili', int(author['mid']), author.get('name'),
+                       archive.get('title'), archive.get('desc'), author.get('pub_ts') or 0)
+
+
+class BilibiliDynamicFeed:
+    """基于动态时间线的B站抓取器，用作 async with 上下文管理共享会话"""
+
+    def __init__(self, sessdata, limiter, cache, max_pages=20, retry_count=3, timeout=20, metrics=None):
+        self.sessdata = sessdata
+        self.limiter = limiter
+        self.cache = cache
+        self.max_pages = max_pages
+        self.retry_count = retry_count
+        self.timeout = timeout
+        self.metrics = metrics
+        self.session = None
+        self.downloaded_bytes = 0
+        self.requests = 0
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            headers=HEADERS,
+            cookies={'SESSDATA': self.sessdata},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        return False
+
+    def _inc(self, field, value=1):
+        if self.metrics is not None:
+            self.metrics.inc('bilibili', 'dynamic_feed', field, value)
+
+    def _request_timer(self):
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.request('bilibili', 'dynamic_feed')
+
+    async def _get(self, url, params=None):
+        """GET 一个接口，返回 data 字段；风控时降速重试，其他错误抛出 FeedError"""
+        for attempt in range(self.retry_count):
+            if attempt:
+                self._inc('retries')
+            async with self.limiter:
+                with self._request_timer():
+                    async with self.session.get(url, params=params) as resp:
+                        resp.raise_for_status()
+                        body = await resp.read()
+            self.requests += 1
+            self.downloaded_bytes += len(body)
+            self._inc('bytes', len(body))
+            payload = json.loads(body)
+            code = payload.get('code')
+            if code in THROTTLE_CODES:
+                self._inc('throttled')
+                self.limiter.on_throttle()
+                print(f"⚠️  B站动态接口触发风控 ({code})，降速后重试... (尝试 {attempt + 1}/{self.retry_count})")
+                continue
+            if code != 0:
+                raise FeedError(f"{url} 返回 {code}: {payload.get('message')}")
+            self.limiter.on_success()
+            return payload.get('data') or {}
+        raise FeedError(f"{url} 风控重试 {self.retry_count} 次仍失败")
+
+    async def followings(self):
+        """登录账号关注的UP主 UID 集合；缓存有效期内不发请求"""
+        key = self.cache.make_key('bilibili_follow', self.sessdata)
+        cached = self.cache.get_fresh('bilibili_follow', key)
+        if cached is not None:
+            self._inc('cache_hits')
+            return set(cached)
+        nav = await self._get(NAV_URL)
+        if not nav.get('isLogin'):
+            raise FeedError("SESSDATA 无效或已过期，请重新登录后更新 BILIBILI_SESSDATA")
+        mid = nav['mid']
+        mids = []
+        pn = 1
+        while True:
+            data = await self._get(FOLLOWINGS_URL, {'vmid': mid, 'pn': pn, 'ps': FOLLOWINGS_PAGE_SIZE, 'order': 'desc'})
+            page = data.get('list') or []
+            mids.extend(int(u['mid']) for u in page)
+            if len(page) < FOLLOWINGS_PAGE_SIZE or len(mids) >= data.get('total', 0):
+                break
+            pn += 1
+        self.cache.store('bilibili_follow', key, mids, len(json.dumps(mids)))
+        return set(mids)
+
+    async def timeline(self, since):
+        """时间线上发布时间不早于 since 的视频，返回 (VideoRecord 列表, 是否完整覆盖到 since)
+
+        达到翻页上限仍没翻到 since 时返回 False，调用方应回退到逐个UP主抓取，避免漏掉中间的视频。
+        """
+        videos = []
+        offset = ''
+        for page in range(1, self.max_pages + 1):
+            params = {'type': 'video', 'page': page, 'timezone_offset': -480}
+            if offset:
+                params['offset'] = offset
+            data = await self._get(FEED_URL, params)
+            for item in data.get('items') or []:
+                video = parse_item(item)
+                if video is None:
+                    continue
+                if video.created < since:
+                    return videos, True
+                videos.append(video)
+            offset = data.get('offset')
+            if not data.get('has_more') or not offset:
+                return videos, True
+        return videos, False
@@ -0,0 +1,162 @@
+"""
+历史记录 Bloom 过滤器
+放在精确存储（history_store 后端）前面：过滤器说"不存在"的视频一定是新视频，
+不需要载入完整历史；只有过滤器说"可能存在"时才去查精确存储。
+
+过滤器按天分桶（每天一个内存映射文件），与 HISTORY_DAYS 对齐轮换：
+整天都已过期的桶直接删除文件，无需从 Bloom 过滤器里"删除"元素。
+"""
+
+import os
+import json
+import math
+import mmap
+import time
+import struct
+import hashlib
+import datetime
+
+_HEADER = struct.Struct('<8sQII')  # magic, 位数 m, 哈希个数 k, 已添加条数
+_MAGIC = b'UPBLOOM1'
+DAY = 24 * 3600
+
+
+def optimal_params(capacity, fp_rate):
+    """根据容量和误判率计算位数 m 与哈希个数 k"""
+    m = max(8, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+    k = max(1, int(round(m / capacity * math.log(2))))
+    return m, k
+
+
+class BloomFilter:
+    """单个内存映射的 Bloom 过滤器文件"""
+
+    def __init__(self, file_path, capacity=10000, fp_rate=0.01):
+        self.file_path = file_path
+        if not os.path.exists(file_path):
+            m, k = optimal_params(capacity, fp_rate)
+            with open(file_path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, m, k, 0))
+                f.truncate(_HEADER.size + (m + 7) // 8)
+        self._file = open(file_path, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, self.m, self.k, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"不是有效的 Bloom 过滤器文件: {file_path}")
+        self.capacity = capacity
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, key):
+        mm = self._mm
+        offset = _HEADER.size
+        for pos in self._positions(key):
+            idx = offset + (pos >> 3)
+            mm[idx] = mm[idx] | (1 << (pos & 7))
+        self.count += 1
+
+    def __contains__(self, key):
+        mm = self._mm
+        offset = _HEADER.size
+        for pos in self._positions(key):
+            if not mm[offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def flush(self):
+        _HEADER.pack_into(self._mm, 0, _MAGIC, self.m, self.k, self.count)
+        self._mm.flush()
+
+    def close(self):
+        if self._mm is not None:
+            self.flush()
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+
+class RotatingBloomFilter:
+    """按天分桶的 Bloom 过滤器
+
+    - 目录下每天一个文件：YYYYMMDD.bloom（按 seen_at 的 UTC 日期分桶）
+    - 查询时任一桶命中即视为"可能存在"，因此每个桶的误判率取 fp_rate / 桶数
+    - rotate() 删除整天都已超出保留期的桶
+    - meta.json 记录与之同步的精确存储文件大小，不一致时由调用方重建
+    """
+
+    def __init__(self, directory, days=14, capacity_per_day=10000, fp_rate=0.01):
+        self.directory = directory
+        self.days = days
+        self.capacity_per_day = capacity_per_day
+        # 保留期内最多 days + 1 个桶（首尾两天各占一部分）
+        self.bucket_fp_rate = fp_rate / (days + 1)
+        self.buckets = {}
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.bloom'):
+                day = name[:-len('.bloom')]
+                self.buckets[day] = BloomFilter(os.path.join(directory, name))
+
+    @staticmethod
+    def _day(ts):
+        return datetime.datetime.utcfromtimestamp(ts).strftime('%Y%m%d')
+
+    def _bucket(self, day):
+        if day not in self.buckets:
+            path = os.path.join(self.directory, f"{day}.bloom")
+            self.buckets[day] = BloomFilter(path, self.capacity_per_day, self.bucket_fp_rate)
+        return self.buckets[day]
+
+    def add(self, key, seen_at=None):
+        bucket = self._bucket(self._day(seen_at if seen_at is not None else time.time()))
+        bucket.add(key)
+        if bucket.count == bucket.capacity + 1:
+            print(f"⚠️  Bloom 过滤器 {bucket.file_path} 超出容量 {bucket.capacity}，误判率将上升")
+
+    def might_contain(self, key):
+        return any(key in bucket for bucket in self.buckets.values())
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def rotate(self, expire_time):
+        """删除所有记录都早于 expire_time 的桶，返回删除的桶数"""
+        removed = 0
+        for day in list(self.buckets):
+            day_start = datetime.datetime.strptime(day, '%Y%m%d').replace(tzinfo=datetime.timezone.utc).timestamp()
+            if day_start + DAY <= expire_time:
+                bucket = self.buckets.pop(day)
+                bucket.close()
+                os.remove(bucket.file_path)
+                removed += 1
+        return removed
+
+    def clear(self):
+        self.rotate(float('inf'))
+
+    def read_meta(self):
+        path = os.path.join(self.directory, 'meta.json')
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    def write_meta(self, meta):
+        with open(os.path.join(self.directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, sort_keys=True)
+
+    def flush(self):
+        for bucket in self.buckets.values():
+            bucket.flush()
+
+    def close(self):
+        for bucket in self.buckets.values():
+            bucket.close()
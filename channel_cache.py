@@ -0,0 +1,74 @@
+"""
+频道元数据缓存
+持久化保存UP主/频道的名字、头像、uploads playlist ID 等很少变化的信息，避免每次运行都重新查询。
+
+- 由 query_up_names.py 维护（只重新查询缺失或超过有效期的条目），监控运行时只读，显示名字不需要发请求
+- 文件在第一次读取时才载入
+"""
+
+import os
+import json
+import time
+
+
+class ChannelMetaCache:
+    """频道元数据缓存
+
+    结构：{"bilibili": {"946974": {"name": "...", "avatar": "https://...", "updated_at": 1700000000}},
+           "youtube": {"UCxxxx": {"name": "...", "avatar": "https://...", "uploads_playlist_id": "UUxxxx", "updated_at": 1700000000}}}
+    """
+
+    def __init__(self, file_path="channel_cache.json"):
+        self.file_path = file_path
+        self._data = None
+        self.dirty = False
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._load()
+        return self._data
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    def get(self, platform, channel_id):
+        return self.data.get(platform, {}).get(str(channel_id))
+
+    def name(self, platform, channel_id):
+        """缓存的名字，没有时返回 None"""
+        entry = self.get(platform, channel_id)
+        return entry.get('name') if entry else None
+
+    def missing(self, platform, channel_ids):
+        """返回缓存中没有的频道ID"""
+        cached = self.data.get(platform, {})
+        return [cid for cid in channel_ids if str(cid) not in cached]
+
+    def stale(self, platform, channel_ids, ttl, now=None):
+        """返回缓存中没有、或超过 ttl 秒未刷新的频道ID"""
+        cached = self.data.get(platform, {})
+        deadline = (now if now is not None else time.time()) - ttl
+        return [cid for cid in channel_ids
+                if str(cid) not in cached or cached[str(cid)].get('updated_at', 0) < deadline]
+
+    def put(self, platform, channel_id, **fields):
+        entry = self.data.setdefault(platform, {}).setdefault(str(channel_id), {})
+        entry.update(fields)
+        entry['updated_at'] = int(time.time())
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, self.file_path)
+        self.dirty = False
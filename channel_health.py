@@ -0,0 +1,183 @@
+"""
+频道健康状态与熔断
+为每个UP主/频道记录连续失败次数、最近一次成功时间和错误类别，跨运行保留。
+连续失败达到阈值后熔断：冷却期内直接跳过，不再每次运行都重试、占用限流额度；
+冷却期过后放行一次试探抓取，仍失败则冷却时间翻倍（有上限），成功则恢复正常。
+"""
+
+import os
+import json
+import time
+import datetime
+
+DAY = 24 * 3600
+
+# 错误类别：只有频道本身的问题计入连续失败、触发熔断
+NOT_FOUND = 'not_found'  # 账号/频道不存在、已注销或无法访问
+ERROR = 'error'  # 接口针对该频道返回的其他错误码
+CHANNEL_ERRORS = (NOT_FOUND, ERROR)
+# 以下失败与频道无关（网络、平台、运行环境），只记录错误类别，不计入连续失败：
+# 运行环境断网几个小时不应该让所有频道都熔断
+NETWORK = 'network'  # 超时、连接重置、DNS 解析失败、服务器 5xx 等
+EXCEPTION = 'exception'  # 抓取时抛出未处理的异常
+UNKNOWN = 'unknown'  # 抓取失败但没有报告原因（如插件数据源返回 None）
+THROTTLED = 'throttled'  # 风控重试用尽
+QUOTA = 'quota'  # YouTube 配额耗尽
+CONFIG = 'config'  # 缺少 API Key 等配置
+
+ERROR_LABELS = {
+    NOT_FOUND: "不存在或无法访问",
+    ERROR: "接口错误",
+    NETWORK: "网络错误",
+    EXCEPTION: "异常",
+    UNKNOWN: "未知错误",
+    THROTTLED: "风控",
+    QUOTA: "配额耗尽",
+    CONFIG: "配置缺失",
+}
+
+
+def _format_time(ts):
+    if not ts:
+        return "从未"
+    return datetime.datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d %H:%M UTC')
+
+
+class ChannelHealth:
+    """频道健康状态
+
+    结构：{"bilibili:946974": {"failures": 4, "error": "not_found", "message": "...",
+                               "last_success": 1700000000, "last_failure": 1700100000, "open_until": 1700186400}}
+    - failures: 连续失败次数（只计 CHANNEL_ERRORS 中的错误），成功后清零
+    - open_until: 熔断到什么时候；之后的第一次抓取是试探
+    冷却时间 = base_cooldown × 2^(failures - threshold)，不超过 max_cooldown。
+    """
+
+    def __init__(self, file_path=".cache/channel_health.json", threshold=3, base_cooldown=DAY, max_cooldown=14 * DAY):
+        self.file_path = file_path
+        self.threshold = threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.data = self._load()
+        self.reset_run()
+
+    def reset_run(self):
+        """清空本次运行内的状态（只用于汇总）；常驻模式每轮轮询前调用"""
+        self.errors = {}
+        self.skipped = []
+        self.probed = []
+        self.recovered = []
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    @staticmethod
+    def _key(platform, channel_id):
+        return f"{platform}:{channel_id}"
+
+    def get(self, platform, channel_id):
+        return self.data.get(self._key(platform, channel_id)) or {}
+
+    def is_open(self, platform, channel_id):
+        """是否已熔断（不论冷却期是否已过）"""
+        return self.get(platform, channel_id).get('failures', 0) >= self.threshold
+
+    def partition(self, platform, channel_ids, now=None):
+        """按熔断状态划分频道，返回 (本次抓取的, 冷却期内跳过的)；冷却期已过的作为试探放行"""
+        now = now if now is not None else time.time()
+        allowed, skipped = [], []
+        for channel_id in channel_ids:
+            if not self.is_open(platform, channel_id):
+                allowed.append(channel_id)
+            elif now >= self.get(platform, channel_id).get('open_until', 0):
+                allowed.append(channel_id)
+                self.probed.append((platform, channel_id))
+            else:
+                skipped.append(channel_id)
+        self.skipped.extend((platform, channel_id) for channel_id in skipped)
+        return allowed, skipped
+
+    def note_error(self, platform, channel_id, error, message=None):
+        """抓取函数在失败返回前记下错误类别，由 record_failure() 计入"""
+        self.errors[self._key(platform, channel_id)] = (error, message)
+
+    def take_error(self, platform, channel_id):
+        """取出 note_error() 记下的 (错误类别, 错误信息)，没有时为 (UNKNOWN, None)"""
+        return self.errors.pop(self._key(platform, channel_id), (UNKNOWN, None))
+
+    def record_success(self, platform, channel_id, now=None):
+        key = self._key(platform, channel_id)
+        if self.is_open(platform, channel_id):
+            self.recovered.append((platform, channel_id))
+        self.errors.pop(key, None)
+        self.data[key] = {'failures': 0, 'last_success': int(now if now is not None else time.time())}
+
+    def record_failure(self, platform, channel_id, error=None, message=None, now=None):
+        """记录一次失败；没有传入 error 时用 note_error() 记下的类别，都没有则记为 UNKNOWN"""
+        now = int(now if now is not None else time.time())
+        key = self._key(platform, channel_id)
+        noted_error, noted_message = self.take_error(platform, channel_id)
+        error = error or noted_error
+        entry = self.data.setdefault(key, {'failures': 0, 'last_success': 0})
+        entry['error'] = error
+        entry['message'] = (message or noted_message or '')[:200]
+        entry['last_failure'] = now
+        if error not in CHANNEL_ERRORS:
+            return
+        entry['failures'] = entry.get('failures', 0) + 1
+        if entry['failures'] >= self.threshold:
+            cooldown = self.base_cooldown * 2 ** (entry['failures'] - self.threshold)
+            entry['open_until'] = now + min(cooldown, self.max_cooldown)
+
+    def forget(self, keep):
+        """删除不再监控的频道：keep 为 [(platform, channel_id), ...]"""
+        keep = {self._key(platform, channel_id) for platform, channel_id in keep}
+        for key in [key for key in self.data if key not in keep]:
+            del self.data[key]
+
+    def attention(self):
+        """需要关注的频道（有连续失败的）：[(platform, channel_id, entry), ...]，按连续失败次数从多到少"""
+        items = []
+        for key, entry in self.data.items():
+            if entry.get('failures', 0):
+                platform, channel_id = key.split(':', 1)
+                items.append((platform, channel_id, entry))
+        return sorted(items, key=lambda item: (-item[2].get('failures', 0), item[0], item[1]))
+
+    def report(self, names=None, labels=None):
+        """打印本次的熔断情况和需要关注的频道
+
+        names(platform, channel_id) 返回显示名；labels 为 {platform: 平台显示名}
+        """
+        attention = self.attention()
+        if not (attention or self.skipped or self.probed):
+            return
+        recovered = f"，恢复 {len(self.recovered)} 个" if self.recovered else ""
+        print(f"频道健康：熔断跳过 {len(self.skipped)} 个，试探 {len(self.probed)} 个{recovered}，"
+              f"需要关注 {len(attention)} 个")
+        for platform, channel_id, entry in attention:
+            label = (labels or {}).get(platform, platform)
+            name = f"（{names(platform, channel_id)}）" if names else ""
+            failures = entry.get('failures', 0)
+            if failures >= self.threshold:
+                state = f"熔断中，下次试探 {_format_time(entry.get('open_until'))}"
+            else:
+                state = "未熔断"
+            print(f"   - {label} {channel_id}{name}：连续失败 {failures} 次，"
+                  f"{ERROR_LABELS.get(entry.get('error'), entry.get('error'))}，"
+                  f"上次成功 {_format_time(entry.get('last_success'))}，{state}")
+            if entry.get('message'):
+                print(f"     {entry['message']}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, self.file_path)
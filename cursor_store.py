@@ -0,0 +1,76 @@
+"""
+增量抓取游标
+为每个UP主/频道记录已见过的最新视频（高水位标记），下次抓取到这里即可停止
+"""
+
+import os
+import json
+
+# 每个频道保留最近多少次发布时间，用于估算发布频率
+RECENT_POSTS_LIMIT = 20
+
+
+class CursorStore:
+    """高水位标记存储
+
+    结构：{"bilibili:946974": {"created": 1700000000, "id": "BVxxxx", "posts": [...]}, ...}
+    - created/id: 已见过的最新视频的发布时间和ID
+    - posts: 最近若干次发布时间（新的在前）
+    """
+
+    def __init__(self, file_path="cursors.json"):
+        self.file_path = file_path
+        self.data = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    @staticmethod
+    def _key(platform, channel_id):
+        return f"{platform}:{channel_id}"
+
+    def get(self, platform, channel_id):
+        """返回频道的游标，没有记录时返回 None"""
+        return self.data.get(self._key(platform, channel_id))
+
+    def put(self, platform, channel_id, cursor):
+        """直接设置频道的游标（分片模式下与工作进程交换游标用），cursor 为 None 时删除"""
+        if cursor is None:
+            self.data.pop(self._key(platform, channel_id), None)
+        else:
+            self.data[self._key(platform, channel_id)] = cursor
+
+    def is_seen(self, platform, channel_id, video_id, created):
+        """视频是否不晚于游标（即之前的抓取已经见过）"""
+        cursor = self.get(platform, channel_id)
+        if not cursor:
+            return False
+        return video_id == cursor['id'] or created < cursor['created']
+
+    def advance(self, platform, channel_id, items):
+        """用本次抓到的新视频推进游标
+
+        items: [(created, video_id), ...]，顺序不限
+        """
+        if not items:
+            return
+        key = self._key(platform, channel_id)
+        cursor = self.data.get(key) or {'created': 0, 'id': None, 'posts': []}
+        newest_created, newest_id = max(items)
+        if newest_created >= cursor['created']:
+            cursor['created'] = newest_created
+            cursor['id'] = newest_id
+        posts = set(cursor.get('posts', [])) | {created for created, _ in items}
+        cursor['posts'] = sorted(posts, reverse=True)[:RECENT_POSTS_LIMIT]
+        self.data[key] = cursor
+
+    def save(self):
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        print(f"游标库更新：共 {len(self.data)} 个频道")
@@ -0,0 +1,110 @@
+"""
+常驻模式的调度与汇总
+- PollScheduler: 按每个UP主/频道自己的发布频率安排下一次轮询（发得勤的多看，很久不更新的少看）
+- DigestQueue: 两次汇总邮件之间发现的新视频，持久化到磁盘，重启后不会丢失
+"""
+
+import os
+import json
+import time
+import heapq
+import datetime
+
+from video_record import VideoRecord
+
+
+def poll_interval(posts, min_interval, max_interval, default_interval, divisor=4):
+    """根据最近的发布时间估算轮询间隔
+
+    间隔 = 相邻两次发布的中位间隔 / divisor，限制在 [min_interval, max_interval] 内；
+    记录不足两条时使用 default_interval
+    """
+    if len(posts) < 2:
+        return default_interval
+    ordered = sorted(posts, reverse=True)
+    gaps = [a - b for a, b in zip(ordered, ordered[1:])]
+    import statistics  # 导入较慢，只有常驻模式用到
+    interval = statistics.median(gaps) / divisor
+    return int(min(max(interval, min_interval), max_interval))
+
+
+class PollScheduler:
+    """按频道维护下一次轮询时间（最小堆）
+
+    - posts_lookup(platform, channel_id): 返回该频道最近的发布时间列表
+    - 启动时所有频道立即到期；每次轮询后按最新的发布记录重新计算间隔
+    """
+
+    def __init__(self, channels, posts_lookup, min_interval, max_interval, default_interval, now=None):
+        self.posts_lookup = posts_lookup
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        now = now if now is not None else time.time()
+        self.heap = [(now, platform, channel_id) for platform, channel_id in channels]
+        heapq.heapify(self.heap)
+
+    def interval(self, platform, channel_id):
+        return poll_interval(self.posts_lookup(platform, channel_id),
+                             self.min_interval, self.max_interval, self.default_interval)
+
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now=None):
+        """取出所有已到期的频道，返回 {platform: [channel_id, ...]}"""
+        now = now if now is not None else time.time()
+        due = {}
+        while self.heap and self.heap[0][0] <= now:
+            _, platform, channel_id = heapq.heappop(self.heap)
+            due.setdefault(platform, []).append(channel_id)
+        return due
+
+    def reschedule(self, platform, channel_id, now=None):
+        now = now if now is not None else time.time()
+        heapq.heappush(self.heap, (now + self.interval(platform, channel_id), platform, channel_id))
+
+
+def next_digest_time(after, hour_utc):
+    """after 之后的下一个 UTC hour_utc:00"""
+    dt = datetime.datetime.utcfromtimestamp(after).replace(minute=0, second=0, microsecond=0)
+    dt = dt.replace(hour=hour_utc)
+    ts = (dt - datetime.datetime(1970, 1, 1)).total_seconds()
+    if ts <= after:
+        ts += 24 * 3600
+    return ts
+
+
+class DigestQueue:
+    """待发送的汇总
+
+    结构：{"last_sent": 1700000000, "videos": [VideoRecord.to_dict(), ...]}
+    """
+
+    def __init__(self, file_path="digest_pending.json"):
+        self.file_path = file_path
+        data = self._load()
+        self.videos = [VideoRecord.from_dict(v) for v in data.get('videos', [])]
+        self.last_sent = data.get('last_sent')
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    def extend(self, videos):
+        self.videos.extend(videos)
+
+    def mark_sent(self, ts=None):
+        self.videos = []
+        self.last_sent = int(ts if ts is not None else time.time())
+
+    def save(self):
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'last_sent': self.last_sent, 'videos': [v.to_dict() for v in self.videos]}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.file_path)
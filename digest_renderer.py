@@ -0,0 +1,103 @@
+"""
+通知邮件渲染
+模板在导入时编译一次 (string.Template)，一次遍历同时生成 HTML 和纯文本两个版本：
+- 标题、作者等字段全部转义（HTML 用 html.escape，纯文本去掉换行）
+- 按平台、作者分组，组内按发布时间倒序
+- 限制总条数和每个作者的条数，超出部分显示"还有 N 条"，周报再大邮件大小也有上限
+- 只对最新的 max_items 条排序（heapq.nlargest），其余只计数，耗时随视频数线性增长
+"""
+
+import heapq
+import html
+import time
+from collections import namedtuple
+from string import Template
+
+RenderedDigest = namedtuple('RenderedDigest', ['html', 'text'])
+
+PLATFORM_LABELS = {'bilibili': 'B站', 'youtube': 'YouTube'}
+
+_HTML_GROUP = Template("<h4 style='margin:16px 0 4px'>$platform</h4>")
+_HTML_AUTHOR_START = Template("<p style='margin:8px 0 2px'><b>$author</b></p><ul style='margin:0'>")
+_HTML_ITEM = Template("<li style='margin-bottom:8px'>[$date] <a href='$url'>$title</a>$keywords</li>")
+_HTML_KEYWORDS = Template(" <small>($keywords)</small>")
+_HTML_AUTHOR_MORE = Template("<li style='color:#888'>还有 $count 条</li>")
+_HTML_MORE = Template("<p style='color:#888'>还有 $count 条未列出</p>")
+
+_TEXT_GROUP = Template("【$platform】")
+_TEXT_AUTHOR = Template("$author")
+_TEXT_ITEM = Template("  • [$date] $title$keywords\n    $url")
+_TEXT_AUTHOR_MORE = Template("  • 还有 $count 条")
+_TEXT_MORE = Template("还有 $count 条未列出")
+
+
+def _one_line(text):
+    return ' '.join(str(text).split())
+
+
+def _clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+class DigestRenderer:
+    """通知邮件渲染器
+
+    - max_items: 最多列出的视频数（按发布时间取最新的）
+    - max_per_author: 每个作者最多列出的视频数
+    - max_title_length: 标题超过该长度时截断
+    - url_for(video): 视频链接，默认为 VideoRecord.url（main.py 中改为由数据源适配器生成）
+    """
+
+    def __init__(self, max_items=300, max_per_author=20, max_title_length=120, date_format="%m-%d", url_for=None):
+        self.max_items = max_items
+        self.max_per_author = max_per_author
+        self.max_title_length = max_title_length
+        self.date_format = date_format
+        self.url_for = url_for or (lambda v: v.url)
+
+    def _group(self, videos):
+        """最新的 max_items 条按 平台 -> 作者 分组（保持发布时间倒序），返回 (分组, 未列出的条数)"""
+        chosen = heapq.nlargest(self.max_items, videos, key=lambda v: v.created)
+        groups = {}
+        for v in chosen:
+            groups.setdefault(v.platform, {}).setdefault(v.author, []).append(v)
+        return groups, len(videos) - len(chosen)
+
+    def render(self, videos):
+        """videos 为 VideoRecord 列表，返回 RenderedDigest(html, text)"""
+        groups, omitted = self._group(videos)
+        html_parts = []
+        text_parts = []
+        for platform in sorted(groups, key=lambda p: (p not in PLATFORM_LABELS, p)):
+            label = PLATFORM_LABELS.get(platform, platform)
+            html_parts.append(_HTML_GROUP.substitute(platform=html.escape(label)))
+            text_parts.append(_TEXT_GROUP.substitute(platform=label))
+            for author, items in groups[platform].items():
+                author = _one_line(author)
+                html_parts.append(_HTML_AUTHOR_START.substitute(author=html.escape(author)))
+                text_parts.append(_TEXT_AUTHOR.substitute(author=author))
+                for v in items[:self.max_per_author]:
+                    date = time.strftime(self.date_format, time.localtime(v.created))
+                    title = _clip(_one_line(v.title), self.max_title_length)
+                    url = self.url_for(v)
+                    matched = ', '.join(v.matched_keywords or ())
+                    html_parts.append(_HTML_ITEM.substitute(
+                        date=date,
+                        url=html.escape(url, quote=True),
+                        title=html.escape(title),
+                        keywords=_HTML_KEYWORDS.substitute(keywords=html.escape(matched)) if matched else '',
+                    ))
+                    text_parts.append(_TEXT_ITEM.substitute(
+                        date=date, title=title, url=url,
+                        keywords=f" ({matched})" if matched else '',
+                    ))
+                extra = len(items) - self.max_per_author
+                if extra > 0:
+                    html_parts.append(_HTML_AUTHOR_MORE.substitute(count=extra))
+                    text_parts.append(_TEXT_AUTHOR_MORE.substitute(count=extra))
+                html_parts.append("</ul>")
+            text_parts.append('')
+        if omitted > 0:
+            html_parts.append(_HTML_MORE.substitute(count=omitted))
+            text_parts.append(_TEXT_MORE.substitute(count=omitted))
+        return RenderedDigest(''.join(html_parts), '\n'.join(text_parts).rstrip() + '\n')
@@ -0,0 +1,447 @@
+"""
+历史记录存储后端
+HistoryManager 通过这里的后端读写已处理视频，支持四种格式：
+- json: 原有的 history.json（整个文件载入为字典，每次运行整体重写）
+- sqlite: SQLite (WAL) 数据库，按 (platform, id) 建主键，按 seen_at 建索引
+- log: 追加写日志，每行 "seen_at<TAB>key"，只追加新增记录，过期时才压缩
+- shards: 按天分片的目录，每天一个排序、时间差分编码的文本文件（可选 zstd 压缩），
+  每次运行只改写当天的分片，适合提交到 git 仓库
+
+所有后端的接口一致：key in backend / items / add / expire / flush / close / len()
+key 沿用 history.json 的格式：B站为 bvid，YouTube 为 "yt:video_id"，其他数据源为 "platform:video_id"
+
+flush 是持久化的提交点：json / 日志压缩先写临时文件并 fsync，再原子替换；日志追加后 fsync；
+sqlite 在一个事务内写入。中途崩溃时磁盘上要么是提交前的内容、要么是提交后的内容。
+"""
+
+import os
+import json
+import time
+import calendar
+import itertools
+
+BACKENDS = ('json', 'sqlite', 'log', 'shards')
+
+DAY = 24 * 3600
+
+
+def split_key(key):
+    """把历史记录 key 拆成 (platform, id)"""
+    if key.startswith('yt:'):
+        return 'youtube', key[3:]
+    platform, sep, video_id = key.partition(':')
+    if sep:
+        return platform, video_id
+    return 'bilibili', key
+
+
+def join_key(platform, video_id):
+    """split_key 的逆操作；B站以外的数据源（YouTube 除外）加 "platform:" 前缀"""
+    if platform == 'youtube':
+        return f"yt:{video_id}"
+    if platform == 'bilibili':
+        return video_id
+    return f"{platform}:{video_id}"
+
+
+def fsync_dir(directory):
+    """fsync 目录，使 os.replace 的重命名本身落盘；Windows 等不支持打开目录的平台跳过"""
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_atomic(file_path, write, binary=False):
+    """write(f) 写入临时文件并 fsync 后原子替换 file_path"""
+    tmp_path = file_path + '.tmp'
+    with (open(tmp_path, 'wb') if binary else open(tmp_path, 'w', encoding='utf-8')) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    fsync_dir(os.path.dirname(file_path))
+
+
+def load_json_history(file_path):
+    """读取旧格式的 history.json，失败时返回空字典"""
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+class JsonHistoryBackend:
+    """原有格式：整个 history.json 载入内存，flush 时整体重写"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.data = load_json_history(file_path)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def items(self):
+        return self.data.items()
+
+    def add(self, key, seen_at):
+        self.data[key] = seen_at
+
+    def add_many(self, items):
+        self.data.update(items)
+
+    def expire(self, before):
+        """删除 seen_at <= before 的记录，返回删除条数"""
+        old_len = len(self.data)
+        self.data = {k: v for k, v in self.data.items() if v > before}
+        return old_len - len(self.data)
+
+    def flush(self):
+        write_atomic(self.file_path, lambda f: json.dump(self.data, f, indent=2))
+
+    def close(self):
+        pass
+
+
+class SqliteHistoryBackend:
+    """SQLite (WAL) 存储
+
+    主键 (platform, id) 使用 WITHOUT ROWID 聚簇存储，本身就是按 (platform, id, seen_at)
+    排列的 B 树，成员检查只需一次索引查找；seen_at 单独建索引，过期清理是一条 DELETE。
+    新增记录先缓存在内存中，flush 时在一个事务内批量写入。
+    """
+
+    def __init__(self, file_path, legacy_json=None):
+        import sqlite3  # 只有 sqlite 后端需要，默认的 json 后端不导入
+        self.file_path = file_path
+        self.conn = sqlite3.connect(file_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")  # 每次运行只提交一两次，提交即落盘
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " platform TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " seen_at INTEGER NOT NULL,"
+            " PRIMARY KEY (platform, id)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_seen_at ON history (seen_at)")
+        self.conn.commit()
+        self.pending = {}
+        if legacy_json and len(self) == 0:
+            migrate_json_history(legacy_json, self)
+
+    def __contains__(self, key):
+        if key in self.pending:
+            return True
+        platform, video_id = split_key(key)
+        row = self.conn.execute(
+            "SELECT 1 FROM history WHERE platform = ? AND id = ?", (platform, video_id)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0] + len(self.pending)
+
+    def items(self):
+        self.flush()
+        for platform, video_id, seen_at in self.conn.execute("SELECT platform, id, seen_at FROM history"):
+            yield join_key(platform, video_id), seen_at
+
+    def add(self, key, seen_at):
+        self.pending[key] = seen_at
+
+    def add_many(self, items):
+        self.pending.update(items)
+
+    def expire(self, before):
+        self.flush()
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM history WHERE seen_at <= ?", (before,))
+        return cursor.rowcount
+
+    def flush(self):
+        if not self.pending:
+            return
+        rows = [(*split_key(k), v) for k, v in self.pending.items()]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO history (platform, id, seen_at) VALUES (?, ?, ?)", rows
+            )
+        self.pending = {}
+
+    def close(self):
+        self.flush()
+        # 把 WAL 合并回主库，避免提交到仓库时遗留 -wal/-shm 文件
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
+
+
+class AppendLogHistoryBackend:
+    """追加写日志：每行 "seen_at<TAB>key"
+
+    打开时把日志回放为字典（后出现的记录覆盖先出现的），成员检查为字典查找；
+    flush 只追加本次新增的行；只有存在过期记录时 expire 才重写（压缩）整个文件。
+    追加时崩溃留下的半行（没有换行符）在回放时丢弃，下次追加前先补上换行。
+    """
+
+    def __init__(self, file_path, legacy_json=None):
+        self.file_path = file_path
+        self.data = {}
+        self.pending = {}
+        self.torn_tail = False
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        self.torn_tail = True
+                        break
+                    seen_at, sep, key = line[:-1].partition('\t')
+                    if sep and seen_at.isdigit():
+                        self.data[key] = int(seen_at)
+        elif legacy_json:
+            migrate_json_history(legacy_json, self)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def items(self):
+        return self.data.items()
+
+    def add(self, key, seen_at):
+        self.data[key] = seen_at
+        self.pending[key] = seen_at
+
+    def add_many(self, items):
+        for key, seen_at in items.items():
+            self.add(key, seen_at)
+
+    def expire(self, before):
+        expired = [k for k, v in self.data.items() if v <= before]
+        if not expired:
+            return 0
+        for k in expired:
+            del self.data[k]
+        self._compact()
+        return len(expired)
+
+    def _compact(self):
+        write_atomic(self.file_path, lambda f: f.writelines(f"{v}\t{k}\n" for k, v in self.data.items()))
+        self.pending = {}
+        self.torn_tail = False
+
+    def flush(self):
+        if not self.pending:
+            return
+        with open(self.file_path, 'a', encoding='utf-8') as f:
+            if self.torn_tail:
+                f.write('\n')
+            f.writelines(f"{v}\t{k}\n" for k, v in self.pending.items())
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending = {}
+        self.torn_tail = False
+
+    def close(self):
+        self.flush()
+
+
+class ShardedHistoryBackend:
+    """按天分片：目录下每个 UTC 日期一个文件 YYYY-MM-DD.txt（压缩时为 .txt.zst）
+
+    分片内按 (seen_at, key) 排序，每行 "时间差<TAB>key"，时间差为与上一行（第一行为当天零点）的秒数。
+    同一次运行提交的记录时间相同，时间差大多为 0；内容只由记录决定，相同的数据总是写出相同的文件。
+
+    - flush 只重写有变化的分片，日常运行只有当天的分片变化（新记录都在文件末尾）
+    - expire 按整个分片删除：分片中最晚的记录也过期时才删除，记录最多多保留不到一天
+    - 打开时把所有分片载入为一个字典，成员检查为字典查找；分片只记录最晚时间，重写时从字典中取出当天的记录
+    """
+
+    def __init__(self, directory, legacy_json=None, compress=False):
+        self.directory = directory
+        self.compress = compress
+        self.data = {}
+        self.latest = {}  # 分片（自 1970-01-01 起的天数）-> 分片中最晚的 seen_at
+        self.dirty = set()
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                day, _, ext = name.partition('.')
+                if ext in ('txt', 'txt.zst'):
+                    self._load_shard(day, os.path.join(directory, name))
+        elif legacy_json:
+            os.makedirs(directory, exist_ok=True)
+            migrate_json_history(legacy_json, self)
+
+    def _load_shard(self, day, path):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if path.endswith('.zst'):
+            raw = zstd_module(required=True).ZstdDecompressor().decompress(raw)
+        # 一次 split 拆出所有字段，再批量还原时间，比逐行 partition 快
+        fields = raw.decode('utf-8').replace('\n', '\t').split('\t')
+        deltas = list(map(int, fields[0:-1:2]))
+        if not deltas:
+            return
+        start = shard_start(day)
+        times = itertools.accumulate(deltas, initial=start)
+        next(times)  # 跳过作为起点的当天零点
+        self.data.update(zip(fields[1::2], times))
+        self.latest[start // DAY] = start + sum(deltas)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def items(self):
+        return self.data.items()
+
+    def add(self, key, seen_at):
+        seen_at = int(seen_at)
+        old = self.data.get(key)
+        if old is not None:
+            self.dirty.add(old // DAY)
+        day = seen_at // DAY
+        self.data[key] = seen_at
+        self.latest[day] = max(self.latest.get(day, seen_at), seen_at)
+        self.dirty.add(day)
+
+    def add_many(self, items):
+        for key, seen_at in items.items():
+            self.add(key, seen_at)
+
+    def expire(self, before):
+        """删除最晚记录也 <= before 的分片，返回删除条数"""
+        days = {day for day, latest in self.latest.items() if latest <= before}
+        if not days:
+            return 0
+        expired = [k for k, v in self.data.items() if v // DAY in days]
+        for k in expired:
+            del self.data[k]
+        for day in days:
+            del self.latest[day]
+        self.dirty |= days
+        return len(expired)
+
+    def _shard_path(self, day, compressed):
+        name = shard_day(day * DAY) + ('.txt.zst' if compressed else '.txt')
+        return os.path.join(self.directory, name)
+
+    def flush(self):
+        if not self.dirty:
+            return
+        shards = {day: {} for day in self.dirty}
+        for key, seen_at in self.data.items():
+            shard = shards.get(seen_at // DAY)
+            if shard is not None:
+                shard[key] = seen_at
+        os.makedirs(self.directory, exist_ok=True)
+        zstd = zstd_module() if self.compress else None
+        for day, shard in sorted(shards.items()):
+            stale = [self._shard_path(day, True), self._shard_path(day, False)]
+            if shard:
+                path = self._shard_path(day, zstd is not None)
+                stale.remove(path)
+                data = encode_shard(day * DAY, shard).encode('utf-8')
+                if zstd is not None:
+                    data = zstd.ZstdCompressor(level=19).compress(data)
+                write_atomic(path, lambda f: f.write(data), binary=True)
+                self.latest[day] = max(shard.values())
+            else:
+                self.latest.pop(day, None)
+            for path in stale:
+                if os.path.exists(path):
+                    os.remove(path)
+        fsync_dir(self.directory)
+        self.dirty = set()
+
+    def close(self):
+        self.flush()
+
+
+def shard_day(seen_at):
+    """记录所在分片的 UTC 日期"""
+    return time.strftime('%Y-%m-%d', time.gmtime(seen_at))
+
+
+def shard_start(day):
+    """分片日期当天零点 (UTC) 的时间戳"""
+    return calendar.timegm(time.strptime(day, '%Y-%m-%d'))
+
+
+def encode_shard(start, shard):
+    """分片内容：按 (seen_at, key) 排序，时间差分编码；start 为当天零点的时间戳"""
+    lines = []
+    prev = start
+    for key, seen_at in sorted(shard.items(), key=lambda kv: (kv[1], kv[0])):
+        lines.append(f"{seen_at - prev}\t{key}\n")
+        prev = seen_at
+    return ''.join(lines)
+
+
+def zstd_module(required=False):
+    """可选依赖 zstandard；未安装时压缩退回纯文本，读取已压缩的分片则报错"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        if required:
+            raise RuntimeError("历史记录分片使用了 zstd 压缩，需要安装 zstandard：pip install zstandard")
+        print("⚠️  未安装 zstandard，历史记录分片不压缩")
+        return None
+
+
+def migrate_json_history(json_path, backend):
+    """把旧格式 history.json 导入到新后端，返回导入条数"""
+    data = load_json_history(json_path)
+    if data:
+        backend.add_many(data)
+        backend.flush()
+        print(f"已从 {json_path} 迁移 {len(data)} 条历史记录")
+    return len(data)
+
+
+def backend_path(file_path, backend):
+    """根据后端类型推导文件名：history.json -> history.db / history.log / history.shards/"""
+    base, _ = os.path.splitext(file_path)
+    return {'json': file_path, 'sqlite': base + '.db', 'log': base + '.log', 'shards': base + '.shards'}[backend]
+
+
+def storage_size(path):
+    """历史记录占用的字节数（shards 后端为目录下所有分片之和），不存在时为 0"""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def open_history_backend(backend, file_path="history.json", compress=False):
+    """打开历史记录后端；非 json 后端首次打开时会自动迁移同名的 history.json
+
+    compress 只对 shards 后端有效：新写出的分片使用 zstd 压缩（需要安装 zstandard）
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的历史记录后端: {backend}（可选: {', '.join(BACKENDS)}）")
+    path = backend_path(file_path, backend)
+    if backend == 'shards':
+        return ShardedHistoryBackend(path, legacy_json=file_path, compress=compress)
+    if backend == 'sqlite':
+        return SqliteHistoryBackend(path, legacy_json=file_path)
+    if backend == 'log':
+        return AppendLogHistoryBackend(path, legacy_json=file_path)
+    return JsonHistoryBackend(path)
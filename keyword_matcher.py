@@ -0,0 +1,139 @@
+"""
+关键词匹配引擎
+从 up_list 的关键词配置一次性构建 Aho-Corasick 自动机，一次扫描标题+简介即可找出所有命中的关键词。
+
+匹配前统一做归一化：
+- NFKC：全角转半角（ＡＩＧＣ -> AIGC、全角标点/空格）
+- casefold：忽略大小写
+- 繁体转简体：安装了 opencc 时使用完整转换表，否则使用内置的常用字表
+"""
+
+import unicodedata
+from collections import deque
+
+try:
+    import opencc
+    _t2s = opencc.OpenCC('t2s').convert
+except ImportError:
+    # 内置常用繁简对照表（未安装 opencc 时使用，覆盖视频标题中常见的字）
+    _T2S_TABLE = str.maketrans(
+        "視頻訊電腦網絡圖畫語聲樂學習課開發測評機類動態應運軟體驗製設計實戰講義這個們來說話時間會國經濟"
+        "財錢點擊載後進還麼為與從對歷員場錄輯攝鏡頭燈線遊戲專業務據庫雲雜誌報導師練題試證劃區塊鏈幣價漲單"
+        "買賣盤問論關係統劇齣節",
+        "视频讯电脑网络图画语声乐学习课开发测评机类动态应运软体验制设计实战讲义这个们来说话时间会国经济"
+        "财钱点击载后进还么为与从对历员场录辑摄镜头灯线游戏专业务据库云杂志报导师练题试证划区块链币价涨单"
+        "买卖盘问论关系统剧出节",
+    )
+
+    def _t2s(text):
+        return text.translate(_T2S_TABLE)
+
+
+def normalize(text):
+    """关键词和被匹配文本使用同一套归一化"""
+    return _t2s(unicodedata.normalize('NFKC', text).casefold())
+
+
+class AhoCorasick:
+    """多模式串匹配自动机：构建一次，扫描文本的耗时与关键词数量无关"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for pattern in patterns:
+            self._insert(pattern)
+        self._build_fail_links()
+
+    def _insert(self, pattern):
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            state = nxt
+        self.output[state] = self.output[state] + (pattern,)
+
+    def _build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                # 后缀上能匹配到的模式串也一并输出
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find_all(self, text):
+        """返回 text 中出现过的所有模式串（集合）"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class MatchResult:
+    """一次匹配的结果：命中的关键词与排除关键词（均为配置中的原始写法）"""
+
+    __slots__ = ('matched', 'negatives')
+
+    def __init__(self, matched, negatives):
+        self.matched = matched
+        self.negatives = negatives
+
+    @property
+    def accepted(self):
+        return bool(self.matched) and not self.negatives
+
+
+class KeywordMatcher:
+    """关键词匹配器
+
+    - keywords / negative_keywords: 全局关键词与排除关键词
+    - channel_keywords: {UID或Channel ID: [关键词, ...]}，为该频道追加的关键词，
+      以 "-" 开头的为该频道的排除关键词
+    所有频道的关键词共用一个自动机，匹配后再按频道取各自关心的部分。
+    """
+
+    def __init__(self, keywords, negative_keywords=(), channel_keywords=None):
+        # 归一化后的模式串 -> 原始写法（多个写法归一化后相同时保留第一个）
+        self.originals = {}
+        self.positive = self._register(keywords)
+        self.negative = self._register(negative_keywords)
+        self.channel_positive = {}
+        self.channel_negative = {}
+        for channel, kws in (channel_keywords or {}).items():
+            self.channel_positive[channel] = self._register(kw for kw in kws if not kw.startswith('-'))
+            self.channel_negative[channel] = self._register(kw[1:] for kw in kws if kw.startswith('-'))
+        self.automaton = AhoCorasick(self.originals)
+
+    def _register(self, keywords):
+        patterns = set()
+        for kw in keywords:
+            pattern = normalize(kw)
+            if pattern:
+                self.originals.setdefault(pattern, kw)
+                patterns.add(pattern)
+        return frozenset(patterns)
+
+    def match(self, text, channel=None):
+        found = self.automaton.find_all(normalize(text))
+        positive = found & (self.positive | self.channel_positive.get(channel, frozenset()))
+        negative = found & (self.negative | self.channel_negative.get(channel, frozenset()))
+        return MatchResult(
+            sorted(self.originals[p] for p in positive),
+            sorted(self.originals[p] for p in negative),
+        )
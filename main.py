@@ -1,16 +1,31 @@
 import asyncio
-import aiohttp
+import argparse
+import sys
+import signal
+import socket
+import contextlib
 import time
 import os
 import json
 import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
 from dotenv import load_dotenv
-from bilibili_api import user
-from googleapiclient.discovery import build
-from up_list import TARGET_UIDS, UP_LIST, KEYWORDS, NO_FILTER_UIDS, UP_NAME_MAP, YOUTUBE_CHANNELS, YOUTUBE_NO_FILTER_CHANNELS
+from rate_limiter import AdaptiveRateLimiter
+from cursor_store import CursorStore
+from channel_cache import ChannelMetaCache
+from channel_health import ChannelHealth, NOT_FOUND, ERROR, NETWORK, EXCEPTION, THROTTLED, QUOTA, CONFIG
+from response_cache import ResponseCache
+from youtube_quota import QuotaBudget, QuotaExhausted, DEFAULT_DAILY_QUOTA, API_COSTS
+from history_store import open_history_backend, backend_path, storage_size
+from bloom_filter import RotatingBloomFilter
+from keyword_matcher import KeywordMatcher
+from video_record import VideoRecord, VIDEO_URLS
+from sources import SourceAdapter, register_source, source_classes, get_source_class
+from daemon import PollScheduler, DigestQueue, next_digest_time
+from digest_renderer import DigestRenderer, PLATFORM_LABELS
+from metrics import RunMetrics, STAGE_LABELS
+from notifier import SmtpTransport, Outbox, Notifier, parse_recipients, SENT, SPOOLED, FAILED
+from up_list import TARGET_UIDS, UP_LIST, KEYWORDS, NO_FILTER_UIDS, UP_NAME_MAP, YOUTUBE_CHANNELS, YOUTUBE_NO_FILTER_CHANNELS, NEGATIVE_KEYWORDS, CHANNEL_KEYWORDS
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
@@ -18,23 +33,106 @@ load_dotenv()
 # ================= 配置区域 =================
 
 HISTORY_DAYS = 14 # 记忆保留时间稍微拉长一点，防止周报重复
-CONCURRENCY_LIMIT = 2  # 降低并发数，避免触发风控
+HISTORY_BACKEND = os.environ.get("HISTORY_BACKEND", "json")  # 历史记录存储：json / sqlite / log / shards
+HISTORY_ZSTD = os.environ.get("HISTORY_ZSTD", "0") == "1"  # shards 后端的分片是否用 zstd 压缩（需要 zstandard）
+HISTORY_BLOOM = os.environ.get("HISTORY_BLOOM", "0") == "1"  # 是否在历史记录前加 Bloom 过滤器
+BLOOM_FP_RATE = 0.01  # Bloom 过滤器总误判率
+BLOOM_DAILY_CAPACITY = 10000  # 每天的分桶预计容纳的新视频数
+BILIBILI_PAGE_SIZE = 10  # 每页获取的视频数
+BILIBILI_MAX_PAGES = 5  # 增量翻页上限（首次运行或长时间未运行时）
+BILIBILI_NOT_FOUND_CODES = (-404, -626)  # 投稿接口对不存在 / 已注销账号返回的错误码
+# 动态时间线模式：用关注了所有UP主的账号（BILIBILI_SESSDATA）读一条时间线，代替逐个UP主请求投稿列表；
+# 未关注的UP主以及时间线获取失败时仍逐个抓取
+BILIBILI_DYNAMIC_FEED = os.environ.get("BILIBILI_DYNAMIC_FEED", "0") == "1"
+BILIBILI_FEED_MAX_PAGES = 20  # 时间线翻页上限，翻不到时间窗口起点时回退到逐个UP主抓取
+YOUTUBE_USE_FEED = os.environ.get("YOUTUBE_USE_FEED", "1") == "1"  # 优先使用频道订阅源（不消耗配额）
+YOUTUBE_BATCH_SIZE = 50  # channels().list 单次最多查询的频道数
+YOUTUBE_DAILY_QUOTA = int(os.environ.get("YOUTUBE_DAILY_QUOTA", DEFAULT_DAILY_QUOTA))  # 每日配额（单位）
+YOUTUBE_QUOTA_RESERVE = 50  # 预留给重试等意外开销的配额，规划时不使用
+# 抓取结果缓存：各平台的缓存有效期（秒），过期后支持条件请求的抓取器会做 ETag/Last-Modified 校验
+RESPONSE_CACHE_DIR = ".cache/responses"
+RESPONSE_CACHE_TTL = {'bilibili': 600, 'bilibili_follow': 6 * 3600, 'youtube': 900, 'youtube_feed': 900}
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024  # 超过后按最近访问时间淘汰
+PIPELINE_QUEUE_SIZE = 64  # 抓取结果队列长度，队列满时抓取器等待（背压）
+PIPELINE_FILTER_WORKERS = 2  # 过滤工作协程数
+# 常驻模式（--daemon）：每个频道的轮询间隔 = 最近发布的中位间隔 / 4，限制在下面的范围内
+DAEMON_MIN_POLL = 15 * 60
+DAEMON_MAX_POLL = 6 * 3600
+DAEMON_DEFAULT_POLL = 3600  # 发布记录不足时的轮询间隔
+DAEMON_DIGEST_HOUR_UTC = 1  # 每天几点（UTC）发送汇总，与 daily.yml 的定时任务一致
+DAEMON_DIGEST_RETRY = 15 * 60  # 汇总发送失败后的重试间隔
+# 分片模式（--shards N）：任务队列文件，多台机器共用时放在共享存储上
+SHARD_QUEUE_FILE = os.environ.get("SHARD_QUEUE_FILE", ".cache/shard_queue.db")
+SHARD_CLAIM_BATCH = 20  # 工作进程每次领取的任务数
+SHARD_STEAL_AFTER = 30  # 其他分片的任务入队超过这么久仍无人领取时，空闲的工作进程可以接手（秒）
+SHARD_CLAIM_TIMEOUT = 600  # 领取后超过这么久未完成的任务可被其他工作进程接手（秒）
+SHARD_WAIT_TIMEOUT = 3600  # 使用外部工作进程时协调进程最多等待多久（秒）
+# 邮件发送：默认 Gmail；可以指向其他 SMTP 服务器（如本地调试用的 SMTP 桩）
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") == "1"
+SMTP_MAX_RETRIES = 3  # 单封邮件的重试次数（指数退避）
+OUTBOX_DIR = ".cache/outbox"  # 发送失败的邮件存在这里，下次运行时补发
+DIGEST_MAX_ITEMS = 300  # 通知邮件最多列出的视频数（按发布时间取最新的，其余显示"还有 N 条未列出"）
+DIGEST_MAX_PER_AUTHOR = 20  # 每个UP主/频道最多列出的视频数
+# 运行指标：每次运行追加一行到 JSON-lines 文件，并覆盖写 Prometheus textfile
+METRICS_JSONL_FILE = os.environ.get("METRICS_JSONL_FILE", ".cache/metrics/runs.jsonl")
+METRICS_PROM_FILE = os.environ.get("METRICS_PROM_FILE", ".cache/metrics/up_monitor.prom")
+# 频道熔断：连续失败（只计不存在、接口错误码等频道本身的问题）达到阈值后跳过该频道，冷却期过后试探一次，
+# 仍失败则冷却时间翻倍。状态不提交到仓库，通过 Actions 缓存跨运行保留
+CHANNEL_HEALTH_FILE = ".cache/channel_health.json"
+HEALTH_FAILURE_THRESHOLD = 3
+HEALTH_BASE_COOLDOWN = 24 * 3600
+HEALTH_MAX_COOLDOWN = 14 * 24 * 3600
+# 每个平台独立的自适应限流参数（AIMD 令牌桶）：请求正常时逐步提速，触发风控时减半
+RATE_LIMIT_CONFIG = {
+    'bilibili': {'initial_rate': 1.0, 'min_rate': 0.2, 'max_rate': 4.0, 'max_concurrency': 4},
+    'bilibili_feed': {'initial_rate': 1.0, 'min_rate': 0.2, 'max_rate': 2.0, 'max_concurrency': 1},
+    'youtube': {'initial_rate': 2.0, 'min_rate': 0.5, 'max_rate': 10.0, 'max_concurrency': 4},
+    'youtube_feed': {'initial_rate': 5.0, 'min_rate': 0.5, 'max_rate': 20.0, 'max_concurrency': 8},
+}
 # ===========================================
 
 class HistoryManager:
-    """记忆管理 (保持不变)"""
-    def __init__(self, file_path="history.json"):
+    """记忆管理：具体存储由 history_store 中的后端实现（json / sqlite / log）
+
+    启用 Bloom 过滤器时，精确存储延迟到第一次"可能存在"的查询或保存时才打开，
+    大部分"一定是新视频"的检查不需要载入完整历史。
+
+    add() 只把视频暂存在 pending 中（本次运行内已视为处理过），通知送达后 commit() 才一次性写入存储；
+    通知失败时 rollback() 丢弃暂存记录，下次运行重新通知这些视频。
+    """
+    def __init__(self, file_path="history.json", backend=None, bloom=None):
         self.file_path = file_path
-        self.data = self._load()
+        self.backend_name = backend or HISTORY_BACKEND
+        self._backend = None
+        self.pending = {}
+        self.bloom_negatives = 0
+        self.exact_lookups = 0
+        self.bloom = self._open_bloom() if (HISTORY_BLOOM if bloom is None else bloom) else None
 
-    def _load(self):
-        if not os.path.exists(self.file_path):
-            return {}
-        try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = open_history_backend(self.backend_name, self.file_path, compress=HISTORY_ZSTD)
+        return self._backend
+
+    def _history_size(self):
+        return storage_size(backend_path(self.file_path, self.backend_name))
+
+    def _open_bloom(self):
+        directory = os.path.splitext(self.file_path)[0] + '.bloom'
+        bloom = RotatingBloomFilter(directory, days=HISTORY_DAYS,
+                                    capacity_per_day=BLOOM_DAILY_CAPACITY, fp_rate=BLOOM_FP_RATE)
+        if bloom.read_meta().get('history_size') != self._history_size():
+            # 过滤器与精确存储不同步（首次启用或历史文件被外部修改），从精确存储重建
+            bloom.clear()
+            count = 0
+            for key, seen_at in self.backend.items():
+                bloom.add(key, seen_at)
+                count += 1
+            print(f"Bloom 过滤器已从历史记录重建：{count} 条")
+        return bloom
 
     def is_processed(self, video_id):
         """
@@ -43,29 +141,118 @@ class HistoryManager:
         - B站: bvid (如: "BVxxxxx")
         - YouTube: "yt:video_id" (如: "yt:dQw4w9WgXcQ")
         """
-        return video_id in self.data
+        if video_id in self.pending:
+            return True
+        if self.bloom is not None and not self.bloom.might_contain(video_id):
+            self.bloom_negatives += 1
+            return False
+        self.exact_lookups += 1
+        return video_id in self.backend
 
-    def add(self, video_id, platform='bilibili'):
-        """
-        添加已处理的视频
-        platform: 'bilibili' 或 'youtube'
-        """
-        if platform == 'youtube':
-            # YouTube 视频ID添加前缀
-            video_id = f"yt:{video_id}"
-        self.data[video_id] = int(time.time())
+    def add(self, key):
+        """暂存已处理的视频（key 由数据源适配器的 video_key() 生成），commit() 时才写入存储"""
+        self.pending[key] = int(time.time())
 
-    def save_and_clean(self):
+    def commit(self):
+        """写入暂存的记录并清理过期记录；由后端保证写入是原子的（临时文件 fsync + 重命名 / 数据库事务）"""
         now = time.time()
         expire_time = now - (HISTORY_DAYS * 24 * 3600)
-        new_data = {k: v for k, v in self.data.items() if v > expire_time}
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(new_data, f, indent=2)
-        print(f"记忆库更新：清理后剩余 {len(new_data)} 条记录")
+        staged = self.pending
+        self.backend.add_many(staged)
+        self.backend.expire(expire_time)
+        self.backend.flush()
+        self.pending = {}
+        print(f"记忆库更新：新增 {len(staged)} 条，清理后剩余 {len(self.backend)} 条记录")
+        if self.bloom is not None:
+            for key, seen_at in staged.items():
+                self.bloom.add(key, seen_at)
+            removed = self.bloom.rotate(expire_time)
+            self.bloom.flush()
+            print(f"Bloom 过滤器：{len(self.bloom)} 个分桶（轮换删除 {removed} 个），"
+                  f"直接判定为新视频 {self.bloom_negatives} 次，查询精确存储 {self.exact_lookups} 次")
+
+    def rollback(self):
+        """丢弃暂存的记录，存储保持上次提交时的状态"""
+        if self.pending:
+            print(f"记忆库未更新：丢弃本次暂存的 {len(self.pending)} 条记录，下次运行重新处理")
+        self.pending = {}
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
+        if self.bloom is not None:
+            # 记录与过滤器同步的历史文件大小，下次启动据此判断是否需要重建
+            self.bloom.write_meta({'history_size': self._history_size()})
+            self.bloom.close()
+
+metrics = RunMetrics()
+renderer = DigestRenderer(max_items=DIGEST_MAX_ITEMS, max_per_author=DIGEST_MAX_PER_AUTHOR,
+                          url_for=lambda v: get_source_class(v.platform).url(v.id))
 
-memory = HistoryManager()
+# 运行状态（历史记录、游标、缓存、配额、频道健康）由 init_state() 载入，导入 main 时不读任何文件
+memory = None
+cursors = None
+channel_cache = None
+channel_health = None
+response_cache = None
+youtube_quota = None
 
-def get_time_config():
+# 平台 SDK 导入较慢，第一次用到时才导入（见 bilibili_user() / feed_fetcher_class() / dynamic_feed_class()）
+user = None
+YoutubeFeedFetcher = None
+BilibiliDynamicFeed = None
+
+def init_state():
+    """载入运行状态；已载入的部分不重复载入（可以预先替换成其他实例，如测试用的历史记录）"""
+    global memory, cursors, channel_cache, channel_health, response_cache, youtube_quota
+    if memory is None:
+        memory = HistoryManager()
+    if cursors is None:
+        cursors = CursorStore()
+    if channel_cache is None:
+        channel_cache = ChannelMetaCache()
+    if channel_health is None:
+        channel_health = ChannelHealth(CHANNEL_HEALTH_FILE, threshold=HEALTH_FAILURE_THRESHOLD,
+                                       base_cooldown=HEALTH_BASE_COOLDOWN, max_cooldown=HEALTH_MAX_COOLDOWN)
+        channel_health.forget(all_channels())  # 已从 up_list.py 删除的频道
+    if response_cache is None:
+        ttls = {}
+        for cls in source_classes():
+            ttls.update(cls.cache_ttls)
+        ttls.update(RESPONSE_CACHE_TTL)
+        response_cache = ResponseCache(RESPONSE_CACHE_DIR, ttls=ttls, max_bytes=RESPONSE_CACHE_MAX_BYTES)
+    if youtube_quota is None:
+        youtube_quota = QuotaBudget(daily_limit=YOUTUBE_DAILY_QUOTA, reserve=YOUTUBE_QUOTA_RESERVE)
+
+def channel_name(platform, channel_id):
+    """UP主/频道的显示名：元数据缓存（query_up_names.py 维护）中的名字，其次是 up_list.py 中的，不发请求"""
+    name = channel_cache.name(platform, channel_id) if channel_cache is not None else None
+    if platform == 'bilibili' and str(channel_id).isdigit():
+        channel_id = int(channel_id)  # 运行指标中的ID是字符串，up_list.py 中的 UID 是整数
+    return name or UP_NAME_MAP.get(channel_id) or str(channel_id)
+
+def bilibili_user():
+    """bilibili_api.user 模块"""
+    global user
+    if user is None:
+        from bilibili_api import user
+    return user
+
+def feed_fetcher_class():
+    """YoutubeFeedFetcher（依赖 aiohttp）"""
+    global YoutubeFeedFetcher
+    if YoutubeFeedFetcher is None:
+        from youtube_feed import YoutubeFeedFetcher
+    return YoutubeFeedFetcher
+
+def dynamic_feed_class():
+    """BilibiliDynamicFeed（依赖 aiohttp）"""
+    global BilibiliDynamicFeed
+    if BilibiliDynamicFeed is None:
+        from bilibili_dynamic import BilibiliDynamicFeed
+    return BilibiliDynamicFeed
+
+def get_time_config(verbose=True):
     """【新功能】根据今天是星期几，决定抓取策略"""
     # 获取当前美国西部时间 (PST, UTC-8)
     utc_now = datetime.datetime.utcnow()
@@ -75,354 +262,1028 @@ def get_time_config():
     current_timestamp = time.time()
     
     if weekday == 5: # 如果是周六
-        print("今天是周六（美国西部时间），执行【周报】模式，抓取过去 7 天...")
+        if verbose:
+            print("今天是周六（美国西部时间），执行【周报】模式，抓取过去 7 天...")
         return {
             "title": "UGC监控周报 (Past 7 Days)",
             "window": 7 * 24 * 3600,
             "now": current_timestamp
         }
     else: # 其他6天（周日到周五）都是日报模式
-        print("今天执行【日报】模式，抓取过去 1 天...")
+        if verbose:
+            print("今天执行【日报】模式，抓取过去 1 天...")
         return {
             "title": "UGC监控日报",
             "window": 26 * 3600, # 设置26小时，稍微多一点防止漏掉边界
             "now": current_timestamp
         }
 
-async def fetch_videos_from_up(uid, semaphore, retry_count=3):
-    """获取UP主视频，带重试机制"""
-    async with semaphore:
-        for attempt in range(retry_count):
-            try:
-                u = user.User(uid=uid)
-                # 周报模式下，5条可能不够，改为获取最近 10 条
-                videos = await u.get_videos(ps=10) 
-                
-                # 检查是否有错误
-                if isinstance(videos, dict) and videos.get('code') == -352:
-                    # 风控错误，等待更长时间后重试
-                    wait_time = (attempt + 1) * 3  # 3秒、6秒、9秒
-                    print(f"⚠️  UID {uid} 触发风控，等待 {wait_time} 秒后重试... (尝试 {attempt + 1}/{retry_count})")
-                    await asyncio.sleep(wait_time)
+def rate_limit_config():
+    """各数据源声明的限流参数，RATE_LIMIT_CONFIG 中同名的配置优先"""
+    config = {}
+    for cls in source_classes():
+        config.update(cls.rate_limits)
+    config.update(RATE_LIMIT_CONFIG)
+    return config
+
+def create_rate_limiters():
+    """为每个平台创建独立的自适应限流器（需在事件循环内调用）"""
+    return {name: AdaptiveRateLimiter(name, **params) for name, params in rate_limit_config().items()}
+
+def bilibili_error_class(e):
+    """B站请求异常的错误类别：接口返回了错误码的是频道的问题，其余（超时、连接失败等）记为网络错误"""
+    code = getattr(e, 'code', None)
+    if code is None:
+        return NETWORK
+    return NOT_FOUND if code in BILIBILI_NOT_FOUND_CODES else ERROR
+
+def youtube_error_class(e):
+    """YouTube API 异常的错误类别：4xx（429 除外）是频道的问题，5xx 和没有响应的（超时、连接失败等）记为网络错误"""
+    status = getattr(getattr(e, 'resp', None), 'status', None)
+    if status in (403, 404):
+        return NOT_FOUND
+    if status and 400 <= int(status) < 500 and int(status) != 429:
+        return ERROR
+    return NETWORK
+
+def estimated_size(response):
+    """响应大小的估算值：SDK 只返回解析后的结果，拿不到原始响应，按重新序列化的 JSON 计算（不含压缩和 HTTP 头）"""
+    return len(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+
+async def fetch_video_page(uid, limiter, pn=1, ps=BILIBILI_PAGE_SIZE, retry_count=3):
+    """获取UP主投稿列表的一页（VideoRecord 列表），带重试机制；请求节奏由自适应限流器控制。失败返回 None"""
+    cache_key = response_cache.make_key('bilibili', uid, pn, ps)
+    cached = response_cache.get_fresh('bilibili', cache_key)
+    if cached is not None:
+        metrics.inc('bilibili', uid, 'cache_hits')
+        return [VideoRecord.from_dict(v, channel=uid) for v in cached]
+    for attempt in range(retry_count):
+        if attempt:
+            metrics.inc('bilibili', uid, 'retries')
+        try:
+            async with limiter:
+                u = bilibili_user().User(uid=uid)
+                with metrics.request('bilibili', uid):
+                    videos = await u.get_videos(pn=pn, ps=ps)
+            
+            # 检查是否有错误
+            if isinstance(videos, dict) and videos.get('code') == -352:
+                # 风控错误：限流器降速，下一次请求会自动等待更久
+                metrics.inc('bilibili', uid, 'throttled')
+                limiter.on_throttle()
+                print(f"⚠️  UID {uid} 触发风控，降速后重试... (尝试 {attempt + 1}/{retry_count})")
+                continue
+            
+            # 成功获取数据
+            limiter.on_success()
+            size = estimated_size(videos)
+            # 原始 vlist 条目字段很多，这里就转换成 VideoRecord，原始数据不再往下传
+            records = [VideoRecord.from_bilibili(v, uid) for v in videos.get('list', {}).get('vlist', [])]
+            metrics.inc('bilibili', uid, 'bytes_estimated', size)
+            response_cache.store('bilibili', cache_key, [v.to_dict() for v in records], size)
+            return records
+            
+        except Exception as e:
+            error_msg = str(e)
+            # 检查是否是风控错误
+            if '-352' in error_msg or '风控' in error_msg:
+                metrics.inc('bilibili', uid, 'throttled')
+                limiter.on_throttle()
+                if attempt < retry_count - 1:
+                    print(f"⚠️  UID {uid} 触发风控，降速后重试... (尝试 {attempt + 1}/{retry_count})")
                     continue
-                
-                # 成功获取数据
-                await asyncio.sleep(1)  # 增加延迟，避免触发风控
-                return videos.get('list', {}).get('vlist', [])
-                
-            except Exception as e:
-                error_msg = str(e)
-                # 检查是否是风控错误
-                if '-352' in error_msg or '风控' in error_msg:
-                    wait_time = (attempt + 1) * 3
-                    if attempt < retry_count - 1:
-                        print(f"⚠️  UID {uid} 触发风控，等待 {wait_time} 秒后重试... (尝试 {attempt + 1}/{retry_count})")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    else:
-                        print(f"❌ UID {uid} 获取失败（风控限制）: {error_msg}")
-                        return []
                 else:
-                    # 其他错误，直接返回
-                    print(f"❌ UID {uid} 获取失败: {error_msg}")
-                    return []
+                    print(f"❌ UID {uid} 获取失败（风控限制）: {error_msg}")
+                    channel_health.note_error('bilibili', uid, THROTTLED, error_msg)
+                    return None
+            else:
+                # 其他错误（账号不存在等）重试也没用，直接返回
+                print(f"❌ UID {uid} 获取失败: {error_msg}")
+                channel_health.note_error('bilibili', uid, bilibili_error_class(e), error_msg)
+                return None
+    
+    # 所有重试都失败
+    print(f"❌ UID {uid} 获取失败，已重试 {retry_count} 次")
+    channel_health.note_error('bilibili', uid, THROTTLED, f"风控重试 {retry_count} 次仍失败")
+    return None
+
+async def fetch_videos_from_up(uid, limiter, cursors=None, since=0, retry_count=3):
+    """增量获取UP主视频
+
+    - cursors: CursorStore，遇到游标（上次见过的最新视频）即停止
+    - since: 时间窗口起点，早于它的视频不再翻页；两者都未提供时只取第一页
+    只有整页都是新视频时才翻到下一页（周报模式下多产的UP主一页不够）。
+    获取失败返回 None，没有新视频返回 []
+    """
+    new_videos = []
+    complete = False
+    for pn in range(1, BILIBILI_MAX_PAGES + 1):
+        vlist = await fetch_video_page(uid, limiter, pn=pn, retry_count=retry_count)
+        if vlist is None:
+            if pn == 1:
+                return None
+            # 后续页失败：保留已获取的部分，但不推进游标，避免跳过中间的视频
+            break
         
-        # 所有重试都失败
-        print(f"❌ UID {uid} 获取失败，已重试 {retry_count} 次")
-        return []
-
-async def fetch_youtube_videos(channel_id, semaphore, retry_count=3):
-    """获取YouTube频道视频，带重试机制"""
-    async with semaphore:
-        youtube_api_key = os.environ.get("YOUTUBE_API_KEY")
-        if not youtube_api_key:
-            print(f"⚠️  YOUTUBE_API_KEY 未设置，跳过 YouTube 频道 {channel_id}")
-            return []
+        metrics.inc('bilibili', uid, 'items', len(vlist))
+        for v in vlist:
+            if cursors and cursors.is_seen('bilibili', uid, v.id, v.created):
+                complete = True
+                break
+            if v.created < since:
+                complete = True
+                break
+            new_videos.append(v)
         
-        for attempt in range(retry_count):
-            try:
-                # 使用 asyncio.to_thread 包装同步的 YouTube API 调用
-                def get_videos_sync():
-                    youtube = build('youtube', 'v3', developerKey=youtube_api_key)
-                    
-                    # 第一步：获取 channel 信息和 uploads playlist ID
-                    channel_response = youtube.channels().list(
-                        part='contentDetails,snippet',
-                        id=channel_id
-                    ).execute()
-                    
-                    if not channel_response.get('items'):
-                        return None, None
-                    
-                    channel_info = channel_response['items'][0]
-                    uploads_playlist_id = channel_info['contentDetails']['relatedPlaylists']['uploads']
-                    channel_name = channel_info['snippet']['title']
-                    
-                    # 第二步：获取 uploads playlist 中的最新视频
-                    playlist_response = youtube.playlistItems().list(
-                        part='snippet,contentDetails',
-                        playlistId=uploads_playlist_id,
-                        maxResults=10
-                    ).execute()
-                    
-                    videos = []
-                    for item in playlist_response.get('items', []):
-                        snippet = item['snippet']
-                        video_id = snippet['resourceId']['videoId']
-                        title = snippet['title']
-                        description = snippet.get('description', '')
-                        # YouTube API 返回 ISO 8601 格式时间，转换为时间戳
-                        published_at = snippet['publishedAt']
-                        published_dt = datetime.datetime.fromisoformat(published_at.replace('Z', '+00:00'))
-                        created_timestamp = int(published_dt.timestamp())
-                        
-                        videos.append({
-                            'video_id': video_id,
-                            'title': title,
-                            'description': description,
-                            'created': created_timestamp,
-                            'author': channel_name,
-                            'platform': 'youtube',
-                            'channel_id': channel_id
-                        })
-                    
-                    return videos, channel_name
-                
-                videos, channel_name = await asyncio.to_thread(get_videos_sync)
-                
-                if videos is None:
-                    print(f"❌ YouTube 频道 {channel_id} 不存在或无法访问")
-                    return []
-                
-                if videos:
-                    print(f"✓ YouTube 频道 {channel_id} ({channel_name}): 获取到 {len(videos)} 个视频")
-                
-                await asyncio.sleep(1)  # 延迟，避免触发 API 限制
-                return videos
-                
-            except Exception as e:
-                error_msg = str(e)
-                # 检查是否是配额错误
-                if 'quota' in error_msg.lower() or 'quotaExceeded' in error_msg:
-                    print(f"❌ YouTube API 配额耗尽，无法获取频道 {channel_id} 的视频")
-                    return []
+        if complete or len(vlist) < BILIBILI_PAGE_SIZE or (cursors is None and not since):
+            complete = True
+            break
+    else:
+        # 达到翻页上限：更早的视频本来也取不到，照常推进游标
+        complete = True
+    
+    if cursors and complete:
+        cursors.advance('bilibili', uid, [(v.created, v.id) for v in new_videos])
+    return new_videos
+
+async def _resolved(value):
+    return value
+
+async def fetch_bilibili_timeline(feed, uids, produce, since, cursors=None):
+    """动态时间线模式：翻一条时间线拿到所有已关注UP主的新视频，逐个交给 produce
+
+    返回仍需逐个抓取的UP主：账号未关注的，或时间线获取失败 / 没翻到 since 时的全部。
+    """
+    try:
+        followed = await feed.followings()
+        videos, complete = await feed.timeline(since)
+    except Exception as e:
+        print(f"⚠️  B站动态时间线获取失败，全部回退到逐个UP主抓取: {e}")
+        return uids
+    if not complete:
+        print(f"⚠️  B站动态时间线翻了 {BILIBILI_FEED_MAX_PAGES} 页仍未覆盖时间窗口，全部回退到逐个UP主抓取"
+              f"（可调大 BILIBILI_FEED_MAX_PAGES）")
+        return uids
+    
+    by_uid = {}
+    for v in videos:
+        by_uid.setdefault(v.channel, []).append(v)
+    covered = [uid for uid in uids if uid in followed]
+    fallback = [uid for uid in uids if uid not in followed]
+    for uid in covered:
+        new_videos = by_uid.get(uid, [])
+        metrics.inc('bilibili', uid, 'items', len(new_videos))
+        if cursors:
+            cursors.advance('bilibili', uid, [(v.created, v.id) for v in new_videos])
+        await produce('bilibili', uid, _resolved(new_videos))
+    print(f"B站动态时间线：{feed.requests} 次请求覆盖 {len(covered)} 个UP主，"
+          f"{len(fallback)} 个未关注的UP主逐个抓取")
+    return fallback
+
+_youtube_client = None
+_thread_local = threading.local()
+
+def get_youtube_client():
+    """整个运行期间共用一个 YouTube 客户端（discovery 文档只解析一次）"""
+    global _youtube_client
+    if _youtube_client is None:
+        from googleapiclient.discovery import build
+        _youtube_client = build('youtube', 'v3', developerKey=os.environ.get("YOUTUBE_API_KEY"),
+                                cache_discovery=False)
+    return _youtube_client
+
+def _thread_http():
+    """httplib2.Http 不是线程安全的：共用客户端，但每个工作线程使用自己的连接"""
+    if not hasattr(_thread_local, 'http'):
+        import httplib2
+        _thread_local.http = httplib2.Http(timeout=30)
+    return _thread_local.http
+
+def resolve_youtube_channels(channel_ids):
+    """补全频道元数据缓存：只查询缓存中没有的频道，每次 channels().list 最多批量查询 50 个"""
+    missing = channel_cache.missing('youtube', channel_ids)
+    if not missing:
+        return
+    youtube = get_youtube_client()
+    for i in range(0, len(missing), YOUTUBE_BATCH_SIZE):
+        batch = missing[i:i + YOUTUBE_BATCH_SIZE]
+        youtube_quota.charge('channels.list')
+        response = youtube.channels().list(
+            part='contentDetails,snippet',
+            id=','.join(batch),
+            maxResults=YOUTUBE_BATCH_SIZE
+        ).execute(http=_thread_http())
+        for item in response.get('items', []):
+            channel_cache.put(
+                'youtube', item['id'],
+                name=item['snippet']['title'],
+                avatar=item['snippet'].get('thumbnails', {}).get('default', {}).get('url'),
+                uploads_playlist_id=item['contentDetails']['relatedPlaylists']['uploads'],
+            )
+    print(f"YouTube 频道元数据：新查询 {len(missing)} 个频道（{(len(missing) + YOUTUBE_BATCH_SIZE - 1) // YOUTUBE_BATCH_SIZE} 次请求）")
+
+def plan_youtube_channels(channel_ids):
+    """按剩余配额规划本次轮询的频道，配额不够时优先轮询发布频繁、久未轮询的频道"""
+    missing = channel_cache.missing('youtube', channel_ids)
+    resolve_cost = -(-len(missing) // YOUTUBE_BATCH_SIZE) * API_COSTS['channels.list']  # 批次数向上取整
+    selected, skipped = youtube_quota.plan(
+        channel_ids,
+        cost_per_channel=API_COSTS['playlistItems.list'],
+        posts_lookup=lambda cid: (cursors.get('youtube', cid) or {}).get('posts', []),
+        fixed_cost=resolve_cost,
+    )
+    if skipped:
+        print(f"⚠️  YouTube 剩余配额 {youtube_quota.remaining} 单位，本次跳过 {len(skipped)} 个低优先级频道")
+    return selected
+
+def plan_youtube_shares(channel_ids):
+    """分片模式：按剩余配额规划本次轮询的频道，返回 {频道ID: 该任务最多可用的配额单位}
+
+    工作进程各自查询元数据（每个频道一次 channels().list），所以元数据未缓存的频道多分一次查询的份额；
+    按优先级依次分配，所有份额加起来不超过剩余配额，工作进程再多也不会超支。没分到份额的频道不在返回值里。
+    """
+    missing = set(channel_cache.missing('youtube', channel_ids))
+    ranked, _ = youtube_quota.plan(
+        channel_ids,
+        cost_per_channel=API_COSTS['playlistItems.list'],
+        posts_lookup=lambda cid: (cursors.get('youtube', cid) or {}).get('posts', []),
+    )
+    shares = {}
+    left = youtube_quota.remaining
+    for channel_id in ranked:
+        units = API_COSTS['playlistItems.list'] + (API_COSTS['channels.list'] if channel_id in missing else 0)
+        if units <= left:
+            shares[channel_id] = units
+            left -= units
+    if len(shares) < len(channel_ids):
+        print(f"⚠️  YouTube 剩余配额 {youtube_quota.remaining} 单位，"
+              f"本次 {len(channel_ids) - len(shares)} 个低优先级频道不分配 API 配额")
+    return shares
+
+def playlist_item_record(item, channel_id, author):
+    """playlistItems().list 返回的一条 -> VideoRecord"""
+    snippet = item['snippet']
+    return VideoRecord.from_youtube(
+        snippet['resourceId']['videoId'], channel_id, author,
+        snippet['title'], snippet.get('description', ''), snippet['publishedAt'],
+    )
+
+async def fetch_youtube_videos(channel_id, limiter, retry_count=3, feed=None):
+    """获取YouTube频道视频，带重试机制。获取失败返回 None，没有新视频返回 []
+
+    - 传入 feed (YoutubeFeedFetcher) 时优先读取频道订阅源，不消耗 API 配额；订阅源失败时回退到 API
+    - API 路径：频道名字和 uploads playlist ID 来自频道元数据缓存（由 resolve_youtube_channels 批量补全），
+      每个频道每次运行只需一次 playlistItems().list 调用
+    """
+    if feed is not None:
+        videos = await feed.fetch(channel_id)
+        if videos is not None:
+            metrics.inc('youtube', channel_id, 'items', len(videos))
+            if videos:
+                print(f"✓ YouTube 频道 {channel_id}（订阅源）: 获取到 {len(videos)} 个视频")
+            cursors.advance('youtube', channel_id, [(v.created, v.id) for v in videos])
+            return videos
+        print(f"   YouTube 频道 {channel_id} 回退到 API 获取")
+    
+    youtube_api_key = os.environ.get("YOUTUBE_API_KEY")
+    if not youtube_api_key:
+        print(f"⚠️  YOUTUBE_API_KEY 未设置，跳过 YouTube 频道 {channel_id}")
+        channel_health.note_error('youtube', channel_id, CONFIG, "YOUTUBE_API_KEY 未设置")
+        return None
+    
+    if not channel_cache.get('youtube', channel_id):
+        try:
+            await asyncio.to_thread(resolve_youtube_channels, [channel_id])
+        except Exception as e:
+            print(f"⚠️  YouTube 频道 {channel_id} 元数据查询失败: {e}")
+    meta = channel_cache.get('youtube', channel_id)
+    if not meta:
+        print(f"❌ YouTube 频道 {channel_id} 不存在或无法访问")
+        channel_health.note_error('youtube', channel_id, NOT_FOUND, "channels().list 没有返回该频道")
+        return None
+    channel_name = meta['name']
+    
+    cache_key = response_cache.make_key('youtube', meta['uploads_playlist_id'])
+    cached = response_cache.get_fresh('youtube', cache_key)
+    if cached is not None:
+        metrics.inc('youtube', channel_id, 'cache_hits')
+        return [VideoRecord.from_dict(v, platform='youtube', channel=channel_id) for v in cached]
+    
+    for attempt in range(retry_count):
+        if attempt:
+            metrics.inc('youtube', channel_id, 'retries')
+        try:
+            # 使用 asyncio.to_thread 包装同步的 YouTube API 调用
+            def get_videos_sync():
+                playlist_response = get_youtube_client().playlistItems().list(
+                    part='snippet,contentDetails',
+                    playlistId=meta['uploads_playlist_id'],
+                    maxResults=10
+                ).execute(http=_thread_http())
                 
-                wait_time = (attempt + 1) * 2
-                if attempt < retry_count - 1:
-                    print(f"⚠️  YouTube 频道 {channel_id} 获取失败，等待 {wait_time} 秒后重试... (尝试 {attempt + 1}/{retry_count})")
-                    print(f"   错误: {error_msg}")
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    print(f"❌ YouTube 频道 {channel_id} 获取失败: {error_msg}")
-                    return []
-        
-        # 所有重试都失败
-        print(f"❌ YouTube 频道 {channel_id} 获取失败，已重试 {retry_count} 次")
-        return []
+                response_size = estimated_size(playlist_response)
+                videos = [playlist_item_record(item, channel_id, channel_name)
+                          for item in playlist_response.get('items', [])]
+                return videos, response_size
+            
+            youtube_quota.charge('playlistItems.list')
+            async with limiter:
+                with metrics.request('youtube', channel_id):
+                    videos, response_size = await asyncio.to_thread(get_videos_sync)
+            metrics.inc('youtube', channel_id, 'bytes_estimated', response_size)
+            metrics.inc('youtube', channel_id, 'items', len(videos))
+            response_cache.store('youtube', cache_key, [v.to_dict() for v in videos], response_size)
+            
+            if videos:
+                print(f"✓ YouTube 频道 {channel_id} ({channel_name}): 获取到 {len(videos)} 个视频")
+            
+            limiter.on_success()
+            youtube_quota.mark_polled(channel_id)
+            # 记录发布时间，用于估算发布频率（配额规划按频率排优先级）
+            cursors.advance('youtube', channel_id, [(v.created, v.id) for v in videos])
+            return videos
+            
+        except QuotaExhausted as e:
+            print(f"❌ {e}，跳过频道 {channel_id}")
+            channel_health.note_error('youtube', channel_id, QUOTA, str(e))
+            return None
+        except Exception as e:
+            error_msg = str(e)
+            # 检查是否是配额错误
+            if 'quota' in error_msg.lower() or 'quotaExceeded' in error_msg:
+                youtube_quota.mark_exhausted()
+                print(f"❌ YouTube API 配额耗尽，无法获取频道 {channel_id} 的视频")
+                channel_health.note_error('youtube', channel_id, QUOTA, error_msg)
+                return None
+            # 播放列表不存在 / 无权访问（频道已删除或设为私享）：重试也没用，也不是限流问题
+            if getattr(getattr(e, 'resp', None), 'status', None) in (403, 404):
+                print(f"❌ YouTube 频道 {channel_id} 的上传列表无法访问: {error_msg}")
+                channel_health.note_error('youtube', channel_id, NOT_FOUND, error_msg)
+                return None
+            
+            metrics.inc('youtube', channel_id, 'throttled')
+            limiter.on_throttle()
+            if attempt < retry_count - 1:
+                print(f"⚠️  YouTube 频道 {channel_id} 获取失败，降速后重试... (尝试 {attempt + 1}/{retry_count})")
+                print(f"   错误: {error_msg}")
+                continue
+            else:
+                print(f"❌ YouTube 频道 {channel_id} 获取失败: {error_msg}")
+                channel_health.note_error('youtube', channel_id, youtube_error_class(e), error_msg)
+                return None
+    
+    # 所有重试都失败
+    print(f"❌ YouTube 频道 {channel_id} 获取失败，已重试 {retry_count} 次")
+    channel_health.note_error('youtube', channel_id, NETWORK, f"重试 {retry_count} 次仍失败")
+    return None
+
+async def fetch_all_youtube(channel_ids, limiters, produce, feed=None):
+    """抓取YouTube频道，每个频道抓完即交给 produce(platform, channel_id, coro)
+
+    - feed: 已打开的 YoutubeFeedFetcher（启用订阅源时由 YoutubeSource 打开），所有频道都先走订阅源
+    - 没有 feed 时按剩余配额规划频道并批量补全元数据后走 API
+    """
+    if feed is None and os.environ.get("YOUTUBE_API_KEY"):
+        channel_ids = plan_youtube_channels(channel_ids)
+        try:
+            await asyncio.to_thread(resolve_youtube_channels, channel_ids)
+        except Exception as e:
+            print(f"⚠️  YouTube 频道元数据查询失败: {e}")
+    await asyncio.gather(*[
+        produce('youtube', channel_id, fetch_youtube_videos(channel_id, limiters['youtube'], feed=feed))
+        for channel_id in channel_ids
+    ])
+
+@register_source
+class BilibiliSource(SourceAdapter):
+    """B站UP主投稿：按页增量抓取，遇到游标（上次见过的最新视频）或时间窗口起点即停止"""
+    platform = 'bilibili'
+    label = 'B站'
+    channel_label = 'UID'
+    video_url = VIDEO_URLS['bilibili']
+    rate_limits = {name: RATE_LIMIT_CONFIG[name] for name in ('bilibili', 'bilibili_feed')}
+    cache_ttls = {name: RESPONSE_CACHE_TTL[name] for name in ('bilibili', 'bilibili_follow')}
+
+    def __init__(self, limiters, incremental=True, cache=None):
+        super().__init__(limiters, incremental, cache)
+        self.dynamic_feed = None
+
+    async def __aenter__(self):
+        sessdata = os.environ.get("BILIBILI_SESSDATA")
+        if BILIBILI_DYNAMIC_FEED and self.channels():
+            if sessdata:
+                self.dynamic_feed = await dynamic_feed_class()(
+                    sessdata, self.limiters['bilibili_feed'], self.cache,
+                    max_pages=BILIBILI_FEED_MAX_PAGES, metrics=metrics,
+                ).__aenter__()
+            else:
+                print("⚠️  BILIBILI_DYNAMIC_FEED 已开启但未设置 BILIBILI_SESSDATA，逐个UP主抓取")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.dynamic_feed is not None:
+            await self.dynamic_feed.__aexit__(exc_type, exc, tb)
+            self.dynamic_feed = None
+
+    @classmethod
+    def channels(cls):
+        return list(TARGET_UIDS)
+
+    @classmethod
+    def skips_keywords(cls, channel_id):
+        return channel_id in NO_FILTER_UIDS
+
+    @classmethod
+    def parse_channel_id(cls, value):
+        return int(value)
+
+    async def fetch(self, channel_id, since):
+        return await fetch_videos_from_up(channel_id, self.limiters['bilibili'],
+                                          cursors=cursors if self.incremental else None, since=since)
+
+    async def fetch_all(self, channel_ids, produce, since):
+        if self.dynamic_feed is not None:
+            channel_ids = await fetch_bilibili_timeline(self.dynamic_feed, channel_ids, produce, since,
+                                                        cursors=cursors if self.incremental else None)
+        await super().fetch_all(channel_ids, produce, since)
+
+@register_source
+class YoutubeSource(SourceAdapter):
+    """YouTube 频道：优先读订阅源（不消耗配额），否则按配额规划走 Data API"""
+    platform = 'youtube'
+    label = 'YouTube'
+    channel_label = 'YouTube 频道'
+    video_url = VIDEO_URLS['youtube']
+    rate_limits = {name: RATE_LIMIT_CONFIG[name] for name in ('youtube', 'youtube_feed')}
+    cache_ttls = {name: RESPONSE_CACHE_TTL[name] for name in ('youtube', 'youtube_feed')}
+
+    def __init__(self, limiters, incremental=True, cache=None):
+        super().__init__(limiters, incremental, cache)
+        self.feed = None
+
+    async def __aenter__(self):
+        # 订阅源的连接池在适配器打开期间共用（常驻模式下跨轮次复用）
+        if YOUTUBE_USE_FEED and self.channels():
+            self.feed = await feed_fetcher_class()(self.limiters['youtube_feed'], self.cache, metrics=metrics).__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.feed is not None:
+            await self.feed.__aexit__(exc_type, exc, tb)
+            print(f"YouTube 订阅源：共下载 {self.feed.downloaded_bytes / 1024:.1f} KB")
+            self.feed = None
+
+    @classmethod
+    def channels(cls):
+        return list(YOUTUBE_CHANNELS)
+
+    @classmethod
+    def skips_keywords(cls, channel_id):
+        return channel_id in YOUTUBE_NO_FILTER_CHANNELS
+
+    async def fetch(self, channel_id, since):
+        return await fetch_youtube_videos(channel_id, self.limiters['youtube'], feed=self.feed)
+
+    async def fetch_all(self, channel_ids, produce, since):
+        await fetch_all_youtube(channel_ids, self.limiters, produce=produce, feed=self.feed)
+
+def create_sources(limiters, incremental=True):
+    """所有已注册数据源的适配器（内置的 B站 / YouTube 以及通过 entry point 注册的插件），共用抓取缓存"""
+    return [cls(limiters, incremental, cache=response_cache) for cls in source_classes()]
+
+def all_channels():
+    """所有数据源要监控的 [(platform, channel_id), ...]"""
+    return [(cls.platform, channel_id) for cls in source_classes() for channel_id in cls.channels()]
+
+@contextlib.asynccontextmanager
+async def open_sources(sources):
+    """打开各适配器（共享会话等），退出时关闭"""
+    async with contextlib.AsyncExitStack() as stack:
+        for source in sources:
+            await stack.enter_async_context(source)
+        yield sources
+
+_keyword_matcher = None
+
+def get_keyword_matcher():
+    """关键词匹配器只在第一次使用时构建一次"""
+    global _keyword_matcher
+    if _keyword_matcher is None:
+        _keyword_matcher = KeywordMatcher(KEYWORDS, NEGATIVE_KEYWORDS, CHANNEL_KEYWORDS)
+    return _keyword_matcher
 
 async def filter_content(video_data, time_config, up_uid=None, platform='bilibili'):
     """【过滤层】增加了严格的时间判断和特殊UP主支持，支持B站和YouTube"""
     # 1. 【新增】严格的时间过滤
     # created 是视频发布时间戳
-    video_time = video_data['created']
+    video_time = video_data.created
     # 如果 (当前时间 - 视频时间) > 允许的时间窗口，则说明是旧视频
     if (time_config['now'] - video_time) > time_config['window']:
+        metrics.inc(platform, up_uid, 'filtered_time')
         return False
 
     # 2. 特殊UP主/频道检查：如果在NO_FILTER列表中，跳过关键词过滤
-    if platform == 'bilibili' and up_uid and up_uid in NO_FILTER_UIDS:
-        return True
-    elif platform == 'youtube' and up_uid and up_uid in YOUTUBE_NO_FILTER_CHANNELS:
+    if up_uid and get_source_class(platform).skips_keywords(up_uid):
         return True
 
     # 3. 关键词硬过滤（仅对普通UP主/频道）
-    title = video_data['title']
-    # 修复简介可能为空的bug
-    desc = video_data.get('description', '')
-    full_text = (title + desc).lower()
-    
-    hit_keyword = False
-    for kw in KEYWORDS:
-        if kw.lower() in full_text:
-            hit_keyword = True
-            break
-    
-    if not hit_keyword:
-        return False
+    result = get_keyword_matcher().match(video_data.title + '\n' + video_data.desc, channel=up_uid)
+    # 记录命中的关键词，便于在通知中展示
+    video_data.matched_keywords = result.matched
+    if not result.accepted:
+        metrics.inc(platform, up_uid, 'filtered_keyword')
+    return result.accepted
 
-    return True
+_notifier = None
+
+def get_notifier():
+    """共用的通知发送器（一个 SMTP 连接 + 发件箱），邮箱未配置时返回 None"""
+    global _notifier
+    if _notifier is None:
+        sender_email = os.environ.get("GMAIL_SENDER")
+        app_password = os.environ.get("GMAIL_APP_PASSWORD")
+        recipients = parse_recipients(os.environ.get("GMAIL_RECIPIENT"))
+        # 自定义 SMTP 服务器（如本地 SMTP 桩）可以不需要登录
+        if not sender_email or not recipients or (not app_password and SMTP_HOST == "smtp.gmail.com"):
+            return None
+        transport = SmtpTransport(SMTP_HOST, SMTP_PORT, username=sender_email if app_password else None,
+                                  password=app_password, starttls=SMTP_STARTTLS, max_retries=SMTP_MAX_RETRIES)
+        _notifier = Notifier(transport, sender_email, recipients, Outbox(OUTBOX_DIR))
+    return _notifier
 
 async def send_notification(content, title_prefix):
-    """使用Gmail SMTP发送邮件通知"""
-    sender_email = os.environ.get("GMAIL_SENDER")
-    app_password = os.environ.get("GMAIL_APP_PASSWORD")
-    recipient_email = os.environ.get("GMAIL_RECIPIENT")
-    
-    if not sender_email or not app_password or not recipient_email:
+    """发送邮件通知：先补发发件箱，再给每个收件人（GMAIL_RECIPIENT，逗号分隔）各发一封
+
+    content 可以是所有人相同的正文（HTML 字符串或 render_digest 的结果），也可以是 {收件人: 正文}。
+    返回 SENT（全部发出）/ SPOOLED（有邮件发送失败，已存入发件箱）/ FAILED（邮箱未配置）
+    """
+    notifier = get_notifier()
+    if notifier is None:
         print("❌ Gmail配置未设置（需要：GMAIL_SENDER, GMAIL_APP_PASSWORD, GMAIL_RECIPIENT）")
-        return False
-    
-    # 构建HTML格式的邮件内容
-    html_content = f"""
-    <html>
-    <head>
-        <meta charset="utf-8">
-    </head>
-    <body>
-        <h3>{title_prefix}</h3>
-        {content}
-    </body>
-    </html>
+        return FAILED
+    await notifier.flush_outbox()
+    return await notifier.send(title_prefix, content)
+
+async def flush_outbox():
+    """没有新通知时也补发发件箱"""
+    notifier = get_notifier()
+    if notifier is not None:
+        await notifier.flush_outbox()
+
+def close_notifier():
+    if _notifier is not None:
+        _notifier.close()
+
+def render_digest(videos):
+    """生成通知邮件正文，返回 RenderedDigest(html, text)"""
+    return renderer.render(videos)
+
+async def accept_videos(videos, config, channel_id, platform, valid_videos):
+    """对一个UP主/频道的抓取结果做去重和关键词过滤，通过的加入 valid_videos 并记入记忆"""
+    source = get_source_class(platform)
+    for v in videos:
+        # 记忆去重：历史记录中的 key 由适配器决定（YouTube 为 "yt:video_id"）
+        key = source.video_key(v.id)
+        if memory.is_processed(key):
+            metrics.inc(platform, channel_id, 'filtered_history')
+            continue
+        # 传入 config 和 UID/Channel ID 进行过滤判断
+        if await filter_content(v, config, up_uid=channel_id, platform=platform):
+            metrics.inc(platform, channel_id, 'accepted')
+            print(f"发现新视频（{source.label}）：{v.title}")
+            valid_videos.append(v)
+            memory.add(key)
+
+async def collect_new_videos(config, sources, channels=None):
+    """流式抓取 + 过滤
+
+    各数据源的抓取器同时运行，每个UP主/频道抓完即放入有界队列；过滤工作协程边收边做去重和关键词过滤。
+    - 队列满时抓取器会等待（背压），原始结果处理完即释放，不会全部堆在内存里
+    - 每个平台的并发和速率由各自的限流器独立控制
+    - sources: 已打开的适配器（见 open_sources）
+    - channels: {platform: [频道ID, ...]}，只抓取这些UP主/频道（默认各数据源的全部频道）
+    - 熔断中的频道冷却期内不抓取（计入 stats['skipped']），每个频道的成败记入 channel_health
+    返回 (符合条件的视频列表, 统计信息)
     """
+    queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    valid_videos = []
+    stats = {'success': 0, 'fail': 0, 'skipped': 0, 'timings': {}}
+    since = config['now'] - config['window']
     
-    # 创建邮件消息
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = title_prefix
-    msg['From'] = sender_email
-    msg['To'] = recipient_email
-    
-    # 添加HTML内容
-    html_part = MIMEText(html_content, 'html', 'utf-8')
-    msg.attach(html_part)
+    def add_timing(stage, seconds):
+        metrics.add_stage(stage, seconds)
+        label = STAGE_LABELS[stage]
+        stats['timings'][label] = stats['timings'].get(label, 0.0) + seconds
     
-    # 使用asyncio.to_thread包装同步SMTP调用
-    def send_email_sync():
-        """同步发送邮件函数"""
+    async def produce(platform, channel_id, coro):
         try:
-            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                server.starttls()
-                server.login(sender_email, app_password)
-                server.send_message(msg)
-            return True, None
+            result = await coro
         except Exception as e:
-            return False, str(e)
+            result = e
+        start = time.perf_counter()
+        await queue.put((platform, channel_id, result))
+        add_timing('queue_wait', time.perf_counter() - start)
     
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            start = time.perf_counter()
+            platform, channel_id, result = item
+            platform_name = get_source_class(platform).channel_label
+            if isinstance(result, Exception):
+                stats['fail'] += 1
+                metrics.inc(platform, channel_id, 'failures')
+                channel_health.record_failure(platform, channel_id, EXCEPTION, str(result))
+                print(f"❌ {platform_name} {channel_id}（{channel_name(platform, channel_id)}）获取异常: {result}")
+            elif result is None:
+                stats['fail'] += 1
+                metrics.inc(platform, channel_id, 'failures')
+                channel_health.record_failure(platform, channel_id)
+            else:
+                stats['success'] += 1
+                channel_health.record_success(platform, channel_id)
+                await accept_videos(result, config, channel_id, platform, valid_videos)
+            add_timing('filter', time.perf_counter() - start)
+            queue.task_done()
+    
+    async def timed_stage(stage, coro):
+        start = time.perf_counter()
+        await coro
+        add_timing(stage, time.perf_counter() - start)
+    
+    consumers = [asyncio.create_task(consume()) for _ in range(PIPELINE_FILTER_WORKERS)]
+    start = time.perf_counter()
+    stages = []
+    for source in sources:
+        channel_ids = source.channels() if channels is None else channels.get(source.platform, [])
+        channel_ids, skipped = channel_health.partition(source.platform, channel_ids)
+        stats['skipped'] += len(skipped)
+        if channel_ids:
+            stages.append(timed_stage(f'fetch_{source.platform}', source.fetch_all(channel_ids, produce, since)))
     try:
-        success, error_msg = await asyncio.to_thread(send_email_sync)
-        if success:
-            print(f"✅ 邮件发送成功")
-            return True
-        else:
-            print(f"❌ 邮件发送失败: {error_msg}")
-            import traceback
-            traceback.print_exc()
-            return False
-    except Exception as e:
-        print(f"❌ 邮件发送异常: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return False
+        await asyncio.gather(*stages)
+    finally:
+        for _ in consumers:
+            await queue.put(None)
+        await asyncio.gather(*consumers)
+    add_timing('total', time.perf_counter() - start)
+    return valid_videos, stats
 
 async def main():
+    init_state()
     # 1. 获取今日策略 (周报 vs 日报)
     config = get_time_config()
     
-    print(f"开始监控 {len(TARGET_UIDS)} 个B站UP主...")
-    if YOUTUBE_CHANNELS:
-        print(f"开始监控 {len(YOUTUBE_CHANNELS)} 个YouTube频道...")
-    print(f"并发限制: {CONCURRENCY_LIMIT}")
+    for cls in source_classes():
+        if cls.channels():
+            print(f"开始监控 {len(cls.channels())} 个{cls.label}{'UP主' if cls.platform == 'bilibili' else '频道'}...")
+    for platform, params in rate_limit_config().items():
+        print(f"限流策略 [{platform}]: 初始 {params['initial_rate']} 次/秒，上限 {params['max_rate']} 次/秒，最大并发 {params['max_concurrency']}")
     print("")
     
-    valid_videos = []
-    success_count = 0
-    fail_count = 0
-    
-    # 2. 获取B站视频
-    semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
-    bilibili_tasks = [fetch_videos_from_up(uid, semaphore) for uid in TARGET_UIDS]
-    bilibili_results = await asyncio.gather(*bilibili_tasks, return_exceptions=True)
-    
-    for i, result in enumerate(bilibili_results):
-        if isinstance(result, Exception):
-            fail_count += 1
-            print(f"❌ UID {TARGET_UIDS[i]} 获取异常: {result}")
-            continue
-        
-        if not result:
-            fail_count += 1
-            continue
-        
-        success_count += 1
-        current_uid = TARGET_UIDS[i]  # 当前UP主的UID
-        for v in result:
-            bvid = v['bvid']
-            
-            # 记忆去重
-            if memory.is_processed(bvid):
-                continue
-            
-            # 传入 config 和 UID 进行过滤判断
-            if await filter_content(v, config, up_uid=current_uid, platform='bilibili'):
-                print(f"发现新视频（B站）：{v['title']}")
-                valid_videos.append(v)
-                memory.add(bvid, platform='bilibili')
-    
-    # 3. 获取YouTube视频
-    youtube_channel_ids = list(YOUTUBE_CHANNELS.keys())
-    if youtube_channel_ids:
-        youtube_tasks = [fetch_youtube_videos(channel_id, semaphore) for channel_id in youtube_channel_ids]
-        youtube_results = await asyncio.gather(*youtube_tasks, return_exceptions=True)
-        
-        for i, result in enumerate(youtube_results):
-            channel_id = youtube_channel_ids[i]
-            
-            if isinstance(result, Exception):
-                fail_count += 1
-                print(f"❌ YouTube 频道 {channel_id} 获取异常: {result}")
-                continue
-            
-            if not result:
-                fail_count += 1
-                continue
-            
-            success_count += 1
-            for v in result:
-                video_id = v['video_id']
-                
-                # 记忆去重（使用 "yt:video_id" 格式）
-                if memory.is_processed(video_id):
-                    continue
-                
-                # 传入 config 和 Channel ID 进行过滤判断
-                if await filter_content(v, config, up_uid=channel_id, platform='youtube'):
-                    print(f"发现新视频（YouTube）：{v['title']}")
-                    valid_videos.append(v)
-                    memory.add(video_id, platform='youtube')
+    # 2. 所有数据源同时抓取，边抓边过滤
+    limiters = create_rate_limiters()
+    async with open_sources(create_sources(limiters)) as sources:
+        valid_videos, stats = await collect_new_videos(config, sources)
     
-    print(f"\n监控完成：成功 {success_count} 个，失败 {fail_count} 个")
+    print(f"\n监控完成：成功 {stats['success']} 个，失败 {stats['fail']} 个，熔断跳过 {stats['skipped']} 个")
+    print("阶段耗时：" + "，".join(f"{stage} {seconds:.1f}s" for stage, seconds in stats['timings'].items()))
+    for limiter in limiters.values():
+        limiter.log_state("最终状态")
+    if YOUTUBE_CHANNELS:
+        youtube_quota.report()
+    response_cache.report()
+    channel_health.report(names=channel_name, labels=PLATFORM_LABELS)
 
+    await notify_and_save(config, valid_videos)
+
+async def notify_and_save(config, valid_videos):
+    """发送本次的通知并保存所有状态；通知没有送达（既没发出也没存入发件箱）时不提交历史记录和游标"""
+    delivered = True
     if valid_videos:
-        # 按发布时间倒序排列 (新的在前)
-        valid_videos.sort(key=lambda x: x['created'], reverse=True)
-        
-        msg = "<ul>"
-        for v in valid_videos:
-            # 格式化一下时间，比如 [01-05]
-            time_str = time.strftime("%m-%d", time.localtime(v['created']))
-            platform = v.get('platform', 'bilibili')
-            
-            if platform == 'youtube':
-                video_id = v['video_id']
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                platform_tag = "[YouTube]"
-            else:
-                video_id = v['bvid']
-                video_url = f"https://www.bilibili.com/video/{video_id}"
-                platform_tag = "[B站]"
-            
-            msg += f"<li style='margin-bottom:8px'>[{time_str}] {platform_tag} <b>{v['author']}</b>: <a href='{video_url}'>{v['title']}</a></li>"
-        msg += "</ul>"
+        with metrics.stage('render'):
+            msg = render_digest(valid_videos)
         
-        success = await send_notification(msg, config['title'])
-        if success:
+        with metrics.stage('send'):
+            status = await send_notification(msg, config['title'])
+        if status == SENT:
             print(f"推送成功！共 {len(valid_videos)} 条")
+        elif status == SPOOLED:
+            print(f"推送失败，已存入发件箱，下次运行时补发！共 {len(valid_videos)} 条")
         else:
             print(f"推送失败！共 {len(valid_videos)} 条（请查看上方错误信息）")
+        delivered = status != FAILED
     else:
         print("没有符合条件的新视频。")
+        await flush_outbox()
+
+    close_notifier()
+    save_state(commit=delivered)
+    memory.close()
+    write_metrics()
+
+def write_metrics(verbose=True, **extra):
+    """输出本次运行的指标（JSON-lines + Prometheus textfile）"""
+    if verbose:
+        metrics.report(names=channel_name)
+    try:
+        metrics.write_jsonl(METRICS_JSONL_FILE, **extra)
+        metrics.write_prometheus(METRICS_PROM_FILE)
+    except OSError as e:
+        print(f"⚠️  运行指标写入失败: {e}")
+
+def save_state(commit=True):
+    """保存运行状态
+
+    commit=False 时丢弃本次暂存的历史记录，游标也不保存：游标停在上次提交的位置，
+    下次运行会重新抓到这些视频并再次通知，重跑是幂等的。缓存、配额等与通知无关的状态照常保存。
+    """
+    if commit:
+        memory.commit()
+        cursors.save()
+    else:
+        memory.rollback()
+    channel_cache.save()
+    channel_health.save()
+    youtube_quota.save()
+    response_cache.save()
+
+async def send_digest(digest):
+    """发送待发汇总，返回是否成功；标题按发送时的日报/周报模式"""
+    config = get_time_config(verbose=False)
+    if not digest.videos:
+        print(f"{config['title']}：没有符合条件的新视频。")
+        await flush_outbox()
+        digest.mark_sent()
+        return True
+    status = await send_notification(render_digest(digest.videos), config['title'])
+    if status == FAILED:
+        print(f"推送失败！共 {len(digest.videos)} 条，{DAEMON_DIGEST_RETRY // 60} 分钟后重试")
+        return False
+    if status == SENT:
+        print(f"推送成功！共 {len(digest.videos)} 条")
+    else:
+        # 发件箱里的邮件在下次发送汇总时补发
+        print(f"推送失败，已存入发件箱！共 {len(digest.videos)} 条")
+    digest.mark_sent()
+    return True
 
-    memory.save_and_clean()
+async def run_daemon():
+    """常驻模式：每个UP主/频道按自己的间隔轮询，新视频攒到每天的汇总邮件里
+
+    限流器、YouTube 客户端和订阅源会话在各轮之间复用；收到 SIGTERM/SIGINT 后完成当前一轮、保存状态再退出。
+    """
+    metrics.mode = 'daemon'
+    init_state()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows 不支持 add_signal_handler，只能靠 Ctrl+C 的 KeyboardInterrupt
+            pass
+
+    channels = all_channels()
+    scheduler = PollScheduler(
+        channels,
+        lambda platform, channel_id: (cursors.get(platform, channel_id) or {}).get('posts', []),
+        DAEMON_MIN_POLL, DAEMON_MAX_POLL, DAEMON_DEFAULT_POLL,
+    )
+    digest = DigestQueue()
+    digest_at = next_digest_time(digest.last_sent or time.time(), DAEMON_DIGEST_HOUR_UTC)
+    limiters = create_rate_limiters()
+
+    print(f"常驻模式启动：{len(channels)} 个UP主/频道（"
+          + "，".join(f"{cls.label} {len(cls.channels())} 个" for cls in source_classes()) + f"），"
+          f"待发汇总 {len(digest.videos)} 条")
+    print(f"下次汇总：{datetime.datetime.utcfromtimestamp(digest_at):%Y-%m-%d %H:%M} UTC\n")
+
+    async with open_sources(create_sources(limiters)) as sources:
+        try:
+            while not stop.is_set():
+                now = time.time()
+                due = scheduler.pop_due(now)
+                if due:
+                    config = get_time_config(verbose=False)
+                    channel_health.reset_run()  # 跳过 / 试探次数按轮统计
+                    videos, stats = await collect_new_videos(config, sources, channels=due)
+                    print(f"[{time.strftime('%H:%M:%S')}] 轮询 "
+                          + "、".join(f"{get_source_class(platform).label} {len(ids)} 个" for platform, ids in due.items())
+                          + f"：成功 {stats['success']}，失败 {stats['fail']}，熔断跳过 {stats['skipped']}，新视频 {len(videos)} 条")
+                    for platform, ids in due.items():
+                        for channel_id in ids:
+                            scheduler.reschedule(platform, channel_id)
+                    # 待发汇总本身是持久化的暂存区：先保存汇总再提交历史，避免中途退出时视频被记为已处理却没进汇总
+                    digest.extend(videos)
+                    digest.save()
+                    save_state()
+                    write_metrics(verbose=False)
+                    metrics.reset()
+
+                if time.time() >= digest_at:
+                    if await send_digest(digest):
+                        digest_at = next_digest_time(time.time(), DAEMON_DIGEST_HOUR_UTC)
+                        for limiter in limiters.values():
+                            limiter.log_state("汇总时状态")
+                        response_cache.report()
+                        channel_health.report(names=channel_name, labels=PLATFORM_LABELS)
+                    else:
+                        digest_at = time.time() + DAEMON_DIGEST_RETRY
+                    digest.save()
+
+                wake_at = min(t for t in (scheduler.next_due(), digest_at) if t is not None)
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=max(0, wake_at - time.time()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            print("\n常驻模式退出，保存状态...")
+            close_notifier()
+            digest.save()
+            save_state()
+            memory.close()
+
+async def run_worker(shard, queue_path=SHARD_QUEUE_FILE, worker_id=None):
+    """分片工作进程：从任务队列领取并抓取，结果和游标写回队列，不写本地状态文件（抓取缓存除外）"""
+    from shard_queue import WorkQueue
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    metrics.mode = 'worker'
+    init_state()
+    # 只能使用领取到的任务里协调进程分配的配额份额，本机的 youtube_quota.json 不代表全局用量
+    youtube_quota.allowance = 0
+    queue = WorkQueue(queue_path)
+    limiters = create_rate_limiters()
+    done = 0
+    
+    async with open_sources(create_sources(limiters)) as sources:
+        by_platform = {source.platform: source for source in sources}
+        
+        async def process(platform, cid, payload):
+            source = by_platform[platform]
+            channel_id = source.parse_channel_id(cid)
+            # 游标以协调进程下发的为准，其他机器上的 cursors.json 可能是旧的
+            cursors.put(platform, channel_id, payload.get('cursor'))
+            youtube_quota.grant(payload.get('youtube_quota', 0))
+            had_meta = channel_cache.get(platform, channel_id) is not None
+            last_polled = youtube_quota.state['last_polled'].get(channel_id)
+            error = None
+            with youtube_quota.track() as spend:
+                try:
+                    videos = await source.fetch(channel_id, payload['since'])
+                except Exception as e:
+                    print(f"❌ {platform} {channel_id} 获取异常: {e}")
+                    videos = None
+                    error = (EXCEPTION, str(e))
+            if videos is None and error is None:
+                error = channel_health.take_error(platform, channel_id)
+            # 新查到的频道元数据和 API 轮询时间交给协调进程保存（工作进程不写本地状态文件）
+            meta = None if had_meta else channel_cache.get(platform, channel_id)
+            polled = youtube_quota.state['last_polled'].get(channel_id)
+            queue.complete(platform, cid, worker_id, None if videos is None else [v.to_dict() for v in videos],
+                           cursors.get(platform, channel_id), error=error, youtube_quota=spend['used'],
+                           meta=meta, polled=None if polled == last_polled else polled)
+        
+        while True:
+            tasks = queue.claim(shard, worker_id, limit=SHARD_CLAIM_BATCH,
+                                steal_after=SHARD_STEAL_AFTER, stale_after=SHARD_CLAIM_TIMEOUT)
+            if not tasks:
+                if not queue.pending():
+                    break
+                # 其他分片还有未领取的任务，等到可以接手时再领
+                await asyncio.sleep(1)
+                continue
+            await asyncio.gather(*[process(platform, cid, payload) for platform, cid, payload in tasks])
+            done += len(tasks)
+    
+    queue.finish_worker(worker_id)
+    queue.close()
+    response_cache.save()
+    # 抓取相关的指标由各工作进程记录，协调进程只记录过滤和发送
+    try:
+        metrics.write_jsonl(METRICS_JSONL_FILE, worker=worker_id, shard=shard)
+    except OSError as e:
+        print(f"⚠️  运行指标写入失败: {e}")
+    print(f"工作进程 {worker_id}（分片 {shard}）完成 {done} 个任务")
+
+async def run_sharded(shards, spawn=True, queue_path=SHARD_QUEUE_FILE):
+    """分片模式协调进程：按一致性哈希把UP主/频道分给 shards 个分片，等工作进程抓完后合并
+
+    - spawn=True: 在本机启动 shards 个工作进程
+    - spawn=False: 只建队列，等其他机器上的工作进程（python main.py --worker --shard i --queue ...）
+    去重、过滤、历史记录、游标和通知都只在协调进程里做，结果与单进程运行一致。
+    """
+    from shard_queue import WorkQueue, partition
+    metrics.mode = 'shard'
+    init_state()
+    config = get_time_config()
+    since = config['now'] - config['window']
+    channels = []
+    skipped = 0
+    for platform, channel_id in all_channels():
+        if channel_health.partition(platform, [channel_id])[0]:
+            channels.append((platform, channel_id))
+        else:
+            skipped += 1
+    # YouTube 配额由协调进程统一规划，每个任务带上自己的份额，工作进程只能在份额内调用 API
+    quota_shares = {}
+    if os.environ.get("YOUTUBE_API_KEY"):
+        youtube_ids = [channel_id for platform, channel_id in channels if platform == 'youtube']
+        quota_shares = plan_youtube_shares(youtube_ids)
+        if not YOUTUBE_USE_FEED:
+            # 不走订阅源时没有份额的频道抓不了，直接跳过
+            channels = [(platform, channel_id) for platform, channel_id in channels
+                        if platform != 'youtube' or channel_id in quota_shares]
+    assignment = partition(channels, shards)
+    
+    def payload(platform, channel_id):
+        task = {'since': since, 'cursor': cursors.get(platform, channel_id)}
+        if platform == 'youtube':
+            task['youtube_quota'] = quota_shares.get(channel_id, 0)
+        return task
+    
+    os.makedirs(os.path.dirname(queue_path) or '.', exist_ok=True)
+    queue = WorkQueue(queue_path)
+    queue.reset([
+        (platform, channel_id, shard, payload(platform, channel_id))
+        for shard, items in assignment.items() for platform, channel_id in items
+    ])
+    print(f"分片模式：{len(channels)} 个UP主/频道分到 {shards} 个分片（"
+          + "，".join(f"分片 {shard}: {len(items)} 个" for shard, items in assignment.items()) + "）\n")
+    
+    start = time.perf_counter()
+    if spawn:
+        procs = [
+            await asyncio.create_subprocess_exec(
+                sys.executable, os.path.abspath(__file__), '--worker', '--shard', str(shard), '--queue', queue_path
+            )
+            for shard in range(shards)
+        ]
+        codes = await asyncio.gather(*[proc.wait() for proc in procs])
+        for shard, code in enumerate(codes):
+            if code != 0:
+                print(f"⚠️  分片 {shard} 的工作进程异常退出（退出码 {code}），其任务记为失败")
+    else:
+        deadline = time.time() + SHARD_WAIT_TIMEOUT
+        while queue.unfinished() and time.time() < deadline:
+            await asyncio.sleep(5)
+    
+    metrics.add_stage('fetch', time.perf_counter() - start)
+    
+    valid_videos = []
+    stats = {'success': 0, 'fail': queue.unfinished(), 'skipped': skipped}
+    for platform, cid, videos, cursor, error, meta, polled in queue.results():
+        channel_id = get_source_class(platform).parse_channel_id(cid)
+        if meta:
+            channel_cache.put(platform, channel_id, **{k: v for k, v in meta.items() if k != 'updated_at'})
+        if polled:
+            youtube_quota.mark_polled(channel_id, polled)
+        if videos is None:
+            stats['fail'] += 1
+            metrics.inc(platform, channel_id, 'failures')
+            # 没完成的任务（工作进程崩溃或超时）不是频道的问题，不计入频道健康状态
+            channel_health.record_failure(platform, channel_id, *(error or ()))
+            continue
+        stats['success'] += 1
+        channel_health.record_success(platform, channel_id)
+        cursors.put(platform, channel_id, cursor)
+        videos = [VideoRecord.from_dict(v) for v in videos]
+        with metrics.stage('filter'):
+            await accept_videos(videos, config, channel_id, platform, valid_videos)
+    youtube_quota.record_used(queue.youtube_quota_used())
+    queue.close()
+    
+    print(f"\n监控完成：成功 {stats['success']} 个，失败 {stats['fail']} 个，熔断跳过 {stats['skipped']} 个，"
+          f"耗时 {time.perf_counter() - start:.1f}s")
+    if YOUTUBE_CHANNELS:
+        youtube_quota.report()
+    channel_health.report(names=channel_name, labels=PLATFORM_LABELS)
+    await notify_and_save(config, valid_videos)
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="B站UP主和YouTube频道视频监控")
+    parser.add_argument('--daemon', action='store_true',
+                        help="常驻模式：按各频道的发布频率分别轮询，每天定时发送汇总邮件")
+    parser.add_argument('--shards', type=int, default=0,
+                        help="分片模式：把UP主/频道按一致性哈希分给 N 个工作进程抓取，合并后发一封通知")
+    parser.add_argument('--no-spawn', action='store_true',
+                        help="分片模式下不在本机启动工作进程，等待其他机器上的工作进程")
+    parser.add_argument('--worker', action='store_true', help="作为分片工作进程运行")
+    parser.add_argument('--shard', type=int, default=0, help="工作进程负责的分片号")
+    parser.add_argument('--queue', default=SHARD_QUEUE_FILE, help="分片任务队列文件")
+    args = parser.parse_args()
+    if os.environ.get("REPLAY_FIXTURES"):
+        # 离线回放（测试用）：平台请求和邮件都由 replay.py 的夹具应答；分片模式启动的工作进程继承这个环境变量
+        from replay import FixtureStore, install_replayer
+        install_replayer(sys.modules[__name__], FixtureStore(os.environ["REPLAY_FIXTURES"]))
+    if args.worker:
+        asyncio.run(run_worker(args.shard, queue_path=args.queue))
+    elif args.shards:
+        asyncio.run(run_sharded(args.shards, spawn=not args.no_spawn, queue_path=args.queue))
+    elif args.daemon:
+        asyncio.run(run_daemon())
+    else:
+        asyncio.run(main())
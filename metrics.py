@@ -0,0 +1,177 @@
+"""
+运行指标
+记录每个UP主/频道的请求耗时、重试、风控 (-352)、下载字节数（部分接口为估算值）、抓到的视频数和各原因过滤掉的视频数，
+以及抓取 / 过滤 / 渲染 / 发送各阶段的耗时。
+
+每次运行结束时：
+- 追加一行到 JSON-lines 文件（便于事后分析哪些频道最耗时）
+- 覆盖写 Prometheus textfile（可由 node_exporter 的 textfile collector 采集）
+"""
+
+import os
+import json
+import time
+import contextlib
+
+# 每个频道的计数器
+CHANNEL_FIELDS = (
+    'requests',          # 实际发出的请求数
+    'request_seconds',   # 请求耗时合计（不含限流等待）
+    'max_request_seconds',
+    'retries',
+    'throttled',         # 触发风控 (-352) / 429 的次数
+    'bytes',             # 实际下载的字节数（订阅源、动态时间线）
+    'bytes_estimated',   # 拿不到原始响应的接口（B站投稿列表、YouTube API）按解析结果重新序列化估算的字节数
+    'cache_hits',        # 抓取缓存命中（含 304）
+    'items',             # 抓到的视频数
+    'failures',          # 整个UP主/频道获取失败
+    'filtered_time',     # 因时间窗口过滤
+    'filtered_keyword',  # 因关键词（未命中或命中排除词）过滤
+    'filtered_history',  # 因已在历史记录中过滤
+    'accepted',          # 进入通知
+)
+
+# 阶段的显示名
+STAGE_LABELS = {
+    'fetch': '抓取',
+    'fetch_bilibili': 'B站抓取',
+    'fetch_youtube': 'YouTube抓取',
+    'queue_wait': '队列等待',
+    'filter': '过滤',
+    'render': '渲染',
+    'send': '发送',
+    'total': '总计',
+}
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+class RunMetrics:
+    """一次运行的指标"""
+
+    def __init__(self, mode='run'):
+        self.mode = mode
+        self.started_at = time.time()
+        self.channels = {}
+        self.stages = {}
+
+    def reset(self):
+        """常驻模式每轮结束后清零，开始记录下一轮"""
+        self.started_at = time.time()
+        self.channels = {}
+        self.stages = {}
+
+    def _channel(self, platform, channel_id):
+        key = (platform, str(channel_id))
+        entry = self.channels.get(key)
+        if entry is None:
+            entry = self.channels[key] = dict.fromkeys(CHANNEL_FIELDS, 0)
+        return entry
+
+    def inc(self, platform, channel_id, field, value=1):
+        self._channel(platform, channel_id)[field] += value
+
+    @contextlib.contextmanager
+    def request(self, platform, channel_id):
+        """记录一次请求的耗时（无论成功与否）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            entry = self._channel(platform, channel_id)
+            entry['requests'] += 1
+            entry['request_seconds'] += elapsed
+            entry['max_request_seconds'] = max(entry['max_request_seconds'], elapsed)
+
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - start)
+
+    def stage_summary(self):
+        return "，".join(f"{STAGE_LABELS.get(stage, stage)} {seconds:.1f}s" for stage, seconds in self.stages.items())
+
+    def totals(self):
+        totals = dict.fromkeys(CHANNEL_FIELDS, 0)
+        for entry in self.channels.values():
+            for field in CHANNEL_FIELDS:
+                if field == 'max_request_seconds':
+                    totals[field] = max(totals[field], entry[field])
+                else:
+                    totals[field] += entry[field]
+        return totals
+
+    def slowest(self, n=5):
+        """请求耗时合计最高的 n 个频道：[(platform, channel_id, 指标), ...]"""
+        ranked = sorted(self.channels.items(), key=lambda kv: kv[1]['request_seconds'], reverse=True)
+        return [(platform, channel_id, entry) for (platform, channel_id), entry in ranked[:n]]
+
+    def report(self, n=5, names=None):
+        """打印汇总和最慢的 n 个频道；names(platform, channel_id) 返回显示名"""
+        totals = self.totals()
+        print(f"运行指标：请求 {totals['requests']} 次，重试 {totals['retries']} 次，风控 {totals['throttled']} 次，"
+              f"下载 {totals['bytes'] / 1024:.1f} KB（另估算 {totals['bytes_estimated'] / 1024:.1f} KB），"
+              f"抓到 {totals['items']} 个视频"
+              f"（时间窗口外 {totals['filtered_time']}，关键词不匹配 {totals['filtered_keyword']}，"
+              f"已处理 {totals['filtered_history']}，通过 {totals['accepted']}）")
+        for platform, channel_id, entry in self.slowest(n):
+            if not entry['requests']:
+                break
+            label = f"{platform} {channel_id}" + (f"（{names(platform, channel_id)}）" if names else "")
+            print(f"   {label}: 请求 {entry['requests']} 次共 {entry['request_seconds']:.2f}s"
+                  f"（最慢 {entry['max_request_seconds']:.2f}s），重试 {entry['retries']} 次")
+
+    def to_dict(self, **extra):
+        record = {
+            'started_at': int(self.started_at),
+            'finished_at': int(time.time()),
+            'mode': self.mode,
+            'stages': {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            'totals': self.totals(),
+            'channels': {f"{platform}:{channel_id}": entry for (platform, channel_id), entry in self.channels.items()},
+        }
+        record.update(extra)
+        return record
+
+    def write_jsonl(self, path, **extra):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        line = json.dumps(self.to_dict(**extra), ensure_ascii=False, sort_keys=True) + '\n'
+        # 一次 write 追加整行：分片模式下多个进程写同一个文件时不会交错
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def write_prometheus(self, path, prefix='up_monitor'):
+        lines = [
+            f"# HELP {prefix}_last_run_timestamp_seconds 最近一次运行结束的时间",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {time.time():.0f}",
+            f"# HELP {prefix}_stage_seconds 最近一次运行各阶段的耗时",
+            f"# TYPE {prefix}_stage_seconds gauge",
+        ]
+        for stage, seconds in self.stages.items():
+            lines.append(f'{prefix}_stage_seconds{{stage="{_escape_label(stage)}"}} {seconds:.6f}')
+        for field in CHANNEL_FIELDS:
+            name = f"{prefix}_channel_{field}"
+            lines.append(f"# HELP {name} 最近一次运行每个UP主/频道的 {field}")
+            lines.append(f"# TYPE {name} gauge")
+            for (platform, channel_id), entry in self.channels.items():
+                lines.append(f'{name}{{platform="{_escape_label(platform)}",channel="{_escape_label(channel_id)}"}} {_format_value(entry[field])}')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # textfile collector 可能随时读取：先写临时文件再替换
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
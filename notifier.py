@@ -0,0 +1,264 @@
+"""
+邮件通知
+- SmtpTransport: 复用同一个已登录的 SMTP 连接发送多封邮件，连接断开时自动重连，临时错误按指数退避重试
+- Outbox: 发送失败的邮件存到磁盘发件箱，下次运行时优先补发，不会因为一次网络故障丢掉通知
+- Notifier: 支持多个收件人，每个收件人单独一封（可以是不同的内容），先补发发件箱再发本次的邮件
+"""
+
+import os
+import json
+import time
+import hashlib
+import html
+import asyncio
+import threading
+
+# smtplib / email 只在真正发邮件时导入：没有新视频、只跑抓取时不必加载
+
+# 发送结果
+SENT = 'sent'  # 已发送
+SPOOLED = 'spooled'  # 发送失败，已存入发件箱等待下次补发
+FAILED = 'failed'  # 发送失败且无法存入发件箱（如未配置邮箱）
+
+
+def parse_recipients(value):
+    """GMAIL_RECIPIENT 支持逗号分隔的多个地址"""
+    return [addr.strip() for addr in (value or '').split(',') if addr.strip()]
+
+
+def build_message(sender, recipient, title, body):
+    """构建一封邮件，返回邮件原文
+
+    body 为 HTML 字符串，或 (html, text) 二元组（如 RenderedDigest），后者同时附带纯文本版本
+    """
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    html_body, text_body = body if isinstance(body, tuple) else (body, None)
+    html_content = f"""
+    <html>
+    <head>
+        <meta charset="utf-8">
+    </head>
+    <body>
+        <h3>{html.escape(title)}</h3>
+        {html_body}
+    </body>
+    </html>
+    """
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = title
+    msg['From'] = sender
+    msg['To'] = recipient
+    # multipart/alternative 中越靠后的版本优先显示
+    if text_body is not None:
+        msg.attach(MIMEText(f"{title}\n\n{text_body}", 'plain', 'utf-8'))
+    msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+    return msg.as_string()
+
+
+class SmtpTransport:
+    """持久化的 SMTP 连接
+
+    第一次发送时连接并登录，之后的邮件复用同一个连接；连接失效（服务器超时断开等）时重连。
+    smtplib 是同步的，所有调用都在线程里执行，用锁保证同一时间只有一个线程使用连接。
+    """
+
+    def __init__(self, host, port, username=None, password=None, starttls=True,
+                 timeout=30, max_retries=3, backoff=2.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.server = None
+        self.lock = threading.Lock()
+        self.connects = 0
+
+    def _connect(self):
+        import smtplib
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connects += 1
+        return server
+
+    def _ensure_connected(self):
+        import smtplib
+        if self.server is not None:
+            try:
+                if self.server.noop()[0] == 250:
+                    return self.server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._drop()
+        self.server = self._connect()
+        return self.server
+
+    def _drop(self):
+        if self.server is not None:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+            self.server = None
+
+    @staticmethod
+    def is_permanent(error):
+        """5xx 响应（认证失败、收件人被拒等）重试也没用"""
+        import smtplib
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return True
+        code = getattr(error, 'smtp_code', None)
+        return code is not None and 500 <= code < 600
+
+    def send(self, sender, recipient, message):
+        """同步发送一封邮件，失败时重连并退避重试，最终失败抛出最后一次的异常"""
+        with self.lock:
+            for attempt in range(self.max_retries):
+                try:
+                    self._ensure_connected().sendmail(sender, [recipient], message)
+                    return
+                except Exception as e:
+                    self._drop()
+                    if self.is_permanent(e) or attempt == self.max_retries - 1:
+                        raise
+                    delay = self.backoff * (2 ** attempt)
+                    print(f"⚠️  邮件发送失败，{delay:.0f} 秒后重试 ({attempt + 1}/{self.max_retries}): {e}")
+                    time.sleep(delay)
+
+    def close(self):
+        with self.lock:
+            if self.server is not None:
+                try:
+                    self.server.quit()
+                except Exception:
+                    pass
+                self.server = None
+
+
+class Outbox:
+    """磁盘发件箱：每封待发邮件一个 JSON 文件 {"sender", "recipient", "title", "message", "created", "attempts"}"""
+
+    def __init__(self, directory="outbox", max_attempts=10):
+        self.directory = directory
+        self.max_attempts = max_attempts
+
+    def put(self, sender, recipient, title, message, attempts=1):
+        os.makedirs(self.directory, exist_ok=True)
+        created = int(time.time())
+        digest = hashlib.sha1(f"{recipient}\n{message}".encode('utf-8')).hexdigest()[:12]
+        path = os.path.join(self.directory, f"{created}-{digest}.json")
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'sender': sender,
+                'recipient': recipient,
+                'title': title,
+                'message': message,
+                'created': created,
+                'attempts': attempts,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def entries(self):
+        """按存入时间排列的 (文件路径, 内容)"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries.append((path, json.load(f)))
+            except:
+                print(f"⚠️  发件箱文件 {name} 无法读取，跳过")
+        return entries
+
+    def __len__(self):
+        return len(self.entries())
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def retry_later(self, path, entry):
+        """补发失败：增加尝试次数；超过上限的丢弃"""
+        entry['attempts'] = entry.get('attempts', 1) + 1
+        if entry['attempts'] > self.max_attempts:
+            print(f"❌ 邮件《{entry['title']}》发给 {entry['recipient']} 已失败 {self.max_attempts} 次，放弃")
+            self.remove(path)
+            return
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class Notifier:
+    """通知发送器：一个 SMTP 连接 + 发件箱"""
+
+    def __init__(self, transport, sender, recipients, outbox):
+        self.transport = transport
+        self.sender = sender
+        self.recipients = recipients
+        self.outbox = outbox
+
+    async def flush_outbox(self):
+        """补发发件箱里的邮件，返回 (成功数, 本次补发失败数)"""
+        sent = 0
+        pending = 0
+        for path, entry in self.outbox.entries():
+            try:
+                await asyncio.to_thread(self.transport.send, entry['sender'], entry['recipient'], entry['message'])
+                self.outbox.remove(path)
+                sent += 1
+            except Exception as e:
+                print(f"⚠️  补发邮件《{entry['title']}》给 {entry['recipient']} 失败: {e}")
+                self.outbox.retry_later(path, entry)
+                pending += 1
+                if not self.transport.is_permanent(e):
+                    # 连接层面的问题，剩下的这次也发不出去
+                    break
+        if sent:
+            print(f"📤 已补发发件箱中的 {sent} 封邮件")
+        return sent, pending
+
+    async def send(self, title, body):
+        """给每个收件人发一封邮件
+
+        body 可以是 HTML 字符串或 (html, text)（所有人相同），也可以是 {收件人: 正文}（每人一份，不在其中的收件人不发）。
+        返回 SENT（全部发出）/ SPOOLED（有邮件存入发件箱）
+        """
+        bodies = body if isinstance(body, dict) else {r: body for r in self.recipients}
+        status = SENT
+        for recipient, recipient_body in bodies.items():
+            message = build_message(self.sender, recipient, title, recipient_body)
+            try:
+                await asyncio.to_thread(self.transport.send, self.sender, recipient, message)
+                print(f"✅ 邮件发送成功：{recipient}")
+            except Exception as e:
+                print(f"❌ 邮件发送失败：{recipient}: {e}")
+                self.outbox.put(self.sender, recipient, title, message)
+                print(f"📥 已存入发件箱，下次运行时补发")
+                status = SPOOLED
+        return status
+
+    def close(self):
+        self.transport.close()
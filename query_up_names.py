@@ -1,338 +1,322 @@
+"""
+查询UP主/频道的名字、头像等元数据，写入频道元数据缓存 (channel_cache.json)
+
+只查询缓存中没有或超过有效期的UP主/频道；YouTube 频道批量查询（每次最多 50 个）。
+监控运行 (main.py / test_local.py) 只从缓存读取名字，不会为了名字发请求；up_list.py 只做配置，不再被改写。
+
+B站查询使用与监控相同的自适应限流器：正常时逐步提速，触发风控 (-352) 时降速后重试；
+超时、连接失败等网络错误按指数退避重试，用户不存在等接口错误不重试。
+
+批量模式（新增大量UP主时）：从文件或标准输入读取 UID / Channel ID（每行一个，# 之后为注释），
+每查到一个就追加一行到结果文件 (JSON-lines) 并写入缓存；中断后用同样的命令重新运行，
+结果文件中已成功的会跳过，只查询剩下的。
+
+用法：
+    python query_up_names.py [--refresh] [--ttl-days 7]
+    python query_up_names.py --bulk uids.txt [--output query_results.jsonl] [--concurrency 2]
+    cat uids.txt | python query_up_names.py --bulk -
+"""
+
 import asyncio
+import argparse
+import json
 import os
+import sys
 from dotenv import load_dotenv
 from bilibili_api import user
 from up_list import TARGET_UIDS, NO_FILTER_UIDS, YOUTUBE_CHANNELS, YOUTUBE_NO_FILTER_CHANNELS
 from googleapiclient.discovery import build
+from channel_cache import ChannelMetaCache
+from rate_limiter import AdaptiveRateLimiter
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
 
-async def get_user_info(uid, semaphore):
-    """获取用户信息"""
-    async with semaphore:
+NAME_TTL_DAYS = 7  # 名字和头像的有效期（天），过期后重新查询
+YOUTUBE_BATCH_SIZE = 50  # channels().list 单次最多查询的频道数
+BILIBILI_RETRIES = 5  # 单个UID触发风控或网络错误后的最多尝试次数
+BILIBILI_TIMEOUT = 20  # 单次查询的超时（秒），超时按网络错误重试
+BILIBILI_RETRY_DELAY = 2  # 网络错误重试的初始等待（秒），每次翻倍
+BULK_OUTPUT_FILE = "query_results.jsonl"  # 批量模式的结果文件，同时用作断点
+CACHE_SAVE_EVERY = 20  # 批量模式下每查到这么多个保存一次缓存
+# 查询用户信息的接口比投稿列表更容易风控，起始速率和上限都低一些
+BILIBILI_RATE_LIMIT = {'initial_rate': 0.5, 'min_rate': 0.1, 'max_rate': 2.0, 'max_concurrency': 2}
+
+def is_throttle_error(error_msg):
+    return '-352' in error_msg or '-412' in error_msg or '风控' in error_msg
+
+def is_network_error(e):
+    """超时、连接失败等：与 main.bilibili_error_class 一致，没有接口错误码的异常都当作网络问题"""
+    return isinstance(e, asyncio.TimeoutError) or getattr(e, 'code', None) is None
+
+async def get_user_info(uid, limiter, retries=BILIBILI_RETRIES):
+    """获取用户信息：请求节奏由限流器控制，风控时降速重试，网络错误退避后重试"""
+    error_msg = ''
+    for attempt in range(retries):
         try:
-            import sys
-            print(f"正在查询 UID {uid}...", flush=True)
-            sys.stdout.flush()
-            u = user.User(uid=uid)
-            info = await u.get_user_info()
+            async with limiter:
+                info = await asyncio.wait_for(user.User(uid=uid).get_user_info(), BILIBILI_TIMEOUT)
+            limiter.on_success()
             name = info.get('name', '未知')
-            print(f"✓ UID {uid} -> {name}", flush=True)
             return {
                 'uid': uid,
                 'name': name,
+                'avatar': info.get('face'),
                 'success': True
             }
         except Exception as e:
-            return {
-                'uid': uid,
-                'name': f'查询失败: {str(e)}',
-                'success': False
-            }
+            error_msg = str(e) or type(e).__name__
+            last = attempt == retries - 1
+            if is_throttle_error(error_msg):
+                limiter.on_throttle()
+                if not last:
+                    print(f"⚠️  UID {uid} 触发风控，降速后重试... (尝试 {attempt + 1}/{retries})", flush=True)
+            elif is_network_error(e):
+                # 网络问题与风控无关，不降低限流速率，只是这个UID等一会儿再试
+                if not last:
+                    delay = BILIBILI_RETRY_DELAY * 2 ** attempt
+                    print(f"⚠️  UID {uid} 网络错误（{error_msg}），{delay} 秒后重试... "
+                          f"(尝试 {attempt + 1}/{retries})", flush=True)
+                    await asyncio.sleep(delay)
+            else:
+                # 用户不存在等错误，重试也没用
+                break
+    return {
+        'uid': uid,
+        'name': f'查询失败: {error_msg}',
+        'success': False
+    }
 
-async def get_youtube_channel_info(channel_id, semaphore):
-    """获取YouTube频道信息"""
-    async with semaphore:
+def get_youtube_batch_sync(youtube, channel_ids):
+    """查询一批（最多 50 个）YouTube频道，返回 {Channel ID: 元数据}"""
+    response = youtube.channels().list(
+        part='snippet,contentDetails',
+        id=','.join(channel_ids),
+        maxResults=YOUTUBE_BATCH_SIZE
+    ).execute()
+    found = {}
+    for item in response.get('items', []):
+        found[item['id']] = {
+            'name': item['snippet']['title'],
+            'avatar': item['snippet'].get('thumbnails', {}).get('default', {}).get('url'),
+            'uploads_playlist_id': item['contentDetails']['relatedPlaylists']['uploads'],
+        }
+    return found
+
+async def get_youtube_channels_info(channel_ids, emit=None):
+    """批量获取YouTube频道信息；传入 emit(result) 时每个频道查到即交给它"""
+    youtube_api_key = os.environ.get("YOUTUBE_API_KEY")
+    results = []
+
+    def add(result):
+        results.append(result)
+        if emit:
+            emit(result)
+
+    if not youtube_api_key:
+        for channel_id in channel_ids:
+            add({'uid': channel_id, 'name': '查询失败: YOUTUBE_API_KEY未设置', 'success': False})
+        return results
+    youtube = build('youtube', 'v3', developerKey=youtube_api_key, cache_discovery=False)
+    for i in range(0, len(channel_ids), YOUTUBE_BATCH_SIZE):
+        batch = channel_ids[i:i + YOUTUBE_BATCH_SIZE]
         try:
-            import sys
-            youtube_api_key = os.environ.get("YOUTUBE_API_KEY")
-            if not youtube_api_key:
-                return {
-                    'uid': channel_id,
-                    'name': '查询失败: YOUTUBE_API_KEY未设置',
-                    'success': False
-                }
-            
-            print(f"正在查询 YouTube 频道 {channel_id}...", flush=True)
-            sys.stdout.flush()
-            
             # 使用 asyncio.to_thread 包装同步的 YouTube API 调用
-            def get_channel_sync():
-                youtube = build('youtube', 'v3', developerKey=youtube_api_key)
-                response = youtube.channels().list(
-                    part='snippet',
-                    id=channel_id
-                ).execute()
-                
-                if not response.get('items'):
-                    return None
-                
-                channel_info = response['items'][0]
-                channel_name = channel_info['snippet']['title']
-                return channel_name
-            
-            name = await asyncio.to_thread(get_channel_sync)
-            
-            if name:
-                print(f"✓ YouTube 频道 {channel_id} -> {name}", flush=True)
-                return {
-                    'uid': channel_id,
-                    'name': name,
-                    'success': True
-                }
-            else:
-                return {
-                    'uid': channel_id,
-                    'name': '查询失败: 频道不存在',
-                    'success': False
-                }
-                
+            found = await asyncio.to_thread(get_youtube_batch_sync, youtube, batch)
         except Exception as e:
-            return {
-                'uid': channel_id,
-                'name': f'查询失败: {str(e)}',
-                'success': False
-            }
+            for channel_id in batch:
+                add({'uid': channel_id, 'name': f'查询失败: {str(e)}', 'success': False})
+            continue
+        for channel_id in batch:
+            if channel_id in found:
+                add({'uid': channel_id, 'success': True, **found[channel_id]})
+            else:
+                add({'uid': channel_id, 'name': '查询失败: 频道不存在', 'success': False})
+    return results
+
+async def resolve_all(uids, channel_ids, emit=None, concurrency=None):
+    """查询所有B站UP主（并发、限流）和YouTube频道（批量），返回 (B站结果, YouTube结果)
+
+    concurrency: B站同时进行的查询数，默认为 BILIBILI_RATE_LIMIT 中的 max_concurrency
+    """
+    rate_limit = dict(BILIBILI_RATE_LIMIT)
+    if concurrency:
+        rate_limit['max_concurrency'] = concurrency
+    limiter = AdaptiveRateLimiter('bilibili', **rate_limit)
+
+    async def resolve(uid):
+        result = await get_user_info(uid, limiter)
+        if emit:
+            emit(result)
+        return result
+
+    bilibili_results, youtube_results = await asyncio.gather(
+        asyncio.gather(*[resolve(uid) for uid in uids]),
+        get_youtube_channels_info(channel_ids, emit=emit),
+    )
+    if uids:
+        limiter.log_state("最终")
+    return list(bilibili_results), youtube_results
+
+def store_result(cache, result):
+    """查询成功的写入缓存；失败的保留缓存中原有的内容"""
+    if result['success']:
+        fields = {k: v for k, v in result.items() if k not in ('uid', 'success', 'platform')}
+        cache.put(platform_of(result['uid']), result['uid'], **fields)
+
+def platform_of(uid):
+    return 'youtube' if isinstance(uid, str) else 'bilibili'
+
+def print_result(result):
+    status = "✓" if result['success'] else "✗"
+    label = "YouTube 频道" if platform_of(result['uid']) == 'youtube' else "UID"
+    print(f"{status} {label} {result['uid']} -> {result['name']}", flush=True)
+
+def parse_ids(lines):
+    """每行一个 UID 或 Channel ID，# 之后为注释；返回 (UID 列表, Channel ID 列表)，保持顺序并去重"""
+    uids, channel_ids = [], []
+    seen = set()
+    for line in lines:
+        token = line.split('#', 1)[0].strip().strip(',').strip('\'"')
+        if not token or token in seen:
+            continue
+        seen.add(token)
+        if token.isdigit():
+            uids.append(int(token))
+        elif token.startswith('UC'):
+            channel_ids.append(token)
+        else:
+            print(f"⚠️  无法识别的ID，跳过: {token}", flush=True)
+    return uids, channel_ids
+
+def load_checkpoint(path):
+    """结果文件中已成功的ID"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 上次中断时写了一半的行
+                continue
+            if record.get('success'):
+                done.add(record['uid'])
+    return done
+
+def ensure_trailing_newline(path):
+    """上次中断时最后一行可能只写了一半：补一个换行，新结果从新的一行开始"""
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+async def bulk(source, output=BULK_OUTPUT_FILE, concurrency=None):
+    """批量模式：查询 source（文件路径，"-" 为标准输入）中的所有ID，结果逐条追加到 output"""
+    if source == '-':
+        uids, channel_ids = parse_ids(sys.stdin)
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            uids, channel_ids = parse_ids(f)
+    done = load_checkpoint(output)
+    todo_uids = [uid for uid in uids if uid not in done]
+    todo_channels = [cid for cid in channel_ids if cid not in done]
+    print(f"批量查询：B站 {len(uids)} 个，YouTube {len(channel_ids)} 个；"
+          f"结果文件中已完成 {len(uids) + len(channel_ids) - len(todo_uids) - len(todo_channels)} 个，"
+          f"本次查询 {len(todo_uids) + len(todo_channels)} 个\n", flush=True)
+
+    cache = ChannelMetaCache()
+    counts = {'success': 0, 'fail': 0}
+    ensure_trailing_newline(output)
+    with open(output, 'a', encoding='utf-8') as out:
+        def emit(result):
+            # 每条结果立即落盘：中断后重新运行可以从这里继续
+            out.write(json.dumps({'platform': platform_of(result['uid']), **result}, ensure_ascii=False) + '\n')
+            out.flush()
+            print_result(result)
+            store_result(cache, result)
+            counts['success' if result['success'] else 'fail'] += 1
+            if (counts['success'] + counts['fail']) % CACHE_SAVE_EVERY == 0:
+                cache.save()
+
+        try:
+            await resolve_all(todo_uids, todo_channels, emit=emit, concurrency=concurrency)
+        finally:
+            cache.save()
+    print(f"\n批量查询完成！成功: {counts['success']}, 失败: {counts['fail']}，结果在 {output}，"
+          f"已写入 {cache.file_path}（失败的重新运行同样的命令即可重试）", flush=True)
+
+async def main(refresh=False, ttl_days=NAME_TTL_DAYS, concurrency=None):
+    cache = ChannelMetaCache()
 
-async def main():
-    import sys
-    sys.stdout.flush()
-    
     # 合并 TARGET_UIDS 和 NO_FILTER_UIDS，去重
-    all_uids = list(set(TARGET_UIDS + NO_FILTER_UIDS))
-    all_youtube_channels = list(set(list(YOUTUBE_CHANNELS.keys()) + YOUTUBE_NO_FILTER_CHANNELS))
-    
-    print(f"开始查询 {len(all_uids)} 个B站UP主的信息（包含 {len(TARGET_UIDS)} 个监控UP主和 {len(NO_FILTER_UIDS)} 个特殊UP主）...", flush=True)
-    if all_youtube_channels:
-        print(f"开始查询 {len(all_youtube_channels)} 个YouTube频道的信息...", flush=True)
-    print("", flush=True)
-    
-    # 使用信号量控制并发，避免触发风控
-    semaphore = asyncio.Semaphore(2)
-    
-    # 查询B站UP主
-    bilibili_tasks = [get_user_info(uid, semaphore) for uid in all_uids]
-    bilibili_results = await asyncio.gather(*bilibili_tasks)
-    
-    # 查询YouTube频道
-    youtube_results = []
-    if all_youtube_channels:
-        youtube_tasks = [get_youtube_channel_info(channel_id, semaphore) for channel_id in all_youtube_channels]
-        youtube_results = await asyncio.gather(*youtube_tasks)
-    
-    # 合并结果
-    results = bilibili_results + youtube_results
-    
+    all_uids = sorted(set(TARGET_UIDS + NO_FILTER_UIDS))
+    all_youtube_channels = sorted(set(list(YOUTUBE_CHANNELS.keys()) + YOUTUBE_NO_FILTER_CHANNELS))
+
+    # 只查询缓存中没有或已过期的
+    ttl = 0 if refresh else ttl_days * 24 * 3600
+    stale_uids = cache.stale('bilibili', all_uids, ttl)
+    stale_channels = cache.stale('youtube', all_youtube_channels, ttl)
+
+    print(f"共 {len(all_uids)} 个B站UP主（包含 {len(TARGET_UIDS)} 个监控UP主和 {len(NO_FILTER_UIDS)} 个特殊UP主）、"
+          f"{len(all_youtube_channels)} 个YouTube频道", flush=True)
+    print(f"需要查询：B站 {len(stale_uids)} 个，YouTube {len(stale_channels)} 个"
+          f"（其余在缓存有效期 {ttl_days} 天内）\n", flush=True)
+
+    bilibili_results, youtube_results = await resolve_all(stale_uids, stale_channels, emit=print_result,
+                                                          concurrency=concurrency)
+
+    for result in bilibili_results + youtube_results:
+        store_result(cache, result)
+    cache.save()
+
+    queried = {('bilibili', r['uid']): r for r in bilibili_results}
+    queried.update({('youtube', r['uid']): r for r in youtube_results})
+
     print("=" * 60, flush=True)
-    print(f"{'UID':<20} {'UP主名字':<30}", flush=True)
+    print(f"{'UID':<26} {'UP主名字':<30}", flush=True)
     print("=" * 60, flush=True)
-    
-    for result in results:
-        status = "✅" if result['success'] else "❌"
-        print(f"{result['uid']:<20} {result['name']:<30} {status}", flush=True)
-    
+
+    for platform, ids in (('bilibili', all_uids), ('youtube', all_youtube_channels)):
+        for uid in ids:
+            result = queried.get((platform, uid))
+            if result is None:
+                status, name = "💾", cache.name(platform, uid)
+            elif result['success']:
+                status, name = "✅", result['name']
+            else:
+                # 查询失败：显示缓存中原有的名字（如果有）
+                status, name = "❌", cache.name(platform, uid) or result['name']
+            print(f"{uid:<26} {name:<30} {status}", flush=True)
+
     print("=" * 60, flush=True)
+    results = bilibili_results + youtube_results
     success_count = sum(1 for r in results if r['success'])
-    fail_count = sum(1 for r in results if not r['success'])
-    print(f"\n查询完成！成功: {success_count}, 失败: {fail_count}", flush=True)
-    
-    # 自动更新 up_list.py
-    update_up_list_file(results, success_count)
-    
-    # 输出格式化的列表（可用于更新代码）
+    fail_count = len(results) - success_count
+    print(f"\n查询完成！成功: {success_count}, 失败: {fail_count}，已写入 {cache.file_path}", flush=True)
+
+    # 输出格式化的列表（可用于 up_list.py 中的注释）
     print("\n" + "=" * 60, flush=True)
     print("格式化输出（可用于代码注释）：", flush=True)
     print("=" * 60, flush=True)
-    for result in results:
-        if result['success']:
-            print(f"    {result['uid']},  # {result['name']}", flush=True)
-        else:
-            print(f"    {result['uid']},  # 查询失败", flush=True)
-
-def update_up_list_file(results, success_count):
-    """更新 up_list.py 文件"""
-    try:
-        # 分离 B站和 YouTube 的结果
-        # 假设 UID 是数字，Channel ID 是以 'UC' 开头的字符串
-        bilibili_results = []
-        youtube_results = []
-        
-        for result in results:
-            uid_or_channel = result['uid']
-            # 简单判断：如果是字符串且以 'UC' 开头，或者是长数字字符串，视为 YouTube Channel ID
-            # 否则视为 B站 UID
-            if isinstance(uid_or_channel, str) and (uid_or_channel.startswith('UC') or len(str(uid_or_channel)) > 15):
-                youtube_results.append(result)
-            else:
-                bilibili_results.append(result)
-        
-        # 构建新的 UP_LIST 字典（B站UP主）
-        up_list_dict = {}
-        for result in bilibili_results:
-            uid = result['uid']
-            if result['success']:
-                up_list_dict[uid] = result['name']
-            else:
-                try:
-                    from up_list import UP_LIST
-                    if uid in UP_LIST:
-                        up_list_dict[uid] = UP_LIST[uid]
-                    else:
-                        up_list_dict[uid] = "查询失败"
-                except:
-                    up_list_dict[uid] = "查询失败"
-        
-        # 构建新的 YOUTUBE_CHANNELS 字典
-        youtube_channels_dict = {}
-        for result in youtube_results:
-            channel_id = result['uid']
-            if result['success']:
-                youtube_channels_dict[channel_id] = result['name']
-            else:
-                try:
-                    from up_list import YOUTUBE_CHANNELS as existing_channels
-                    if channel_id in existing_channels:
-                        youtube_channels_dict[channel_id] = existing_channels[channel_id]
-                    else:
-                        youtube_channels_dict[channel_id] = "查询失败"
-                except:
-                    youtube_channels_dict[channel_id] = "查询失败"
-        
-        # 尝试从现有文件中读取配置，保留用户的配置
-        try:
-            from up_list import KEYWORDS, NO_FILTER_UIDS, YOUTUBE_NO_FILTER_CHANNELS
-            keywords_list = KEYWORDS
-            no_filter_list = NO_FILTER_UIDS
-            youtube_no_filter_list = YOUTUBE_NO_FILTER_CHANNELS
-        except:
-            # 如果读取失败，使用默认值
-            keywords_list = ["AIGC", "LoRA", "工作流", "模型"]
-            no_filter_list = []
-            youtube_no_filter_list = []
-        
-        # 使用当前 TARGET_UIDS（已在文件顶部导入）来确定哪些UID应该写入UP_LIST
-        target_uids_set = set(TARGET_UIDS)
-        
-        # 生成新的文件内容
-        file_content = '''"""
-B站UP主和YouTube频道关注列表配置
-包含需要监控的UP主/频道的ID和名字
-"""
-
-# UP主列表：{UID: UP主名字}
-UP_LIST = {
-'''
-        # 只写入 TARGET_UIDS 中的 UID（按 UID 排序）
-        target_uids_to_write = [uid for uid in sorted(up_list_dict.keys()) if uid in target_uids_set]
-        for uid in target_uids_to_write:
-            name = up_list_dict[uid]
-            # 转义引号，防止名字中包含引号
-            name_escaped = name.replace('"', '\\"').replace("'", "\\'")
-            file_content += f'    {uid}: "{name_escaped}",\n'
-        
-        file_content += '''}
-
-# 特殊UP主列表（这些UP主的视频不进行关键词过滤，直接推送）
-# 如果某个UP主的所有视频都值得关注，可以将其UID添加到此列表中
-NO_FILTER_UIDS = [
-    # 示例：17280004,  # 蓝波球的球
-    # 你可以在这里添加不需要关键词过滤的UP主UID
-'''
-        # 写入 NO_FILTER_UIDS（添加UP主名字注释）
-        if no_filter_list:
-            for uid in no_filter_list:
-                # 优先从 up_list_dict 中查找对应的名字（最新查询结果）
-                name = None
-                if uid in up_list_dict:
-                    name = up_list_dict[uid]
-                else:
-                    # 如果不在查询结果中，尝试从现有 UP_LIST 读取（可能不在 TARGET_UIDS 中）
-                    try:
-                        from up_list import UP_LIST as existing_up_list
-                        if uid in existing_up_list:
-                            name = existing_up_list[uid]
-                    except:
-                        pass
-                
-                # 如果有名字，添加注释；否则只写 UID
-                if name and name != "查询失败":
-                    # 转义引号，防止名字中包含引号
-                    name_escaped = name.replace('"', '\\"').replace("'", "\\'")
-                    file_content += f'    {uid},  # {name_escaped}\n'
-                else:
-                    # 如果没有找到名字，只写 UID（可能不在监控列表中或查询失败）
-                    file_content += f'    {uid},\n'
-        
-        file_content += '''] 
-
-# 提取所有UID列表（自动包含UP_LIST和NO_FILTER_UIDS中的所有UP主）
-# 使用set去重，确保不重复监控
-TARGET_UIDS = list(set(list(UP_LIST.keys()) + NO_FILTER_UIDS))
-
-# YouTube频道列表：{Channel ID: 频道名字}
-# Channel ID 格式：UCxxxxx（24个字符）
-YOUTUBE_CHANNELS = {
-'''
-        # 写入 YOUTUBE_CHANNELS
-        for channel_id in sorted(youtube_channels_dict.keys()):
-            name = youtube_channels_dict[channel_id]
-            name_escaped = name.replace('"', '\\"').replace("'", "\\'")
-            file_content += f'    "{channel_id}": "{name_escaped}",\n'
-        
-        file_content += '''}
-
-# YouTube特殊频道列表（这些频道的视频不进行关键词过滤，直接推送）
-# 如果某个频道的所有视频都值得关注，可以将其Channel ID添加到此列表中
-YOUTUBE_NO_FILTER_CHANNELS = [
-    # 示例：'UCxxxxx',  # 频道名字
-    # 你可以在这里添加不需要关键词过滤的YouTube频道ID
-'''
-        # 写入 YOUTUBE_NO_FILTER_CHANNELS（添加频道名字注释）
-        if youtube_no_filter_list:
-            for channel_id in youtube_no_filter_list:
-                # 优先从 youtube_channels_dict 中查找对应的名字
-                name = None
-                if channel_id in youtube_channels_dict:
-                    name = youtube_channels_dict[channel_id]
-                else:
-                    try:
-                        from up_list import YOUTUBE_CHANNELS as existing_channels
-                        if channel_id in existing_channels:
-                            name = existing_channels[channel_id]
-                    except:
-                        pass
-                
-                # 如果有名字，添加注释；否则只写 Channel ID
-                if name and name != "查询失败":
-                    name_escaped = name.replace('"', '\\"').replace("'", "\\'")
-                    file_content += f'    "{channel_id}",  # {name_escaped}\n'
-                else:
-                    file_content += f'    "{channel_id}",\n'
-        
-        file_content += ''']
-
-# UP主名字映射（自动包含UP_LIST和NO_FILTER_UIDS中的所有UP主）
-# 用于显示UP主名字，即使UP主不在UP_LIST中
-# 此映射会自动从UP_LIST和查询结果中生成
-# 现在也包含YouTube频道名字
-UP_NAME_MAP = {
-    **UP_LIST,  # 从UP_LIST中获取名字
-    **YOUTUBE_CHANNELS,  # 从YOUTUBE_CHANNELS中获取名字
-}
-
-# 关键词过滤列表（用于视频内容过滤）
-KEYWORDS = [
-'''
-        # 写入 KEYWORDS
-        for kw in keywords_list:
-            kw_escaped = kw.replace('"', '\\"').replace("'", "\\'")
-            file_content += f'    "{kw_escaped}",\n'
-        
-        file_content += ']'
-        
-        # 写入文件
-        with open('up_list.py', 'w', encoding='utf-8') as f:
-            f.write(file_content)
-        
-        print(f"\n✅ 已自动更新 up_list.py 文件", flush=True)
-        print(f"   共更新 {success_count} 个UP主名字", flush=True)
-        print(f"   已保留 KEYWORDS ({len(keywords_list)} 个) 和 NO_FILTER_UIDS ({len(no_filter_list)} 个) 配置", flush=True)
-        
-    except Exception as e:
-        print(f"\n❌ 更新 up_list.py 失败: {str(e)}", flush=True)
-        import traceback
-        traceback.print_exc()
+    for platform, ids in (('bilibili', all_uids), ('youtube', all_youtube_channels)):
+        for uid in ids:
+            name = cache.name(platform, uid) or "查询失败"
+            print(f"    {uid!r},  # {name}" if platform == 'youtube' else f"    {uid},  # {name}", flush=True)
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="查询UP主/频道名字，写入频道元数据缓存")
+    parser.add_argument('--refresh', action='store_true', help="忽略有效期，全部重新查询")
+    parser.add_argument('--ttl-days', type=float, default=NAME_TTL_DAYS, help="缓存有效期（天）")
+    parser.add_argument('--bulk', metavar='FILE',
+                        help="批量模式：查询文件中的 UID / Channel ID（每行一个，- 表示标准输入）")
+    parser.add_argument('--output', default=BULK_OUTPUT_FILE, help="批量模式的结果文件（JSON-lines，兼作断点）")
+    parser.add_argument('--concurrency', type=int, default=BILIBILI_RATE_LIMIT['max_concurrency'],
+                        help="B站同时进行的查询数（速率仍由自适应限流器控制）")
+    args = parser.parse_args()
+    if args.bulk:
+        asyncio.run(bulk(args.bulk, output=args.output, concurrency=args.concurrency))
+    else:
+        asyncio.run(main(refresh=args.refresh, ttl_days=args.ttl_days, concurrency=args.concurrency))
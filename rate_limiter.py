@@ -0,0 +1,103 @@
+"""
+自适应限流器
+每个平台一个 AIMD 令牌桶：请求正常时线性提高速率，遇到风控(-352)时按比例降速
+"""
+
+import asyncio
+import time
+
+
+class AdaptiveRateLimiter:
+    """AIMD 自适应令牌桶
+
+    - rate: 每秒发放的令牌数（即每秒允许的请求数）
+    - 每次成功请求后 rate += increase_step（加性增）
+    - 每次触发风控后 rate *= decrease_factor（乘性减），并清空令牌桶
+    - max_concurrency: 同时进行中的请求上限
+    """
+
+    def __init__(self, name, initial_rate=1.0, min_rate=0.2, max_rate=4.0,
+                 increase_step=0.1, decrease_factor=0.5, burst=2,
+                 max_concurrency=4, log_every=20):
+        self.name = name
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.log_every = log_every
+
+        self.success_count = 0
+        self.throttle_count = 0
+        self.peak_rate = initial_rate
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # Lock/Semaphore 延迟到事件循环内创建（Python 3.9 下它们会绑定创建时的事件循环）
+        self._lock = None
+        self._slots = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """等待一个令牌"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        await self._slots.acquire()
+        try:
+            await self.acquire()
+        except BaseException:
+            self._slots.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._slots.release()
+        return False
+
+    def on_success(self):
+        """请求正常：加性增"""
+        self.success_count += 1
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+        self.peak_rate = max(self.peak_rate, self.rate)
+        if self.log_every and self.success_count % self.log_every == 0:
+            self.log_state("加速")
+
+    def on_throttle(self):
+        """触发风控：乘性减，并清空令牌，下一个请求至少等待 1/rate 秒"""
+        self.throttle_count += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._refill()
+        self._tokens = 0.0
+        self.log_state("风控降速")
+
+    def state(self):
+        return {
+            'name': self.name,
+            'rate': round(self.rate, 3),
+            'peak_rate': round(self.peak_rate, 3),
+            'tokens': round(self._tokens, 3),
+            'success': self.success_count,
+            'throttled': self.throttle_count,
+        }
+
+    def log_state(self, reason=""):
+        s = self.state()
+        print(f"🚦 [{self.name}] 限流器{reason}: 速率 {s['rate']}/s (峰值 {s['peak_rate']}/s), "
+              f"成功 {s['success']} 次, 风控 {s['throttled']} 次")
@@ -0,0 +1,483 @@
+"""
+抓取录制 / 回放
+把真实的 B站 (user.User.get_videos)、YouTube（API 客户端和订阅源）和 SMTP 交互录制成夹具文件，
+之后可以在离线环境中回放，按需注入延迟、错误和 -352 风控风暴，用于可重复的性能测试。
+
+夹具目录结构：
+    meta.json                        {"recorded_at": 录制时间}
+    bilibili/<uid>-<pn>-<ps>.json    get_videos 的原始返回
+    youtube_channels/<channel>.json  channels().list 返回的单个频道
+    youtube_playlists/<playlist>.json  playlistItems().list 的原始返回
+    youtube_feed/<channel>.json      订阅源解析后的视频列表 (VideoRecord.to_dict)
+    smtp/<时间>-<序号>.json          发出的邮件（发件人、收件人、原文）
+
+回放时视频发布时间整体平移（录制时的"现在"对应回放时的"现在"），时间窗口过滤的结果与录制时一致。
+监控数量多于录制的频道时，按序号循环复用录制的数据，并改写视频ID避免被当成重复视频。
+
+用法：
+    python replay.py record [--fixtures DIR] [--send]   真实运行一次 main() 并录制
+                                                       （默认不真的发邮件，也不提交历史记录和游标）
+    python replay.py synth [--fixtures DIR]            生成合成夹具（没有网络时使用）
+回放见 benchmarks/bench_replay.py；设置环境变量 REPLAY_FIXTURES=夹具目录 时 python main.py 的各种模式
+（包括分片模式启动的工作进程）都改为回放。
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+import datetime
+import threading
+from types import SimpleNamespace
+
+from video_record import VideoRecord
+
+DEFAULT_FIXTURES = "fixtures"
+
+
+class FixtureStore:
+    """夹具文件读写"""
+
+    def __init__(self, directory=DEFAULT_FIXTURES):
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def _path(self, kind, name):
+        return os.path.join(self.directory, kind, f"{name}.json")
+
+    def save(self, kind, name, data):
+        path = self._path(kind, name)
+        with self.lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+
+    def load(self, kind, name):
+        path = self._path(kind, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def names(self, kind):
+        directory = os.path.join(self.directory, kind)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json'))
+
+    def recorded_at(self):
+        meta = self.load('.', 'meta') or {}
+        return meta.get('recorded_at', time.time())
+
+    def mark_recorded(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.save('.', 'meta', {'recorded_at': int(time.time())})
+
+
+# ================= 录制 =================
+
+class _RecordingRequest:
+    def __init__(self, request, on_response):
+        self.request = request
+        self.on_response = on_response
+
+    def execute(self, **kwargs):
+        response = self.request.execute(**kwargs)
+        self.on_response(response)
+        return response
+
+
+class _RecordingYoutubeClient:
+    """包装真实的 YouTube 客户端，记录 channels().list 和 playlistItems().list 的返回"""
+
+    def __init__(self, client, store):
+        self.client = client
+        self.store = store
+
+    def channels(self):
+        resource = self.client.channels()
+
+        def save(response):
+            for item in response.get('items', []):
+                self.store.save('youtube_channels', item['id'], item)
+
+        return SimpleNamespace(list=lambda **kw: _RecordingRequest(resource.list(**kw), save))
+
+    def playlistItems(self):
+        resource = self.client.playlistItems()
+
+        def list_(**kw):
+            return _RecordingRequest(resource.list(**kw),
+                                     lambda response: self.store.save('youtube_playlists', kw['playlistId'], response))
+
+        return SimpleNamespace(list=list_)
+
+
+def install_recorder(main, store, send=False):
+    """在 main 模块上安装录制器；send=False 时邮件只录制不发送，历史记录和游标也不提交"""
+    store.mark_recorded()
+    real_user_module = main.bilibili_user()
+
+    class RecordingUser:
+        def __init__(self, uid, *args, **kwargs):
+            self.uid = uid
+            self.user = real_user_module.User(uid, *args, **kwargs)
+
+        async def get_videos(self, pn=1, ps=30, **kwargs):
+            result = await self.user.get_videos(pn=pn, ps=ps, **kwargs)
+            store.save('bilibili', f"{self.uid}-{pn}-{ps}", result)
+            return result
+
+    main.user = SimpleNamespace(User=RecordingUser)
+
+    real_get_client = main.get_youtube_client
+    main.get_youtube_client = lambda: _RecordingYoutubeClient(real_get_client(), store)
+
+    class RecordingFeedFetcher(main.feed_fetcher_class()):
+        async def fetch(self, channel_id):
+            videos = await super().fetch(channel_id)
+            if videos is not None:
+                store.save('youtube_feed', channel_id, [v.to_dict() for v in videos])
+            return videos
+
+    main.YoutubeFeedFetcher = RecordingFeedFetcher
+    _install_smtp(main, store, FaultProfile() if not send else None)
+    if not send:
+        # 邮件没有真的发出：提交历史记录和游标的话，这些视频会被当成已通知过，之后再也不会推送
+        real_save_state = main.save_state
+        main.save_state = lambda commit=True: real_save_state(commit=False)
+
+
+# ================= 回放 =================
+
+class FaultProfile:
+    """回放时注入的故障
+
+    - latency / jitter: 每次请求的延迟（秒）及其随机浮动比例
+    - error_rate: 请求失败（网络错误）的概率
+    - storm_rate / storm_duration: 每次请求触发 -352 风控风暴的概率，风暴期间所有 B站请求都返回 -352
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, storm_rate=0.0, storm_duration=5.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.storm_rate = storm_rate
+        self.storm_duration = storm_duration
+        self.rng = random.Random(seed)
+        self.storm_until = 0.0
+        self.lock = threading.Lock()
+        self.injected = {'errors': 0, 'storms': 0, 'throttled': 0}
+
+    def delay(self):
+        if not self.latency:
+            return 0.0
+        with self.lock:
+            return max(0.0, self.latency * (1 + self.jitter * (self.rng.random() * 2 - 1)))
+
+    def error(self):
+        with self.lock:
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.injected['errors'] += 1
+                return True
+        return False
+
+    def throttled(self):
+        now = time.monotonic()
+        with self.lock:
+            if now < self.storm_until:
+                self.injected['throttled'] += 1
+                return True
+            if self.storm_rate and self.rng.random() < self.storm_rate:
+                self.storm_until = now + self.storm_duration
+                self.injected['storms'] += 1
+                self.injected['throttled'] += 1
+                return True
+        return False
+
+
+class _ReplaySMTP:
+    """回放用的 SMTP 连接：只计数，可选地把邮件写入夹具"""
+
+    def __init__(self, faults, store=None, real=None):
+        self.faults = faults
+        self.store = store
+        self.real = real
+        self.sent = 0
+
+    def noop(self):
+        return self.real.noop() if self.real else (250, b'OK')
+
+    def sendmail(self, sender, recipients, message):
+        if self.real:
+            result = self.real.sendmail(sender, recipients, message)
+        else:
+            if self.faults is not None:
+                time.sleep(self.faults.delay())
+                if self.faults.error():
+                    raise OSError("注入的 SMTP 错误")
+            result = {}
+        if self.store is not None:
+            self.sent += 1
+            self.store.save('smtp', f"{int(time.time())}-{self.sent}",
+                            {'sender': sender, 'recipients': recipients, 'message': message})
+        return result
+
+    def quit(self):
+        if self.real:
+            self.real.quit()
+
+    def close(self):
+        if self.real:
+            self.real.close()
+
+
+def _install_smtp(main, store, faults):
+    """faults 为 None 时连接真实服务器并录制；否则不联网"""
+    from notifier import SmtpTransport as base
+
+    class ReplayTransport(base):
+        def _connect(self):
+            if faults is None:
+                return _ReplaySMTP(None, store=store, real=base._connect(self))
+            self.connects += 1
+            return _ReplaySMTP(faults, store=store)
+
+    main.SmtpTransport = ReplayTransport
+
+
+class Replayer:
+    """把夹具映射到任意数量的UP主/频道"""
+
+    def __init__(self, store, faults):
+        self.store = store
+        self.faults = faults
+        self.offset = time.time() - store.recorded_at()
+        self.bilibili = sorted({name.split('-')[0] for name in store.names('bilibili')})
+        self.feeds = store.names('youtube_feed')
+        self.channels = store.names('youtube_channels')
+        self.playlist_sources = {}
+        self.cache = {}
+
+    def synthetic_uids(self, count):
+        return [10 ** 12 + i for i in range(count)]
+
+    def synthetic_channels(self, count):
+        return [f"UCreplay{i:016d}" for i in range(count)]
+
+    def _source(self, names, channel_id, start):
+        """合成ID -> 录制时的ID（循环复用）"""
+        if not names:
+            return None
+        if isinstance(channel_id, int) and channel_id >= start:
+            return names[(channel_id - start) % len(names)]
+        if isinstance(channel_id, str) and channel_id.startswith('UCreplay'):
+            return names[int(channel_id[8:]) % len(names)]
+        return str(channel_id)
+
+    def _load(self, kind, name):
+        key = (kind, name)
+        if key not in self.cache:
+            self.cache[key] = self.store.load(kind, name)
+        return self.cache[key]
+
+    def bilibili_page(self, uid, pn, ps):
+        source = self._source(self.bilibili, uid, 10 ** 12)
+        raw = self._load('bilibili', f"{source}-{pn}-{ps}")
+        if raw is None:
+            return {'list': {'vlist': []}}
+        vlist = []
+        for v in raw.get('list', {}).get('vlist', []):
+            v = dict(v)
+            v['created'] = int(v['created'] + self.offset)
+            if str(uid) != source:
+                v['bvid'] = f"{v['bvid']}_{uid}"
+            vlist.append(v)
+        return {'list': {'vlist': vlist}}
+
+    def feed(self, channel_id):
+        source = self._source(self.feeds, channel_id, 0)
+        videos = self._load('youtube_feed', source) if source else None
+        if videos is None:
+            return None
+        result = []
+        for v in videos:
+            record = VideoRecord.from_dict(v, platform='youtube')
+            record.created = int(record.created + self.offset)
+            record.channel = channel_id
+            if channel_id != source:
+                record.id = f"{record.id}_{channel_id}"
+            result.append(record)
+        return result
+
+    def channel_item(self, channel_id):
+        source = self._source(self.channels, channel_id, 0)
+        item = self._load('youtube_channels', source) if source else None
+        if item is None:
+            return None
+        item = json.loads(json.dumps(item))
+        if channel_id != source:
+            # 合成频道使用自己的 uploads playlist ID，回放时映射回录制的 playlist
+            uploads = item['contentDetails']['relatedPlaylists']
+            synthetic = "UU" + channel_id[2:]
+            self.playlist_sources[synthetic] = uploads['uploads']
+            uploads['uploads'] = synthetic
+            item['id'] = channel_id
+        return item
+
+    def playlist(self, playlist_id):
+        source = self.playlist_sources.get(playlist_id, playlist_id)
+        raw = self._load('youtube_playlists', source)
+        if raw is None:
+            return {'items': []}
+        raw = json.loads(json.dumps(raw))
+        for item in raw.get('items', []):
+            snippet = item['snippet']
+            if playlist_id != source:
+                snippet['resourceId']['videoId'] += f"_{playlist_id}"
+            published = datetime.datetime.fromisoformat(snippet['publishedAt'].replace('Z', '+00:00'))
+            published += datetime.timedelta(seconds=self.offset)
+            snippet['publishedAt'] = published.strftime('%Y-%m-%dT%H:%M:%SZ')
+        return raw
+
+
+def install_replayer(main, store, faults=None):
+    """在 main 模块上安装回放器，返回 Replayer"""
+    faults = faults or FaultProfile()
+    replayer = Replayer(store, faults)
+
+    class ReplayUser:
+        def __init__(self, uid, *args, **kwargs):
+            self.uid = uid
+
+        async def get_videos(self, pn=1, ps=30, **kwargs):
+            await asyncio.sleep(faults.delay())
+            if faults.throttled():
+                raise Exception("-352 风控校验失败")
+            if faults.error():
+                raise Exception("注入的网络错误")
+            return replayer.bilibili_page(self.uid, pn, ps)
+
+    main.user = SimpleNamespace(User=ReplayUser)
+
+    class ReplayRequest:
+        def __init__(self, fn):
+            self.fn = fn
+
+        def execute(self, **kwargs):
+            time.sleep(faults.delay())
+            if faults.error():
+                raise Exception("注入的网络错误")
+            return self.fn()
+
+    class ReplayYoutubeClient:
+        def channels(self):
+            return SimpleNamespace(list=lambda id, **kw: ReplayRequest(lambda: {
+                'items': [item for item in map(replayer.channel_item, id.split(',')) if item]
+            }))
+
+        def playlistItems(self):
+            return SimpleNamespace(list=lambda playlistId, **kw: ReplayRequest(lambda: replayer.playlist(playlistId)))
+
+    client = ReplayYoutubeClient()
+    main.get_youtube_client = lambda: client
+    main._thread_http = lambda: None
+
+    class ReplayFeedFetcher:
+        def __init__(self, limiter, cache, *args, metrics=None, **kwargs):
+            self.limiter = limiter
+            self.metrics = metrics
+            self.downloaded_bytes = 0
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+        async def fetch(self, channel_id):
+            async with self.limiter:
+                timer = self.metrics.request('youtube', channel_id) if self.metrics else contextlib.nullcontext()
+                with timer:
+                    await asyncio.sleep(faults.delay())
+                if faults.error():
+                    return None
+            self.limiter.on_success()
+            return replayer.feed(channel_id)
+
+    main.YoutubeFeedFetcher = ReplayFeedFetcher
+    _install_smtp(main, None, faults)
+    return replayer
+
+
+# ================= 合成夹具 =================
+
+def synthesize(store, uids=20, channels=10, pages=2, page_size=10, seed=42):
+    """生成与真实接口结构相同的合成夹具，发布间隔、标题随机"""
+    rng = random.Random(seed)
+    now = int(time.time())
+    words = ["AIGC", "大模型", "教程", "评测", "Vlog", "开箱", "游戏", "AI绘画", "编程", "日常"]
+    store.mark_recorded()
+    for u in range(uids):
+        uid = 100000 + u
+        created = now - rng.randrange(3600)
+        for pn in range(1, pages + 1):
+            vlist = []
+            for i in range(page_size):
+                vlist.append({
+                    'bvid': f"BVsyn{uid}{pn:02d}{i:02d}",
+                    'title': ' '.join(rng.sample(words, 3)),
+                    'description': '',
+                    'created': created,
+                    'author': f"UP主{uid}",
+                })
+                created -= rng.randrange(3600, 3 * 86400)
+            store.save('bilibili', f"{uid}-{pn}-{page_size}", {'list': {'vlist': vlist}})
+    for c in range(channels):
+        channel_id = f"UCsyn{c:019d}"
+        playlist_id = "UU" + channel_id[2:]
+        store.save('youtube_channels', channel_id, {
+            'id': channel_id,
+            'snippet': {'title': f"Channel {c}"},
+            'contentDetails': {'relatedPlaylists': {'uploads': playlist_id}},
+        })
+        created = now - rng.randrange(3600)
+        videos, items = [], []
+        for i in range(15):
+            title = ' '.join(rng.sample(words, 3))
+            video_id = f"syn{c:04d}{i:04d}"
+            videos.append(VideoRecord(video_id, 'youtube', channel_id, f"Channel {c}", title, '', created).to_dict())
+            items.append({'snippet': {'resourceId': {'videoId': video_id}, 'title': title, 'description': '',
+                                      'publishedAt': datetime.datetime.utcfromtimestamp(created).strftime('%Y-%m-%dT%H:%M:%SZ')}})
+            created -= rng.randrange(3600, 3 * 86400)
+        store.save('youtube_feed', channel_id, videos)
+        store.save('youtube_playlists', playlist_id, {'items': items[:10]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取录制 / 合成夹具")
+    parser.add_argument('command', choices=['record', 'synth'])
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help="夹具目录")
+    parser.add_argument('--send', action='store_true', help="录制时真的发送邮件（默认只录制邮件内容）")
+    parser.add_argument('--uids', type=int, default=20, help="synth: 合成的B站UP主数")
+    parser.add_argument('--channels', type=int, default=10, help="synth: 合成的YouTube频道数")
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures)
+    if args.command == 'synth':
+        synthesize(store, uids=args.uids, channels=args.channels)
+        print(f"已生成合成夹具：{args.fixtures}")
+        return
+
+    import main as app
+    install_recorder(app, store, send=args.send)
+    asyncio.run(app.main())
+    print(f"\n已录制到 {args.fixtures}：B站 {len(store.names('bilibili'))} 页，"
+          f"YouTube 订阅源 {len(store.names('youtube_feed'))} 个，API {len(store.names('youtube_playlists'))} 个")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+抓取结果缓存
+所有抓取器共用的磁盘缓存：按请求缓存解析后的结果，命中时完全跳过下载和解析。
+
+- 每个平台单独设置 TTL：TTL 内直接命中；过期后带上 ETag / Last-Modified 做条件请求，
+  服务器返回 304 时沿用缓存结果（不支持条件请求的抓取器过期即重新抓取）
+- 缓存总大小超过上限时按最近访问时间 (LRU) 淘汰
+- 统计命中 / 未命中 / 304 次数和节省的下载字节数
+- 分片模式下多个进程共用同一个缓存目录：保存时在文件锁内重新读取 index.json，只写回本进程改动过的条目
+"""
+
+import os
+import json
+import time
+import hashlib
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl：不加锁（Windows 上不使用分片模式）
+    fcntl = None
+
+
+class ResponseCache:
+    """磁盘缓存：index.json 保存元数据，每条结果单独存为 <key>.json，只在命中时读取"""
+
+    def __init__(self, directory=".cache/responses", ttls=None, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.ttls = ttls or {}
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._load_index()
+        # 本进程新增 / 更新过的条目和删除的条目，保存时与其他进程写入的 index.json 合并
+        self.touched = set()
+        self.removed = set()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+
+    def _load_index(self):
+        path = os.path.join(self.directory, 'index.json')
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    @staticmethod
+    def make_key(platform, *parts):
+        raw = '|'.join([platform] + [str(p) for p in parts])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_body(self, key):
+        try:
+            with open(self._body_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            # 缓存文件丢失或损坏：当作未缓存
+            self.index.pop(key, None)
+            self.touched.discard(key)
+            self.removed.add(key)
+            return None
+
+    def get_fresh(self, platform, key):
+        """TTL 内的缓存结果（计为命中），没有则返回 None"""
+        entry = self.index.get(key)
+        if not entry or time.time() - entry['stored_at'] > self.ttls.get(platform, 0):
+            return None
+        value = self._read_body(key)
+        if value is None:
+            return None
+        entry['last_access'] = time.time()
+        self.touched.add(key)
+        self.hits += 1
+        self.bytes_saved += entry['size']
+        return value
+
+    def validators(self, key):
+        """条件请求头（If-None-Match / If-Modified-Since）"""
+        entry = self.index.get(key) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidate(self, key):
+        """服务器返回 304：刷新存储时间并返回缓存结果；缓存文件已丢失时返回 None"""
+        entry = self.index.get(key)
+        if not entry:
+            return None
+        value = self._read_body(key)
+        if value is None:
+            return None
+        now = time.time()
+        entry['stored_at'] = now
+        entry['last_access'] = now
+        self.touched.add(key)
+        self.revalidated += 1
+        self.bytes_saved += entry['size']
+        return value
+
+    def store(self, platform, key, value, size, etag=None, last_modified=None):
+        """保存一次真实请求的解析结果；size 为下载的字节数（拿不到原始响应的接口为估算值），用于统计节省的流量"""
+        self.misses += 1
+        with open(self._body_path(key), 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        now = time.time()
+        self.index[key] = {
+            'platform': platform,
+            'stored_at': now,
+            'last_access': now,
+            'size': size,
+            'disk_size': os.path.getsize(self._body_path(key)),
+            'etag': etag,
+            'last_modified': last_modified,
+        }
+        self.touched.add(key)
+        self.removed.discard(key)
+
+    def _evict(self):
+        total = sum(e['disk_size'] for e in self.index.values())
+        if total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['disk_size']
+            del self.index[key]
+            self.touched.discard(key)
+            self.removed.add(key)
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            evicted += 1
+        return evicted
+
+    def report(self):
+        total = self.hits + self.revalidated + self.misses
+        print(f"抓取缓存：命中 {self.hits} 次，304 复用 {self.revalidated} 次，未命中 {self.misses} 次"
+              f"（共 {total} 次），节省下载 {self.bytes_saved / 1024:.1f} KB")
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """index.json 的文件锁：读取、合并、写回之间不让其他进程插进来"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, 'index.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _merge(self, on_disk):
+        """以 index.json 的当前内容为准，加上本进程改动的条目；同一条目两边都改过时保留较新的"""
+        for key in self.removed:
+            on_disk.pop(key, None)
+        for key in self.touched:
+            mine = self.index[key]
+            theirs = on_disk.get(key)
+            newer = (mine['stored_at'], mine['last_access']) >= (theirs['stored_at'], theirs['last_access']) if theirs else True
+            if newer:
+                on_disk[key] = mine
+        return on_disk
+
+    def save(self):
+        with self._locked():
+            self.index = self._merge(self._load_index())
+            evicted = self._evict()
+            if not (self.touched or self.removed):
+                # 本进程没有改动（如分片模式的协调进程）：不写回
+                return
+            if evicted:
+                print(f"抓取缓存超过 {self.max_bytes / 1024 / 1024:.0f} MB，淘汰 {evicted} 条最久未使用的记录")
+            # 先写临时文件再替换：读取 index.json 的进程不会读到写了一半的文件
+            path = os.path.join(self.directory, 'index.json')
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, path)
+            self.touched.clear()
+            self.removed.clear()
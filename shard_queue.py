@@ -0,0 +1,195 @@
+"""
+分片抓取
+把监控的UP主/频道按一致性哈希分到 N 个分片，由多个工作进程（可以在不同机器上）各自抓取自己的分片，
+通过一个 SQLite 任务队列协调：
+- 协调进程建队列、分配任务，等工作进程做完后统一做去重、关键词过滤、保存历史和发一封通知
+- 工作进程只负责抓取，把原始结果和推进后的游标写回队列，不写任何本地状态文件
+- 领取任务是原子的（BEGIN IMMEDIATE），自己的分片做完后会接手其他分片未领取或超时未完成的任务
+
+多台机器共用时，队列文件放在共享存储上（如 NFS）。
+"""
+
+import bisect
+import hashlib
+import json
+import sqlite3
+import time
+
+
+class HashRing:
+    """一致性哈希环：增减分片时只有少量频道换分片（对应的游标和缓存仍然有效）"""
+
+    def __init__(self, nodes, replicas=100):
+        self.ring = []
+        for node in nodes:
+            for i in range(replicas):
+                self.ring.append((self._hash(f"{node}#{i}"), node))
+        self.ring.sort()
+        self.hashes = [h for h, _ in self.ring]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def node_for(self, key):
+        idx = bisect.bisect(self.hashes, self._hash(key)) % len(self.ring)
+        return self.ring[idx][1]
+
+
+def partition(channels, shards):
+    """channels: [(platform, channel_id), ...]，返回 {分片号: [(platform, channel_id), ...]}"""
+    ring = HashRing(range(shards))
+    result = {shard: [] for shard in range(shards)}
+    for platform, channel_id in channels:
+        result[ring.node_for(f"{platform}:{channel_id}")].append((platform, channel_id))
+    return result
+
+
+class WorkQueue:
+    """SQLite 任务队列
+
+    tasks: 每个UP主/频道一行，status 为 pending -> claimed -> done / failed
+    - payload: 协调进程给的抓取参数（since、当前游标；YouTube 频道还有本任务可用的配额份额 youtube_quota）
+    - result: 工作进程抓到的视频列表（JSON），失败为 NULL
+    - error: 失败时的 [错误类别, 错误信息]（见 channel_health），由协调进程记入频道健康状态
+    - cursor: 抓取后推进的游标，由协调进程合并回 cursors.json
+    - youtube_quota: 抓取该任务实际消耗的 YouTube 配额，由协调进程记入 youtube_quota.json
+    - meta / polled: 工作进程查到的频道元数据和 API 轮询时间，由协调进程合并回 channel_cache.json / youtube_quota.json
+    workers: 工作进程结束时间；任务已被别的进程接手后才提交的配额消耗也记在这里（配额确实用掉了）
+    """
+
+    def __init__(self, file_path, timeout=30):
+        self.file_path = file_path
+        self.conn = sqlite3.connect(file_path, timeout=timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " platform TEXT NOT NULL,"
+            " channel_id TEXT NOT NULL,"
+            " shard INTEGER NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " worker TEXT,"
+            " enqueued_at REAL,"
+            " claimed_at REAL,"
+            " payload TEXT,"
+            " result TEXT,"
+            " cursor TEXT,"
+            " error TEXT,"
+            " youtube_quota INTEGER NOT NULL DEFAULT 0,"
+            " meta TEXT,"
+            " polled INTEGER,"
+            " PRIMARY KEY (platform, channel_id)"
+            ")"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, shard)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS workers ("
+            " worker TEXT PRIMARY KEY,"
+            " youtube_quota INTEGER NOT NULL DEFAULT 0,"
+            " finished_at REAL"
+            ")"
+        )
+
+    def reset(self, tasks):
+        """清空上一次的队列并放入本次的任务：[(platform, channel_id, shard, payload), ...]"""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # 队列只在一次运行内有效，直接重建表（表结构变化时也不需要迁移）
+            self.conn.execute("DROP TABLE IF EXISTS tasks")
+            self.conn.execute("DROP TABLE IF EXISTS workers")
+            self._create_tables()
+            now = time.time()
+            self.conn.executemany(
+                "INSERT INTO tasks (platform, channel_id, shard, enqueued_at, payload) VALUES (?, ?, ?, ?, ?)",
+                [(platform, str(cid), shard, now, json.dumps(payload)) for platform, cid, shard, payload in tasks],
+            )
+
+    def claim(self, shard, worker, limit=20, steal_after=30, stale_after=600):
+        """领取一批任务
+
+        优先领取自己分片的任务；入队超过 steal_after 秒仍无人领取的其他分片任务（对应工作进程慢或没启动）
+        以及领取后超过 stale_after 秒未完成的任务（工作进程可能已崩溃）也可以接手。
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT platform, channel_id, payload FROM tasks"
+                " WHERE (status = 'pending' AND (shard = ? OR enqueued_at < ?))"
+                " OR (status = 'claimed' AND claimed_at < ?)"
+                " ORDER BY shard != ?, status = 'claimed'"
+                " LIMIT ?",
+                (shard, now - steal_after, now - stale_after, shard, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE tasks SET status = 'claimed', worker = ?, claimed_at = ? WHERE platform = ? AND channel_id = ?",
+                [(worker, now, platform, cid) for platform, cid, _ in rows],
+            )
+        return [(platform, cid, json.loads(payload)) for platform, cid, payload in rows]
+
+    def complete(self, platform, channel_id, worker, videos, cursor=None, error=None, youtube_quota=0,
+                 meta=None, polled=None):
+        """提交一个任务的结果，返回是否被接受
+
+        videos 为 None 表示抓取失败，error 为 (错误类别, 错误信息)，youtube_quota 为抓取消耗的配额，
+        meta 为频道元数据（dict），polled 为通过 API 轮询的时间。
+        任务已被别的进程接手时忽略结果，只记下配额消耗。
+        """
+        status = 'failed' if videos is None else 'done'
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            accepted = self.conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, cursor = ?, error = ?, youtube_quota = ?, meta = ?, polled = ?"
+                " WHERE platform = ? AND channel_id = ? AND worker = ? AND status = 'claimed'",
+                (status, None if videos is None else json.dumps(videos, ensure_ascii=False),
+                 None if cursor is None else json.dumps(cursor),
+                 None if error is None else json.dumps(error, ensure_ascii=False), youtube_quota,
+                 None if meta is None else json.dumps(meta, ensure_ascii=False), polled,
+                 platform, str(channel_id), worker),
+            ).rowcount > 0
+            if not accepted and youtube_quota:
+                self.conn.execute("INSERT OR IGNORE INTO workers (worker) VALUES (?)", (worker,))
+                self.conn.execute(
+                    "UPDATE workers SET youtube_quota = youtube_quota + ? WHERE worker = ?", (youtube_quota, worker)
+                )
+        return accepted
+
+    def finish_worker(self, worker):
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO workers (worker) VALUES (?)", (worker,))
+            self.conn.execute("UPDATE workers SET finished_at = ? WHERE worker = ?", (time.time(), worker))
+
+    def pending(self):
+        return self.conn.execute("SELECT COUNT(*) FROM tasks WHERE status = 'pending'").fetchone()[0]
+
+    def unfinished(self):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'claimed')"
+        ).fetchone()[0]
+
+    def results(self):
+        """已结束的任务：(platform, channel_id, videos 或 None, cursor 或 None, (错误类别, 错误信息) 或 None,
+        频道元数据或 None, API 轮询时间或 None)"""
+        for platform, cid, result, cursor, error, meta, polled in self.conn.execute(
+            "SELECT platform, channel_id, result, cursor, error, meta, polled FROM tasks"
+            " WHERE status IN ('done', 'failed')"
+        ):
+            yield (platform, cid,
+                   None if result is None else json.loads(result),
+                   None if cursor is None else json.loads(cursor),
+                   None if error is None else tuple(json.loads(error)),
+                   None if meta is None else json.loads(meta),
+                   polled)
+
+    def youtube_quota_used(self):
+        """所有工作进程消耗的 YouTube 配额：各任务提交的加上被接手的任务提交晚了的"""
+        return self.conn.execute(
+            "SELECT (SELECT COALESCE(SUM(youtube_quota), 0) FROM tasks)"
+            " + (SELECT COALESCE(SUM(youtube_quota), 0) FROM workers)"
+        ).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,173 @@
+"""
+数据源适配器
+每个平台（B站投稿、YouTube 频道……）实现一个 SourceAdapter，抓取引擎 (main.collect_new_videos)
+对所有数据源统一调度：各自的限流器并发抓取，结果放进同一个队列，由同一套去重 / 关键词过滤处理。
+
+内置的 B站 / YouTube 适配器在 main.py 中注册。其他数据源通过 entry point 注册，不需要改动本仓库：
+
+    # 第三方包的 pyproject.toml
+    [project.entry-points."up_monitor.sources"]
+    douyin = "up_monitor_douyin:DouyinSource"
+
+要监控的频道在 up_list.py 的 EXTRA_SOURCE_CHANNELS 中按平台配置。
+"""
+
+import json
+import asyncio
+
+from video_record import VideoRecord, VIDEO_URLS
+
+ENTRY_POINT_GROUP = 'up_monitor.sources'
+
+
+class SourceAdapter:
+    """数据源适配器
+
+    子类设置类属性：
+    - platform: 平台名，用于历史记录、游标、运行指标和抓取缓存（如 'douyin'）
+    - label: 通知和日志中的平台显示名（如 '抖音'）
+    - channel_label: 日志中频道ID前的称呼（如 'UID'、'YouTube 频道'）
+    - video_url: 视频链接模板，{} 处填视频ID
+    - rate_limits: {限流器名: AdaptiveRateLimiter 参数}，main.py 的 RATE_LIMIT_CONFIG 中同名的配置优先
+    - cache_ttls: {抓取缓存类别: 有效期秒数}，main.py 的 RESPONSE_CACHE_TTL 中同名的配置优先
+
+    子类实现 fetch_raw() 和 normalize()；需要分页、缓存等自定义流程时可以直接重写 fetch()。
+    cache_ttls 中有与 platform 同名的类别时，默认的 fetch() 在有效期内直接复用上次的结果；
+    其他类别由子类通过 self.cache (ResponseCache) 自行读写。
+    去重用的历史记录 key 和通知中的视频链接分别由 video_key() / url() 决定，子类可以重写。
+    适配器是异步上下文管理器，需要共享会话的数据源在 __aenter__ / __aexit__ 中打开和关闭。
+    """
+
+    platform = None
+    label = None
+    channel_label = "频道"
+    video_url = None
+    rate_limits = {}
+    cache_ttls = {}
+
+    def __init__(self, limiters, incremental=True, cache=None):
+        # 引擎创建的全部限流器，适配器按 rate_limits 中的名字取用自己的
+        self.limiters = limiters
+        # False 时不使用增量游标，抓取时间窗口内的全部视频（本地测试用）
+        self.incremental = incremental
+        # 所有数据源共用的抓取缓存 (ResponseCache)，为 None 时不缓存
+        self.cache = cache
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    @classmethod
+    def channels(cls):
+        """要监控的频道ID列表"""
+        from up_list import EXTRA_SOURCE_CHANNELS
+        return list(EXTRA_SOURCE_CHANNELS.get(cls.platform, []))
+
+    @classmethod
+    def skips_keywords(cls, channel_id):
+        """该频道是否跳过关键词过滤（相当于 NO_FILTER_UIDS）"""
+        return False
+
+    @classmethod
+    def parse_channel_id(cls, value):
+        """分片任务队列中的字符串ID -> 频道ID"""
+        return value
+
+    async def fetch_raw(self, channel_id, since):
+        """抓取一个频道发布时间不早于 since 的原始条目列表，失败返回 None"""
+        raise NotImplementedError
+
+    def normalize(self, entry, channel_id):
+        """原始条目 -> VideoRecord"""
+        raise NotImplementedError
+
+    async def fetch(self, channel_id, since):
+        """抓取一个频道，返回 VideoRecord 列表；失败返回 None，没有新视频返回 []"""
+        cache_key = None
+        if self.cache is not None and self.platform in self.cache_ttls:
+            cache_key = self.cache.make_key(self.platform, channel_id)
+            cached = self.cache.get_fresh(self.platform, cache_key)
+            if cached is not None:
+                videos = [VideoRecord.from_dict(v) for v in cached]
+                return [v for v in videos if v.created >= since]
+        entries = await self.fetch_raw(channel_id, since)
+        if entries is None:
+            return None
+        videos = [self.normalize(entry, channel_id) for entry in entries]
+        if cache_key is not None:
+            value = [v.to_dict() for v in videos]
+            self.cache.store(self.platform, cache_key, value, len(json.dumps(value, ensure_ascii=False).encode('utf-8')))
+        return videos
+
+    async def fetch_all(self, channel_ids, produce, since):
+        """抓取多个频道，每个频道抓完即交给 produce(platform, channel_id, coro)"""
+        await asyncio.gather(*[
+            produce(self.platform, channel_id, self.fetch(channel_id, since)) for channel_id in channel_ids
+        ])
+
+    @classmethod
+    def video_key(cls, video_id):
+        """历史记录中的 key（去重用）"""
+        from history_store import join_key
+        return join_key(cls.platform, video_id)
+
+    @classmethod
+    def url(cls, video_id):
+        """通知中的视频链接"""
+        return cls.video_url.format(video_id)
+
+
+# 平台名 -> 适配器类，按注册顺序
+_registry = {}
+
+
+def register_source(cls):
+    """注册适配器类（可用作类装饰器）；同名平台后注册的覆盖先注册的"""
+    if not cls.platform:
+        raise ValueError(f"{cls.__name__} 没有设置 platform")
+    _registry[cls.platform] = cls
+    if cls.video_url:
+        VIDEO_URLS[cls.platform] = cls.video_url
+    # 通知分组标题和阶段耗时的显示名
+    from digest_renderer import PLATFORM_LABELS
+    from metrics import STAGE_LABELS
+    PLATFORM_LABELS.setdefault(cls.platform, cls.label or cls.platform)
+    STAGE_LABELS.setdefault(f'fetch_{cls.platform}', f"{cls.label or cls.platform}抓取")
+    return cls
+
+
+def _entry_points():
+    from importlib.metadata import entry_points
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        return eps.select(group=ENTRY_POINT_GROUP)
+    return eps.get(ENTRY_POINT_GROUP, [])  # Python 3.9
+
+
+_plugins_loaded = False
+
+
+def load_plugins():
+    """载入通过 entry point 注册的适配器（只载入一次），载入失败的跳过"""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    for ep in _entry_points():
+        try:
+            register_source(ep.load())
+        except Exception as e:
+            print(f"⚠️  数据源插件 {ep.name} 载入失败: {e}")
+
+
+def source_classes():
+    """所有已注册的适配器类（内置的在前）"""
+    load_plugins()
+    return list(_registry.values())
+
+
+def get_source_class(platform):
+    load_plugins()
+    return _registry[platform]
@@ -10,13 +10,18 @@ import sys
 
 # 导入main.py中的函数和配置
 from main import (
-    fetch_videos_from_up,
-    fetch_youtube_videos,
     filter_content,
-    CONCURRENCY_LIMIT,
+    rate_limit_config,
+    create_rate_limiters,
+    create_sources,
+    open_sources,
+    all_channels,
+    render_digest,
+    init_state,
+    channel_name,
     HistoryManager
 )
-from up_list import TARGET_UIDS, UP_NAME_MAP, YOUTUBE_CHANNELS, YOUTUBE_NO_FILTER_CHANNELS
+from sources import source_classes, get_source_class
 
 # ================= 测试配置 =================
 
@@ -28,13 +33,15 @@ SEND_REAL_EMAIL = False
 
 # ===========================================
 
-# 使用测试用的历史记录文件
-test_memory = HistoryManager("history_test.json") if not USE_REAL_HISTORY else None
+# 历史记录在 main() 开始时载入，导入本脚本时不读文件
+test_memory = None
 
-# 导入真实的 memory 如果使用真实历史
-if USE_REAL_HISTORY:
-    from main import memory
-    test_memory = memory
+def open_test_memory():
+    """使用测试用的历史记录文件；USE_REAL_HISTORY 时使用 main.py 的真实历史记录"""
+    if USE_REAL_HISTORY:
+        import main as monitor
+        return monitor.memory
+    return HistoryManager("history_test.json")
 
 async def test_send_notification(content, title_prefix):
     """测试用的通知函数：只打印不发送邮件"""
@@ -44,26 +51,18 @@ async def test_send_notification(content, title_prefix):
     print(f"主题: {title_prefix}")
     print("-"*70)
     
-    # 将HTML转换为可读的文本格式
-    text_content = content \
-        .replace("<ul>", "\n") \
-        .replace("</ul>", "\n") \
-        .replace("<li style='margin-bottom:8px'>", "  • ") \
-        .replace("<li>", "  • ") \
-        .replace("</li>", "\n") \
-        .replace("<b>", "") \
-        .replace("</b>", "") \
-        .replace("<a href='", "(") \
-        .replace("'>", ") ") \
-        .replace("</a>", "")
-    
-    print(text_content)
+    # 预览与邮件一同发送的纯文本版本
+    print(content.text)
     print("="*70)
     print("⚠️  这是测试模式，邮件未实际发送")
     print("="*70 + "\n")
     return True
 
 async def main():
+    global test_memory
+    init_state()
+    test_memory = open_test_memory()
+    
     print("\n" + "="*70)
     print("🧪 B站UP主视频监控系统 - 本地测试脚本")
     print("="*70 + "\n")
@@ -100,36 +99,44 @@ async def main():
         }
     
     # 导入配置信息
-    from up_list import UP_LIST, NO_FILTER_UIDS, KEYWORDS
+    from up_list import KEYWORDS
     
     print(f"⏰ 时间窗口: {config['window'] / 3600:.1f} 小时")
-    print(f"📅 监控 {len(TARGET_UIDS)} 个B站UP主")
-    if YOUTUBE_CHANNELS:
-        print(f"📺 监控 {len(YOUTUBE_CHANNELS)} 个YouTube频道")
-    print(f"⚙️  并发限制: {CONCURRENCY_LIMIT}")
+    for cls in source_classes():
+        if cls.channels():
+            print(f"📅 监控 {len(cls.channels())} 个{cls.label}频道")
+    for platform, params in rate_limit_config().items():
+        print(f"⚙️  限流策略 [{platform}]: 初始 {params['initial_rate']} 次/秒，上限 {params['max_rate']} 次/秒")
     
-    # 显示配置信息 - B站UP主
-    print(f"\n📋 B站UP主列表:")
-    for uid in TARGET_UIDS:
-        # 使用UP_NAME_MAP获取UP主名字，支持NO_FILTER_UIDS中的UP主
-        up_name = UP_NAME_MAP.get(uid, f"UID_{uid}")
-        is_special = uid in NO_FILTER_UIDS
-        status = "⭐ 特殊（不过滤关键词）" if is_special else f"🔍 关键词: {', '.join(KEYWORDS)}"
-        print(f"   - {up_name} (UID: {uid}) - {status}")
-    
-    # 显示配置信息 - YouTube频道
-    if YOUTUBE_CHANNELS:
-        print(f"\n📺 YouTube频道列表:")
-        for channel_id in YOUTUBE_CHANNELS.keys():
-            channel_name = YOUTUBE_CHANNELS.get(channel_id, f"Channel_{channel_id}")
-            is_special = channel_id in YOUTUBE_NO_FILTER_CHANNELS
-            status = "⭐ 特殊（不过滤关键词）" if is_special else f"🔍 关键词: {', '.join(KEYWORDS)}"
-            print(f"   - {channel_name} (ID: {channel_id}) - {status}")
+    # 显示配置信息：各数据源的UP主/频道
+    for cls in source_classes():
+        if not cls.channels():
+            continue
+        print(f"\n📋 {cls.label}频道列表:")
+        for channel_id in cls.channels():
+            # 名字来自频道元数据缓存（query_up_names.py 维护），不发请求
+            name = channel_name(cls.platform, channel_id)
+            status = "⭐ 特殊（不过滤关键词）" if cls.skips_keywords(channel_id) else f"🔍 关键词: {', '.join(KEYWORDS)}"
+            print(f"   - {name} (ID: {channel_id}) - {status}")
     print()
     
-    # 2. 并发获取视频
+    # 2. 并发获取视频：与 main.py 使用同一套数据源适配器，但不使用增量游标，抓取时间窗口内的全部视频
     print("开始抓取视频...\n")
-    semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
+    limiters = create_rate_limiters()
+    since = config['now'] - config['window']
+    results = []
+    
+    async def collect(platform, channel_id, coro):
+        try:
+            results.append((platform, channel_id, await coro))
+        except Exception as e:
+            results.append((platform, channel_id, e))
+    
+    async with open_sources(create_sources(limiters, incremental=False)) as sources:
+        await asyncio.gather(*[source.fetch_all(source.channels(), collect, since) for source in sources])
+    # 按配置顺序输出
+    order = {channel: i for i, channel in enumerate(all_channels())}
+    results.sort(key=lambda r: order.get((r[0], r[1]), len(order)))
     
     valid_videos = []
     success_count = 0
@@ -139,118 +146,52 @@ async def main():
     skipped_by_keyword = 0
     skipped_by_history = 0
     
-    # 2.1 获取B站视频
-    if TARGET_UIDS:
-        bilibili_tasks = [fetch_videos_from_up(uid, semaphore) for uid in TARGET_UIDS]
-        bilibili_results = await asyncio.gather(*bilibili_tasks, return_exceptions=True)
+    for platform, channel_id, result in results:
+        source = get_source_class(platform)
+        if isinstance(result, Exception):
+            fail_count += 1
+            print(f"❌ {source.channel_label} {channel_id} 获取异常: {result}")
+            continue
         
-        for i, result in enumerate(bilibili_results):
-            if isinstance(result, Exception):
-                fail_count += 1
-                print(f"❌ UID {TARGET_UIDS[i]} 获取异常: {result}")
-                continue
-            
-            if not result:
-                fail_count += 1
-                continue
-            
-            success_count += 1
-            current_uid = TARGET_UIDS[i]
-            # 使用UP_NAME_MAP获取UP主名字，支持NO_FILTER_UIDS中的UP主
-            up_name = UP_NAME_MAP.get(current_uid, f"UID_{current_uid}")
-            is_special = current_uid in NO_FILTER_UIDS
-            
-            print(f"\n📋 B站UP主: {up_name} (UID: {current_uid})")
-            if is_special:
-                print(f"   ⭐ 特殊UP主：跳过关键词过滤")
-            else:
-                print(f"   🔍 关键词过滤：{', '.join(KEYWORDS)}")
-            
-            print(f"   获取到 {len(result)} 个视频")
-            
-            for v in result:
-                bvid = v['bvid']
-                total_videos += 1
-                
-                # 记忆去重
-                if test_memory.is_processed(bvid):
-                    skipped_by_history += 1
-                    continue
-                
-                # 检查时间过滤
-                video_time = v['created']
-                time_diff = config['now'] - video_time
-                if time_diff > config['window']:
-                    hours_ago = time_diff / 3600
-                    skipped_by_time += 1
-                    continue
-                
-                # 过滤判断
-                if await filter_content(v, config, up_uid=current_uid, platform='bilibili'):
-                    time_str = time.strftime("%m-%d %H:%M", time.localtime(video_time))
-                    print(f"   ✅ 发现新视频 [{time_str}]: {v['title']}")
-                    valid_videos.append(v)
-                    test_memory.add(bvid)
-                else:
-                    # 如果不匹配，说明关键词过滤失败（特殊UP主不会走到这里）
-                    skipped_by_keyword += 1
-    
-    # 2.2 获取YouTube视频
-    youtube_channel_ids = list(YOUTUBE_CHANNELS.keys()) if YOUTUBE_CHANNELS else []
-    if youtube_channel_ids:
-        youtube_tasks = [fetch_youtube_videos(channel_id, semaphore) for channel_id in youtube_channel_ids]
-        youtube_results = await asyncio.gather(*youtube_tasks, return_exceptions=True)
+        if result is None:
+            fail_count += 1
+            continue
+        
+        success_count += 1
+        name = channel_name(platform, channel_id)
+        
+        print(f"\n📋 {source.label}: {name} (ID: {channel_id})")
+        if source.skips_keywords(channel_id):
+            print(f"   ⭐ 特殊频道：跳过关键词过滤")
+        else:
+            print(f"   🔍 关键词过滤：{', '.join(KEYWORDS)}")
         
-        for i, result in enumerate(youtube_results):
-            channel_id = youtube_channel_ids[i]
-            channel_name = YOUTUBE_CHANNELS.get(channel_id, f"Channel_{channel_id}")
+        print(f"   获取到 {len(result)} 个视频")
+        
+        for v in result:
+            total_videos += 1
             
-            if isinstance(result, Exception):
-                fail_count += 1
-                print(f"❌ YouTube 频道 {channel_id} 获取异常: {result}")
+            # 记忆去重（历史记录中的 key 由适配器的 video_key() 生成）
+            key = source.video_key(v.id)
+            if test_memory.is_processed(key):
+                skipped_by_history += 1
                 continue
             
-            if not result:
-                fail_count += 1
+            # 检查时间过滤
+            video_time = v.created
+            if config['now'] - video_time > config['window']:
+                skipped_by_time += 1
                 continue
             
-            success_count += 1
-            is_special = channel_id in YOUTUBE_NO_FILTER_CHANNELS
-            
-            print(f"\n📺 YouTube频道: {channel_name} (ID: {channel_id})")
-            if is_special:
-                print(f"   ⭐ 特殊频道：跳过关键词过滤")
+            # 过滤判断
+            if await filter_content(v, config, up_uid=channel_id, platform=platform):
+                time_str = time.strftime("%m-%d %H:%M", time.localtime(video_time))
+                print(f"   ✅ 发现新视频 [{time_str}]: {v.title}")
+                valid_videos.append(v)
+                test_memory.add(key)
             else:
-                print(f"   🔍 关键词过滤：{', '.join(KEYWORDS)}")
-            
-            print(f"   获取到 {len(result)} 个视频")
-            
-            for v in result:
-                video_id = v['video_id']
-                total_videos += 1
-                
-                # 记忆去重（注意：is_processed 检查的是存储的格式 "yt:video_id"）
-                youtube_key = f"yt:{video_id}"
-                if test_memory.is_processed(youtube_key):
-                    skipped_by_history += 1
-                    continue
-                
-                # 检查时间过滤
-                video_time = v['created']
-                time_diff = config['now'] - video_time
-                if time_diff > config['window']:
-                    hours_ago = time_diff / 3600
-                    skipped_by_time += 1
-                    continue
-                
-                # 过滤判断
-                if await filter_content(v, config, up_uid=channel_id, platform='youtube'):
-                    time_str = time.strftime("%m-%d %H:%M", time.localtime(video_time))
-                    print(f"   ✅ 发现新视频 [{time_str}]: {v['title']}")
-                    valid_videos.append(v)
-                    test_memory.add(video_id, platform='youtube')
-                else:
-                    skipped_by_keyword += 1
+                # 如果不匹配，说明关键词过滤失败（特殊UP主/频道不会走到这里）
+                skipped_by_keyword += 1
     
     print(f"\n📊 监控统计：")
     print(f"   ✅ 成功抓取: {success_count} 个频道/UP主")
@@ -263,40 +204,29 @@ async def main():
     
     # 4. 生成并显示报告
     if valid_videos:
-        # 按发布时间倒序排列（新的在前）
-        valid_videos.sort(key=lambda x: x['created'], reverse=True)
-        
-        msg = "<ul>"
-        for v in valid_videos:
-            time_str = time.strftime("%m-%d %H:%M", time.localtime(v['created']))
-            platform = v.get('platform', 'bilibili')
-            author = v.get('author', 'Unknown')
-            
-            if platform == 'youtube':
-                video_id = v.get('video_id', '')
-                url = f"https://www.youtube.com/watch?v={video_id}"
-            else:
-                bvid = v.get('bvid', '')
-                url = f"https://www.bilibili.com/video/{bvid}"
-            
-            platform_tag = "📺" if platform == 'youtube' else "📱"
-            msg += f"<li style='margin-bottom:8px'>[{time_str}] {platform_tag} <b>{author}</b>: <a href='{url}'>{v['title']}</a></li>"
-        msg += "</ul>"
+        msg = render_digest(valid_videos)
         
         # 发送通知（测试模式或真实模式）
+        delivered = True
         if SEND_REAL_EMAIL:
-            from main import send_notification
-            success = await send_notification(msg, config['title'])
-            if success:
+            from main import send_notification, close_notifier
+            from notifier import SENT, FAILED
+            status = await send_notification(msg, config['title'])
+            close_notifier()
+            if status == SENT:
                 print(f"✅ 邮件发送成功！共 {len(valid_videos)} 条\n")
             else:
                 print(f"❌ 邮件发送失败！请查看上方错误信息\n")
+            delivered = status != FAILED
         else:
             await test_send_notification(msg, config['title'])
         
-        # 保存记忆（如果使用真实历史记录）
+        # 保存记忆（如果使用真实历史记录）：通知没有送达时不提交，下次测试重新处理
         if USE_REAL_HISTORY:
-            test_memory.save_and_clean()
+            if delivered:
+                test_memory.commit()
+            else:
+                test_memory.rollback()
         else:
             # 测试模式：询问是否保存
             print(f"💾 测试模式使用临时文件: history_test.json")
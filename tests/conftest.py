@@ -0,0 +1,117 @@
+"""
+测试公共夹具
+main 的运行状态都是模块级全局变量，每个测试在临时目录中从空状态开始，结束后由 monkeypatch 还原。
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main as app
+from notifier import SENT
+from rate_limiter import AdaptiveRateLimiter
+from replay import FixtureStore, install_replayer, synthesize
+
+# init_state() 载入的状态，以及回放器会替换的平台 SDK 入口
+STATE = ('memory', 'cursors', 'channel_cache', 'channel_health', 'response_cache', 'youtube_quota', '_notifier')
+PATCHED = ('user', 'get_youtube_client', '_thread_http', 'YoutubeFeedFetcher', 'SmtpTransport')
+
+
+class ApiError(Exception):
+    """bilibili_api 接口返回错误码时的异常（带 code）"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def fake_user(script):
+    """假的 bilibili_api.user 模块：get_videos / get_user_info 按 script 依次返回或抛出（Exception 实例会被抛出）
+
+    返回 (模块, calls)，calls 依次记录每次请求的 UID。
+    """
+    calls = []
+
+    class FakeUser:
+        def __init__(self, uid, *args, **kwargs):
+            self.uid = uid
+
+        async def _next(self):
+            calls.append(self.uid)
+            result = script.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        async def get_videos(self, pn=1, ps=30, **kwargs):
+            return await self._next()
+
+        async def get_user_info(self):
+            return await self._next()
+
+    return SimpleNamespace(User=FakeUser), calls
+
+
+def make_limiter(name='bilibili', **kwargs):
+    """测试用的限流器：默认速率足够高，不用等令牌，也不打日志"""
+    params = dict(initial_rate=100.0, min_rate=1.0, max_rate=100.0, log_every=0)
+    params.update(kwargs)
+    return AdaptiveRateLimiter(name, **params)
+
+
+@pytest.fixture
+def fresh_state(tmp_path, monkeypatch):
+    """在临时目录中以空状态运行 main（历史记录、游标、缓存等相对路径的文件都写在这里）"""
+    monkeypatch.chdir(tmp_path)
+    for name in STATE:
+        monkeypatch.setattr(app, name, None)
+    monkeypatch.setattr(app, 'metrics', app.RunMetrics())
+    return app
+
+
+@pytest.fixture
+def replay_store(tmp_path):
+    """合成夹具（绝对路径，子进程也能用）"""
+    store = FixtureStore(str(tmp_path / 'fixtures'))
+    synthesize(store, uids=6, channels=4)
+    return store
+
+
+@pytest.fixture
+def replayed(fresh_state, replay_store, monkeypatch):
+    """用合成夹具回放：6 个B站UP主、4 个YouTube频道（订阅源），邮件只记录不发送
+
+    返回 (main, sent)，sent 为每次通知的视频列表。
+    """
+    for name in PATCHED:
+        monkeypatch.setattr(app, name, getattr(app, name))
+    replayer = install_replayer(app, replay_store)
+    monkeypatch.setattr(app, 'TARGET_UIDS', replayer.synthetic_uids(6))
+    monkeypatch.setattr(app, 'YOUTUBE_CHANNELS', {cid: cid for cid in replayer.synthetic_channels(4)})
+    monkeypatch.setattr(app, 'NO_FILTER_UIDS', list(app.TARGET_UIDS))
+    monkeypatch.setattr(app, 'YOUTUBE_NO_FILTER_CHANNELS', list(app.YOUTUBE_CHANNELS))
+    monkeypatch.setattr(app, 'YOUTUBE_USE_FEED', True)
+    # 回放没有网络延迟，放宽限流免得测试等在令牌桶上
+    monkeypatch.setattr(app, 'RATE_LIMIT_CONFIG', {
+        platform: dict(params, initial_rate=1000.0, max_rate=1000.0)
+        for platform, params in app.RATE_LIMIT_CONFIG.items()
+    })
+
+    sent = []
+    rendered = app.render_digest
+
+    def render_digest(videos):
+        sent.append(list(videos))
+        return rendered(videos)
+
+    async def send_notification(content, title_prefix):
+        return SENT
+
+    monkeypatch.setattr(app, 'render_digest', render_digest)
+    monkeypatch.setattr(app, 'send_notification', send_notification)
+    return app, sent
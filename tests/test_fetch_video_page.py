@@ -0,0 +1,75 @@
+"""B站投稿列表抓取：-352 风控时降速重试，其他错误不重试"""
+
+import pytest
+
+from channel_health import THROTTLED, NOT_FOUND
+from conftest import ApiError, fake_user, make_limiter
+
+
+PAGE = {'list': {'vlist': [
+    {'bvid': 'BV1', 'title': '标题一', 'description': '', 'created': 1700000000, 'author': 'UP'},
+    {'bvid': 'BV2', 'title': '标题二', 'description': '', 'created': 1699990000, 'author': 'UP'},
+]}}
+
+
+@pytest.fixture
+def app(fresh_state):
+    app = fresh_state
+    app.init_state()
+    return app
+
+
+def use_script(app, monkeypatch, script):
+    user, calls = fake_user(script)
+    monkeypatch.setattr(app, 'user', user)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_retries_after_352_and_backs_off(app, monkeypatch):
+    calls = use_script(app, monkeypatch, [Exception("-352 风控校验失败"), {'code': -352}, PAGE])
+    limiter = make_limiter(increase_step=10.0, burst=1)
+
+    videos = await app.fetch_video_page(946974, limiter)
+
+    assert [v.id for v in videos] == ['BV1', 'BV2']
+    assert len(calls) == 3
+    assert limiter.throttle_count == 2
+    assert limiter.success_count == 1
+    # 两次降速 100 -> 50 -> 25，成功一次加回 10
+    assert limiter.rate == 35.0
+    assert app.metrics.totals()['retries'] == 2
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_retry_count_throttles(app, monkeypatch):
+    calls = use_script(app, monkeypatch, [Exception("-352 风控校验失败")] * 3)
+    limiter = make_limiter()
+
+    assert await app.fetch_video_page(946974, limiter, retry_count=3) is None
+    assert len(calls) == 3
+    assert limiter.throttle_count == 3
+    assert app.channel_health.take_error('bilibili', 946974)[0] == THROTTLED
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried(app, monkeypatch):
+    calls = use_script(app, monkeypatch, [ApiError(-404, "啥都木有")])
+    limiter = make_limiter()
+
+    assert await app.fetch_video_page(946974, limiter) is None
+    assert len(calls) == 1
+    assert limiter.throttle_count == 0
+    assert app.channel_health.take_error('bilibili', 946974)[0] == NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_cached_page_skips_request(app, monkeypatch):
+    calls = use_script(app, monkeypatch, [PAGE])
+    limiter = make_limiter()
+
+    first = await app.fetch_video_page(946974, limiter)
+    second = await app.fetch_video_page(946974, limiter)
+
+    assert [v.id for v in second] == [v.id for v in first]
+    assert len(calls) == 1
@@ -0,0 +1,221 @@
+"""邮件发送：连接复用、断线重连、退避重试、5xx 不重试、发件箱暂存和补发
+
+用标准库写的本地 SMTP 桩（不需要 TLS 和登录），main 通过 SMTP_HOST / SMTP_PORT / SMTP_STARTTLS=0 连接。
+"""
+
+import socketserver
+import threading
+
+import pytest
+
+import notifier
+from notifier import SmtpTransport, Outbox, Notifier, SENT, SPOOLED
+
+
+class SmtpStubHandler(socketserver.StreamRequestHandler):
+    """只实现 smtplib 发信用到的命令；server.replies = {命令: [响应码, ...]} 按顺序注入错误响应"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def injected(self, command):
+        queue = self.server.replies.get(command)
+        if queue:
+            code = queue.pop(0)
+            self.reply(f"{code} injected error")
+            return True
+        return False
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 stub ESMTP")
+        mail_from, rcpts = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii').strip().split(' ', 1)[0].upper()
+            self.server.commands.append(command)
+            if command in ('EHLO', 'HELO'):
+                self.reply("250 stub")
+            elif command == 'NOOP':
+                self.reply("250 OK")
+            elif command == 'RSET':
+                mail_from, rcpts = None, []
+                self.reply("250 OK")
+            elif command == 'MAIL':
+                if not self.injected('MAIL'):
+                    mail_from = line.decode('ascii').split(':', 1)[1].strip()
+                    self.reply("250 OK")
+            elif command == 'RCPT':
+                if not self.injected('RCPT'):
+                    rcpts.append(line.decode('ascii').split(':', 1)[1].strip().strip('<>'))
+                    self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 go ahead")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data.append(chunk)
+                self.server.messages.append((mail_from, rcpts, b''.join(data).decode('utf-8')))
+                mail_from, rcpts = None, []
+                self.reply("250 queued")
+                if self.server.drop_after_message:
+                    # 模拟服务器空闲超时等原因主动断开
+                    return
+            elif command == 'QUIT':
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SmtpStubHandler)
+        self.connections = 0
+        self.commands = []
+        self.messages = []
+        self.replies = {}
+        self.drop_after_message = False
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def recipients(self):
+        return [rcpts for _, rcpts, _ in self.messages]
+
+
+@pytest.fixture
+def smtp_stub():
+    server = SmtpStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录退避等待的时长，不真的等"""
+    delays = []
+    monkeypatch.setattr(notifier.time, 'sleep', delays.append)
+    return delays
+
+
+def make_notifier(smtp_stub, tmp_path, recipients=('a@example.com',), max_retries=3):
+    transport = SmtpTransport('127.0.0.1', smtp_stub.port, starttls=False, timeout=5,
+                              max_retries=max_retries, backoff=1.0)
+    return Notifier(transport, 'bot@example.com', list(recipients), Outbox(str(tmp_path / 'outbox')))
+
+
+@pytest.fixture
+def configured(fresh_state, smtp_stub, monkeypatch):
+    """main 按环境变量连接本地 SMTP 桩（不登录、不 STARTTLS）"""
+    app = fresh_state
+    monkeypatch.setattr(app, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(app, 'SMTP_PORT', smtp_stub.port)
+    monkeypatch.setattr(app, 'SMTP_STARTTLS', False)
+    monkeypatch.setenv('GMAIL_SENDER', 'bot@example.com')
+    monkeypatch.delenv('GMAIL_APP_PASSWORD', raising=False)
+    monkeypatch.setenv('GMAIL_RECIPIENT', 'a@example.com, b@example.com,c@example.com')
+    yield app
+    app.close_notifier()
+
+
+@pytest.mark.asyncio
+async def test_one_connection_for_all_recipients(configured, smtp_stub):
+    app = configured
+    assert await app.send_notification(("<p>正文</p>", "正文"), "UGC监控日报") == SENT
+    assert await app.send_notification("<p>第二封</p>", "UGC监控日报") == SENT
+
+    assert smtp_stub.recipients() == [['a@example.com'], ['b@example.com'], ['c@example.com']] * 2
+    assert smtp_stub.connections == 1
+    assert app.get_notifier().transport.connects == 1
+    assert 'Subject: =?utf-8?' in smtp_stub.messages[0][2]
+
+
+@pytest.mark.asyncio
+async def test_reconnects_after_server_drops_connection(smtp_stub, tmp_path, sleeps):
+    smtp_stub.drop_after_message = True
+    sender = make_notifier(smtp_stub, tmp_path, recipients=('a@example.com', 'b@example.com'))
+
+    assert await sender.send("标题", "<p>正文</p>") == SENT
+    sender.close()
+
+    assert smtp_stub.recipients() == [['a@example.com'], ['b@example.com']]
+    assert smtp_stub.connections == 2
+    # 断线是在发送前的 NOOP 检查时发现的，直接重连，不算一次失败
+    assert sleeps == []
+
+
+@pytest.mark.asyncio
+async def test_temporary_errors_are_retried_with_backoff(smtp_stub, tmp_path, sleeps):
+    smtp_stub.replies['MAIL'] = [451, 421]
+    sender = make_notifier(smtp_stub, tmp_path)
+
+    assert await sender.send("标题", "<p>正文</p>") == SENT
+    sender.close()
+
+    assert smtp_stub.commands.count('MAIL') == 3
+    assert sleeps == [1.0, 2.0]
+    assert len(smtp_stub.messages) == 1
+    assert len(sender.outbox) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('command', ['MAIL', 'RCPT'])
+async def test_permanent_errors_are_not_retried_and_spooled(smtp_stub, tmp_path, sleeps, command):
+    smtp_stub.replies[command] = [550]
+    sender = make_notifier(smtp_stub, tmp_path)
+
+    assert await sender.send("标题", "<p>正文</p>") == SPOOLED
+    sender.close()
+
+    assert smtp_stub.commands.count(command) == 1
+    assert sleeps == []
+    assert smtp_stub.messages == []
+    [(_, entry)] = sender.outbox.entries()
+    assert (entry['recipient'], entry['title'], entry['attempts']) == ('a@example.com', "标题", 1)
+
+
+@pytest.mark.asyncio
+async def test_failed_sends_are_spooled_after_retries(smtp_stub, tmp_path, sleeps):
+    smtp_stub.replies['MAIL'] = [451, 451, 451]
+    sender = make_notifier(smtp_stub, tmp_path, recipients=('a@example.com', 'b@example.com'))
+
+    # 第一个收件人重试用尽后存入发件箱，第二个照常发出
+    assert await sender.send("标题", "<p>正文</p>") == SPOOLED
+    sender.close()
+
+    assert sleeps == [1.0, 2.0]
+    assert smtp_stub.recipients() == [['b@example.com']]
+    assert [entry['recipient'] for _, entry in sender.outbox.entries()] == ['a@example.com']
+
+
+@pytest.mark.asyncio
+async def test_flush_outbox_resends_and_removes(configured, smtp_stub, sleeps):
+    app = configured
+    smtp_stub.replies['MAIL'] = [451] * 3 * 3
+    assert await app.send_notification("<p>第一次</p>", "UGC监控日报") == SPOOLED
+    outbox = app.get_notifier().outbox
+    assert len(outbox) == 3
+    assert smtp_stub.messages == []
+
+    # 服务器仍然故障：补发失败的留在发件箱里，尝试次数加一，连接层面的错误不再继续补发剩下的
+    smtp_stub.replies['MAIL'] = [451] * 3
+    await app.flush_outbox()
+    assert sorted(entry['attempts'] for _, entry in outbox.entries()) == [1, 1, 2]
+
+    # 服务器恢复：全部补发并从发件箱删除
+    await app.flush_outbox()
+    assert len(outbox) == 0
+    assert sorted(smtp_stub.recipients()) == [['a@example.com'], ['b@example.com'], ['c@example.com']]
+    assert all('=?utf-8?' in message for _, _, message in smtp_stub.messages)
@@ -0,0 +1,80 @@
+"""查询UP主名字：风控和网络错误重试，接口错误不重试"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import query_up_names
+from conftest import ApiError, fake_user, make_limiter
+
+
+@pytest.fixture(autouse=True)
+def no_delay(monkeypatch):
+    monkeypatch.setattr(query_up_names, 'BILIBILI_RETRY_DELAY', 0)
+
+
+@pytest.mark.asyncio
+async def test_network_errors_and_timeouts_are_retried(monkeypatch):
+    user, calls = fake_user([ConnectionResetError("Connection reset by peer"), asyncio.TimeoutError(),
+                             ApiError(-352, "风控校验失败"), {'name': 'UP主', 'face': 'https://example.com/a.jpg'}])
+    monkeypatch.setattr(query_up_names, 'user', user)
+    limiter = make_limiter()
+
+    result = await query_up_names.get_user_info(946974, limiter)
+
+    assert result == {'uid': 946974, 'name': 'UP主', 'avatar': 'https://example.com/a.jpg', 'success': True}
+    assert len(calls) == 4
+    # 只有风控会降速
+    assert limiter.throttle_count == 1
+
+
+@pytest.mark.asyncio
+async def test_api_errors_are_not_retried(monkeypatch):
+    user, calls = fake_user([ApiError(-404, "啥都木有")])
+    monkeypatch.setattr(query_up_names, 'user', user)
+
+    result = await query_up_names.get_user_info(946974, make_limiter())
+
+    assert not result['success']
+    assert result['name'] == '查询失败: 啥都木有'
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_retries(monkeypatch):
+    user, calls = fake_user([asyncio.TimeoutError()] * 3)
+    monkeypatch.setattr(query_up_names, 'user', user)
+
+    result = await query_up_names.get_user_info(946974, make_limiter(), retries=3)
+
+    assert not result['success']
+    assert result['name'] == '查询失败: TimeoutError'
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrency_option_sets_limiter_slots(monkeypatch):
+    active = 0
+    peak = 0
+
+    class SlowUser:
+        def __init__(self, uid):
+            self.uid = uid
+
+        async def get_user_info(self):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {'name': str(self.uid)}
+
+    monkeypatch.setattr(query_up_names, 'user', SimpleNamespace(User=SlowUser))
+    monkeypatch.setattr(query_up_names, 'BILIBILI_RATE_LIMIT',
+                        dict(query_up_names.BILIBILI_RATE_LIMIT, initial_rate=1000.0, max_rate=1000.0))
+
+    results, _ = await query_up_names.resolve_all(list(range(12)), [], concurrency=5)
+
+    assert all(r['success'] for r in results)
+    assert peak == 5
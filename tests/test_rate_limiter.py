@@ -0,0 +1,72 @@
+"""AIMD 自适应限流器：风控时乘性减、成功时加性增，以及令牌和并发上限"""
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import make_limiter
+
+
+# 速率很低，便于逐步验证加性增、乘性减
+SLOW = dict(initial_rate=2.0, min_rate=0.25, max_rate=3.0, increase_step=0.5, max_concurrency=2)
+
+
+def test_throttle_backs_off_multiplicatively_down_to_min_rate():
+    limiter = make_limiter('test', **SLOW)
+    limiter.on_throttle()
+    assert limiter.rate == 1.0
+    limiter.on_throttle()
+    assert limiter.rate == 0.5
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 0.25
+    assert limiter.throttle_count == 4
+    assert limiter.state()['tokens'] < 1
+
+
+def test_success_recovers_additively_up_to_max_rate():
+    limiter = make_limiter('test', **SLOW)
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 0.5
+    limiter.on_success()
+    assert limiter.rate == 1.0
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.rate == 3.0
+    assert limiter.peak_rate == 3.0
+    assert limiter.success_count == 11
+
+
+@pytest.mark.asyncio
+async def test_throttle_empties_bucket_so_next_request_waits():
+    limiter = make_limiter('test', initial_rate=40.0, max_rate=40.0)
+    # 桶里有 burst 个令牌，前两个请求不用等
+    start = time.monotonic()
+    await limiter.acquire()
+    await limiter.acquire()
+    assert time.monotonic() - start < 0.02
+
+    limiter.on_throttle()  # 20/s，清空令牌
+    start = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_in_flight_requests_capped_by_max_concurrency():
+    limiter = make_limiter('test', initial_rate=1000.0, max_rate=1000.0, burst=10, max_concurrency=2)
+    active = 0
+    peak = 0
+
+    async def request():
+        nonlocal active, peak
+        async with limiter:
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*[request() for _ in range(8)])
+    assert peak == 2
@@ -0,0 +1,65 @@
+"""抓取缓存：多个进程共用缓存目录时保存不互相覆盖"""
+
+import json
+import os
+
+from response_cache import ResponseCache
+
+
+def load_index(directory):
+    with open(os.path.join(directory, 'index.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_processes_saving_in_turn_keep_each_others_entries(tmp_path):
+    directory = str(tmp_path / 'responses')
+    coordinator = ResponseCache(directory)
+    worker_a = ResponseCache(directory)
+    worker_b = ResponseCache(directory)
+
+    worker_a.store('bilibili', 'a', [1], 10)
+    worker_b.store('bilibili', 'b', [2], 10)
+    worker_a.save()
+    worker_b.save()
+    # 协调进程载入的是空索引，自己没有存任何东西，保存时不能把工作进程的条目冲掉
+    coordinator.save()
+
+    assert set(load_index(directory)) == {'a', 'b'}
+    assert ResponseCache(directory, ttls={'bilibili': 3600}).get_fresh('bilibili', 'b') == [2]
+
+
+def test_newer_entry_wins_and_removed_entries_stay_removed(tmp_path):
+    directory = str(tmp_path / 'responses')
+    first = ResponseCache(directory)
+    first.store('bilibili', 'old', [0], 10)
+    first.store('bilibili', 'shared', ['first'], 10)
+    first.save()
+
+    second = ResponseCache(directory)
+    second.store('bilibili', 'shared', ['second'], 10)
+    os.remove(second._body_path('old'))
+    assert second.revalidate('old') is None
+    second.save()
+
+    # first 仍持有旧的 shared 条目，但它之后没有改动过，保存时以较新的为准
+    first.save()
+    index = load_index(directory)
+    assert set(index) == {'shared'}
+    assert index['shared']['stored_at'] == second.index['shared']['stored_at']
+
+
+def test_eviction_applies_to_entries_from_all_processes(tmp_path):
+    directory = str(tmp_path / 'responses')
+    for name in ('a', 'b', 'c'):
+        cache = ResponseCache(directory)
+        cache.store('bilibili', name, ['x' * 100], 100)
+        cache.save()
+
+    limited = ResponseCache(directory, max_bytes=250)
+    limited.store('bilibili', 'd', ['x' * 100], 100)
+    limited.save()
+
+    index = load_index(directory)
+    assert 'd' in index
+    assert sum(entry['disk_size'] for entry in index.values()) <= 250
+    assert sorted(os.listdir(directory)) == sorted([f"{key}.json" for key in index] + ['index.json', 'index.lock'])
@@ -0,0 +1,102 @@
+"""分片任务队列：领取的原子性、接手其他分片和超时的任务、提交结果"""
+
+import threading
+
+from shard_queue import WorkQueue, partition
+
+
+def make_queue(tmp_path, count=20, shards=2):
+    queue = WorkQueue(str(tmp_path / 'queue.db'))
+    queue.reset([('bilibili', str(i), i % shards, {'since': 0}) for i in range(count)])
+    return queue
+
+
+def test_partition_is_stable():
+    channels = [('bilibili', str(i)) for i in range(100)]
+    first = partition(channels, 4)
+    assert sorted(c for items in first.values() for c in items) == sorted(channels)
+    assert partition(channels, 4) == first
+    # 增加一个分片时大部分频道不换分片
+    moved = sum(1 for shard, items in first.items() for c in items if c not in partition(channels, 5)[shard])
+    assert moved < len(channels) / 2
+
+
+def test_concurrent_claims_never_overlap(tmp_path):
+    make_queue(tmp_path, count=200).close()
+    claimed = {}
+
+    def worker(name):
+        queue = WorkQueue(str(tmp_path / 'queue.db'))
+        mine = []
+        while True:
+            tasks = queue.claim(0, name, limit=7, steal_after=0)
+            if not tasks:
+                break
+            mine.extend(cid for _, cid, _ in tasks)
+        queue.close()
+        claimed[name] = mine
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    everything = [cid for mine in claimed.values() for cid in mine]
+    assert len(everything) == len(set(everything)) == 200
+
+
+def test_claim_prefers_own_shard_and_steals_after_delay(tmp_path):
+    queue = make_queue(tmp_path, count=10)
+    # 其他分片的任务入队不够久，不能接手
+    own = queue.claim(1, 'w1', limit=100, steal_after=60)
+    assert {cid for _, cid, _ in own} == {str(i) for i in range(1, 10, 2)}
+    assert queue.claim(1, 'w1', limit=100, steal_after=60) == []
+    assert queue.pending() == 5
+
+    stolen = queue.claim(1, 'w1', limit=100, steal_after=0)
+    assert {cid for _, cid, _ in stolen} == {str(i) for i in range(0, 10, 2)}
+    assert queue.pending() == 0
+
+
+def test_stale_claims_are_reclaimed(tmp_path):
+    queue = make_queue(tmp_path, count=4, shards=1)
+    assert len(queue.claim(0, 'crashed', limit=100)) == 4
+    # 刚领取的任务不会被接手
+    assert queue.claim(0, 'w2', limit=100, stale_after=600) == []
+    assert len(queue.claim(0, 'w2', limit=100, stale_after=0)) == 4
+    assert queue.unfinished() == 4
+
+
+def test_complete_ignores_task_reclaimed_by_another_worker(tmp_path):
+    queue = make_queue(tmp_path, count=1, shards=1)
+    queue.claim(0, 'slow', limit=1)
+    queue.claim(0, 'fast', limit=1, stale_after=0)
+
+    assert queue.complete('bilibili', '0', 'fast', [{'id': 'BVfast'}], cursor={'latest': 1})
+    assert not queue.complete('bilibili', '0', 'slow', [{'id': 'BVslow'}], cursor={'latest': 2}, youtube_quota=3)
+    # 同一个任务重复提交也不会覆盖结果
+    assert not queue.complete('bilibili', '0', 'fast', None, error=('network', 'timeout'))
+
+    assert list(queue.results()) == [('bilibili', '0', [{'id': 'BVfast'}], {'latest': 1}, None, None, None)]
+    # 被接手的任务的结果作废，但已经消耗的配额照样记账
+    assert queue.youtube_quota_used() == 3
+
+
+def test_results_keep_failures_and_quota(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'))
+    queue.reset([('youtube', 'UCa', 0, {'since': 0, 'youtube_quota': 2}),
+                 ('youtube', 'UCb', 0, {'since': 0, 'youtube_quota': 1})])
+    payloads = {cid: payload for _, cid, payload in queue.claim(0, 'w0')}
+    assert payloads['UCa']['youtube_quota'] == 2
+
+    meta = {'name': '频道A', 'uploads_playlist_id': 'UUa'}
+    queue.complete('youtube', 'UCa', 'w0', [], youtube_quota=2, meta=meta, polled=1700000000)
+    queue.complete('youtube', 'UCb', 'w0', None, error=('not_found', 'gone'), youtube_quota=1)
+    queue.finish_worker('w0')
+
+    results = {cid: (videos, error, channel_meta, polled)
+               for _, cid, videos, _, error, channel_meta, polled in queue.results()}
+    assert results == {'UCa': ([], None, meta, 1700000000), 'UCb': (None, ('not_found', 'gone'), None, None)}
+    assert queue.youtube_quota_used() == 3
+    assert queue.unfinished() == 0
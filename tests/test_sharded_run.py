@@ -0,0 +1,138 @@
+"""分片模式端到端：协调进程 + 多个工作进程，用回放的平台数据
+
+同一事件循环中运行的工作进程与协调进程共用 main 的模块状态，只用来检查调度和合并；
+工作进程各自的状态如何回到协调进程（抓取缓存、频道元数据、配额）由真正启动子进程的测试检查。
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from response_cache import ResponseCache
+from shard_queue import WorkQueue
+from youtube_quota import QuotaBudget, QuotaExhausted
+
+
+def queue_ready(queue_path):
+    if not os.path.exists(queue_path):
+        return False
+    queue = WorkQueue(queue_path)
+    try:
+        return queue.unfinished() > 0
+    finally:
+        queue.close()
+
+
+async def run_with_workers(app, queue_path, shards, workers):
+    """协调进程不启动子进程，等队列建好后在本进程里运行 workers 中的分片"""
+    coordinator = asyncio.create_task(app.run_sharded(shards, spawn=False, queue_path=queue_path))
+    while not queue_ready(queue_path):
+        await asyncio.sleep(0.05)
+    await asyncio.gather(*[app.run_worker(shard, queue_path, worker_id=f"w{shard}") for shard in workers])
+    await coordinator
+
+
+def video_ids(sent):
+    return [v.id for videos in sent for v in videos]
+
+
+@pytest.mark.asyncio
+async def test_sharded_run_matches_single_process(replayed, tmp_path, monkeypatch):
+    app, sent = replayed
+    await run_with_workers(app, str(tmp_path / 'queue.db'), shards=3, workers=range(3))
+    sharded = video_ids(sent)
+    assert sharded
+    assert len(sharded) == len(set(sharded))
+
+    # 同样的数据单进程跑一次，结果应该完全一致
+    single_dir = tmp_path / 'single'
+    single_dir.mkdir()
+    monkeypatch.chdir(single_dir)
+    for name in ('memory', 'cursors', 'channel_cache', 'channel_health', 'response_cache', 'youtube_quota'):
+        monkeypatch.setattr(app, name, None)
+    sent.clear()
+    await app.main()
+    assert sorted(video_ids(sent)) == sorted(sharded)
+
+
+@pytest.mark.asyncio
+async def test_idle_worker_steals_other_shards(replayed, tmp_path, monkeypatch):
+    app, sent = replayed
+    monkeypatch.setattr(app, 'SHARD_STEAL_AFTER', 0)
+    queue_path = str(tmp_path / 'queue.db')
+    # 只有分片 0 的工作进程在跑，其他分片的任务也要被它做完
+    await run_with_workers(app, queue_path, shards=3, workers=[0])
+
+    queue = WorkQueue(queue_path)
+    rows = queue.conn.execute("SELECT DISTINCT worker, status FROM tasks").fetchall()
+    assert rows == [('w0', 'done')]
+    assert len(list(queue.results())) == len(app.all_channels())
+    assert video_ids(sent)
+    # 第二次运行：历史记录已提交，不会再次通知同样的视频
+    sent.clear()
+    await run_with_workers(app, queue_path, shards=3, workers=[0])
+    assert video_ids(sent) == []
+
+
+def test_youtube_shares_fit_remaining_quota(fresh_state, monkeypatch):
+    app = fresh_state
+    app.init_state()
+    app.youtube_quota = QuotaBudget(daily_limit=10, reserve=2)
+    channels = [f"UC{i:022d}" for i in range(10)]
+    app.channel_cache.put('youtube', channels[0], name='cached', avatar=None, uploads_playlist_id='UU0')
+
+    shares = app.plan_youtube_shares(channels)
+    assert sum(shares.values()) <= app.youtube_quota.remaining
+    assert shares[channels[0]] == 1  # 元数据已缓存，只需要一次 playlistItems().list
+    assert all(units == 2 for cid, units in shares.items() if cid != channels[0])
+
+
+def test_worker_budget_is_limited_to_granted_shares(fresh_state):
+    budget = QuotaBudget(daily_limit=10000, allowance=0)
+    assert budget.remaining == 0
+    budget.grant(2)
+    with budget.track() as spend:
+        budget.charge('channels.list')
+        budget.charge('playlistItems.list')
+    assert spend['used'] == 2
+    with pytest.raises(QuotaExhausted):
+        budget.charge('playlistItems.list')
+
+
+@pytest.mark.asyncio
+async def test_spawned_workers_hand_state_back(replayed, replay_store, tmp_path, monkeypatch):
+    app, sent = replayed
+    # 工作进程是真正的 python main.py --worker 子进程，通过 REPLAY_FIXTURES 回放同一份夹具；
+    # YouTube 走 API，才会查询频道元数据、消耗配额
+    monkeypatch.setenv('REPLAY_FIXTURES', replay_store.directory)
+    monkeypatch.setenv('YOUTUBE_USE_FEED', '0')
+    monkeypatch.setenv('YOUTUBE_API_KEY', 'replay')
+    monkeypatch.setattr(app, 'YOUTUBE_USE_FEED', False)
+
+    await app.run_sharded(2, spawn=True, queue_path=str(tmp_path / 'queue.db'))
+
+    ids = video_ids(sent)
+    assert len(ids) == len(set(ids))
+    assert {v.platform for videos in sent for v in videos} == {'bilibili', 'youtube'}
+
+    # 各工作进程写入的抓取缓存都在 index.json 里，协调进程没有用旧的索引覆盖
+    with open(os.path.join(app.RESPONSE_CACHE_DIR, 'index.json'), encoding='utf-8') as f:
+        index = json.load(f)
+    for uid in app.TARGET_UIDS:
+        assert ResponseCache.make_key('bilibili', uid, 1, app.BILIBILI_PAGE_SIZE) in index
+    for channel_id in app.YOUTUBE_CHANNELS:
+        assert ResponseCache.make_key('youtube', 'UU' + channel_id[2:]) in index
+
+    # 工作进程查到的频道元数据和轮询时间由协调进程保存，下次运行不用再花配额查询
+    with open('channel_cache.json', encoding='utf-8') as f:
+        channels = json.load(f)['youtube']
+    assert {cid: meta['uploads_playlist_id'] for cid, meta in channels.items()} == {
+        cid: 'UU' + cid[2:] for cid in app.YOUTUBE_CHANNELS
+    }
+    with open('youtube_quota.json', encoding='utf-8') as f:
+        quota = json.load(f)
+    assert set(quota['last_polled']) == set(app.YOUTUBE_CHANNELS)
+    # 每个频道一次 channels().list 加一次 playlistItems().list
+    assert quota['used'] == 2 * len(app.YOUTUBE_CHANNELS)
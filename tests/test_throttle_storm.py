@@ -0,0 +1,60 @@
+"""回放 -352 风控风暴：风暴期间限流器降速，风暴过后恢复"""
+
+import itertools
+import time
+
+import pytest
+
+from channel_health import THROTTLED
+from conftest import make_limiter
+from replay import FaultProfile, install_replayer
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('storm_rate', [0.02, 0.1, 0.3])
+async def test_limiter_backs_off_during_storm_and_recovers(replayed, replay_store, monkeypatch, storm_rate):
+    app, _ = replayed
+    app.init_state()
+    faults = FaultProfile(storm_rate=storm_rate, storm_duration=0.3, seed=11)
+    replayer = install_replayer(app, replay_store, faults)
+    # 每次都真正请求，不走抓取缓存
+    monkeypatch.setattr(app.response_cache, 'ttls', {})
+    limiter = make_limiter(initial_rate=40.0, min_rate=5.0, max_rate=40.0, increase_step=5.0, burst=1)
+    uids = itertools.cycle(replayer.synthetic_uids(6))
+
+    # 风暴之前：请求都成功，保持最高速率
+    for _ in range(2000):
+        uid = next(uids)
+        videos = await app.fetch_videos_from_up(uid, limiter)
+        if faults.injected['storms']:
+            break
+        assert videos
+        assert limiter.rate == 40.0
+    assert faults.injected['storms'] == 1
+    # 只测一次风暴，之后不再触发
+    faults.storm_rate = 0.0
+
+    # 风暴期间：重试也都被风控，限流器乘性降到下限
+    assert videos is None
+    assert app.channel_health.take_error('bilibili', uid)[0] == THROTTLED
+    assert limiter.rate == limiter.min_rate
+    while time.monotonic() < faults.storm_until:
+        throttled = faults.injected['throttled']
+        videos = await app.fetch_videos_from_up(next(uids), limiter)
+        if faults.injected['throttled'] == throttled:
+            break  # 等令牌的时候风暴结束了
+        assert videos is None
+        assert limiter.rate == limiter.min_rate
+    throttled = faults.injected['throttled']
+    assert limiter.throttle_count == throttled >= 3
+    assert app.metrics.totals()['throttled'] == throttled
+
+    # 风暴过后：请求恢复成功，速率加性回到上限
+    succeeded = limiter.success_count
+    for _ in range(20):
+        assert await app.fetch_videos_from_up(next(uids), limiter)
+        if limiter.rate == limiter.max_rate:
+            break
+    assert limiter.rate == limiter.max_rate
+    assert limiter.success_count - succeeded <= (limiter.max_rate - limiter.min_rate) / limiter.increase_step
+    assert faults.injected['throttled'] == throttled
@@ -0,0 +1,141 @@
+"""YouTube 订阅源抓取：用 aiohttp 测试服务器模拟 200 / 304 / 429 / 5xx"""
+
+import contextlib
+import datetime
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import youtube_feed
+from conftest import make_limiter
+from response_cache import ResponseCache
+from youtube_feed import YoutubeFeedFetcher
+
+CHANNEL = 'UCtest000000000000000000'
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/"
+      xmlns="http://www.w3.org/2005/Atom">
+  <title>测试频道</title>
+  <entry>
+    <yt:videoId>vid00000001</yt:videoId>
+    <title>第一个视频</title>
+    <author><name>测试频道</name></author>
+    <published>2026-10-16T12:00:00+00:00</published>
+    <media:group><media:description>简介一</media:description></media:group>
+  </entry>
+  <entry>
+    <yt:videoId>vid00000002</yt:videoId>
+    <title>第二个视频</title>
+    <author><name>测试频道</name></author>
+    <published>2026-10-15T08:30:00+00:00</published>
+    <media:group><media:description>简介二</media:description></media:group>
+  </entry>
+</feed>
+"""
+
+
+@contextlib.asynccontextmanager
+async def feed_server(monkeypatch, responses):
+    """按顺序返回 responses 中的状态码；200 带 ETag，带着匹配的 If-None-Match 请求时返回 304
+
+    产出收到的请求头列表。
+    """
+    requests = []
+
+    async def handler(request):
+        requests.append(dict(request.headers))
+        assert request.query['channel_id'] == CHANNEL
+        status = responses.pop(0)
+        if status == 200:
+            return web.Response(body=FEED.encode('utf-8'), content_type='application/atom+xml',
+                                headers={'ETag': '"v1"'})
+        if status == 304:
+            assert request.headers.get('If-None-Match') == '"v1"'
+            return web.Response(status=304)
+        return web.Response(status=status)
+
+    app = web.Application()
+    app.router.add_get('/feeds/videos.xml', handler)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(youtube_feed, 'FEED_URL', str(server.make_url('/feeds/videos.xml')))
+    try:
+        yield requests
+    finally:
+        await server.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # TTL 为 0：每次都要请求，过期的缓存只用于条件请求
+    return ResponseCache(str(tmp_path / 'responses'), ttls={'youtube_feed': 0})
+
+
+@pytest.mark.asyncio
+async def test_parses_feed(monkeypatch, cache):
+    limiter = make_limiter('youtube', burst=5)
+    async with feed_server(monkeypatch, [200]) as requests:
+        async with YoutubeFeedFetcher(limiter, cache) as fetcher:
+            videos = await fetcher.fetch(CHANNEL)
+
+    assert [v.id for v in videos] == ['vid00000001', 'vid00000002']
+    first = videos[0]
+    assert (first.platform, first.channel, first.author) == ('youtube', CHANNEL, '测试频道')
+    assert (first.title, first.desc) == ('第一个视频', '简介一')
+    assert first.created == int(datetime.datetime(2026, 10, 16, 12, tzinfo=datetime.timezone.utc).timestamp())
+    assert fetcher.downloaded_bytes == len(FEED.encode('utf-8'))
+    assert 'If-None-Match' not in requests[0]
+    assert limiter.success_count == 1
+
+
+@pytest.mark.asyncio
+async def test_revalidates_with_etag(monkeypatch, cache):
+    limiter = make_limiter('youtube', burst=5)
+    async with feed_server(monkeypatch, [200, 304]) as requests:
+        async with YoutubeFeedFetcher(limiter, cache) as fetcher:
+            first = await fetcher.fetch(CHANNEL)
+            second = await fetcher.fetch(CHANNEL)
+
+    assert requests[1]['If-None-Match'] == '"v1"'
+    assert [v.to_dict() for v in second] == [v.to_dict() for v in first]
+    assert cache.revalidated == 1
+    # 304 没有响应体，只有第一次下载了订阅源
+    assert fetcher.downloaded_bytes == len(FEED.encode('utf-8'))
+    assert limiter.success_count == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('status', [429, 500, 503])
+async def test_throttled_or_server_error_returns_none_and_keeps_cache(monkeypatch, cache, status):
+    limiter = make_limiter('youtube', burst=5)
+    async with feed_server(monkeypatch, [200, status, 304]) as requests:
+        async with YoutubeFeedFetcher(limiter, cache) as fetcher:
+            first = await fetcher.fetch(CHANNEL)
+            key = cache.make_key('youtube_feed', CHANNEL)
+            entry = dict(cache.index[key])
+
+            assert await fetcher.fetch(CHANNEL) is None
+            assert limiter.throttle_count == 1
+            # 失败的响应不能覆盖缓存：仍然是第一次的结果和 ETag
+            assert cache.index[key]['etag'] == entry['etag'] == '"v1"'
+            assert cache.index[key]['stored_at'] == entry['stored_at']
+
+            third = await fetcher.fetch(CHANNEL)
+
+    assert requests[2]['If-None-Match'] == '"v1"'
+    assert [v.id for v in third] == [v.id for v in first]
+
+
+@pytest.mark.asyncio
+async def test_error_without_cache_stores_nothing(monkeypatch, cache):
+    limiter = make_limiter('youtube', burst=5)
+    async with feed_server(monkeypatch, [503, 200]) as requests:
+        async with YoutubeFeedFetcher(limiter, cache) as fetcher:
+            assert await fetcher.fetch(CHANNEL) is None
+            assert cache.index == {}
+            videos = await fetcher.fetch(CHANNEL)
+
+    assert 'If-None-Match' not in requests[1]
+    assert len(videos) == 2
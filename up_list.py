@@ -73,3 +73,17 @@ KEYWORDS = [
     "工作流",
     "模型",
 ]
+
+# 排除关键词（命中任意一个即不推送，优先级高于 KEYWORDS）
+NEGATIVE_KEYWORDS = [
+]
+
+# 按UP主/频道追加的关键词：{UID或Channel ID: [关键词, ...]}
+# 在 KEYWORDS 之外额外生效；以 "-" 开头的为该UP主/频道的排除关键词
+CHANNEL_KEYWORDS = {
+}
+
+# 其他数据源（通过 entry point 注册的 SourceAdapter 插件，见 sources.py）要监控的频道
+# 格式：{平台名: [频道ID, ...]}，例如 {'douyin': ['MS4wLjABAAAA...']}
+EXTRA_SOURCE_CHANNELS = {
+}
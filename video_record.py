@@ -0,0 +1,101 @@
+"""
+视频记录
+两个平台的抓取结果在抓取层就转换成统一的 VideoRecord，原始接口数据（B站 vlist 条目的几十个字段、
+YouTube API 响应等）随即丢弃，之后的去重、过滤、渲染、汇总都只处理这一种结构，不再按平台分支取字段。
+
+VideoRecord 使用 __slots__，没有实例 __dict__；同一个UP主/频道的作者名共用一个字符串 (sys.intern)。
+10 万条记录的内存对比见 benchmarks/bench_records.py。
+"""
+
+import sys
+import datetime
+
+# 各平台的视频链接
+VIDEO_URLS = {
+    'bilibili': "https://www.bilibili.com/video/{}",
+    'youtube': "https://www.youtube.com/watch?v={}",
+}
+
+
+def parse_published(value):
+    """YouTube 的 ISO 8601 发布时间（如 2024-01-01T00:00:00Z）转时间戳"""
+    return int(datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+
+
+class VideoRecord:
+    """一个视频
+
+    - id: B站为 bvid，YouTube 为 video_id
+    - platform: 'bilibili' / 'youtube'
+    - channel: B站为 UP主 UID (int)，YouTube 为频道 ID
+    - created: 发布时间戳
+    - matched_keywords: 过滤时命中的关键词，用于在通知中展示
+    """
+
+    __slots__ = ('id', 'platform', 'channel', 'author', 'title', 'desc', 'created', 'matched_keywords')
+
+    def __init__(self, id, platform, channel, author, title, desc, created, matched_keywords=()):
+        self.id = id
+        self.platform = platform
+        self.channel = channel
+        self.author = sys.intern(author or '')
+        self.title = title or ''
+        self.desc = desc or ''
+        self.created = int(created)
+        self.matched_keywords = matched_keywords
+
+    @property
+    def url(self):
+        return VIDEO_URLS[self.platform].format(self.id)
+
+    @classmethod
+    def from_bilibili(cls, entry, uid):
+        """B站投稿列表 (list.vlist) 中的一条"""
+        return cls(entry['bvid'], 'bilibili', uid, entry.get('author'), entry.get('title'),
+                   entry.get('description'), entry['created'])
+
+    @classmethod
+    def from_youtube(cls, video_id, channel_id, author, title, desc, published):
+        """YouTube API / 订阅源中的一条，published 为 ISO 8601 时间"""
+        return cls(video_id, 'youtube', channel_id, author, title, desc, parse_published(published))
+
+    def to_dict(self):
+        """用于 JSON 持久化（抓取缓存、汇总队列、分片任务结果）"""
+        data = {
+            'id': self.id,
+            'platform': self.platform,
+            'channel': self.channel,
+            'author': self.author,
+            'title': self.title,
+            'desc': self.desc,
+            'created': self.created,
+        }
+        if self.matched_keywords:
+            data['matched_keywords'] = list(self.matched_keywords)
+        return data
+
+    @classmethod
+    def from_dict(cls, data, platform='bilibili', channel=None):
+        """to_dict() 的逆操作
+
+        也兼容旧版本保存的原始字典（抓取缓存中的 B站 vlist 条目、汇总队列中的视频字典），
+        这些字典没有 platform / channel 时使用传入的默认值。
+        """
+        if 'id' in data:
+            return cls(data['id'], data['platform'], data['channel'], data.get('author'), data.get('title'),
+                       data.get('desc'), data['created'], tuple(data.get('matched_keywords', ())))
+        platform = data.get('platform', platform)
+        video_id = data['video_id'] if platform == 'youtube' else data['bvid']
+        return cls(video_id, platform, data.get('channel_id', channel), data.get('author'), data.get('title'),
+                   data.get('description'), data['created'], tuple(data.get('matched_keywords') or ()))
+
+    def __eq__(self, other):
+        if not isinstance(other, VideoRecord):
+            return NotImplemented
+        return (self.platform, self.id) == (other.platform, other.id)
+
+    def __hash__(self):
+        return hash((self.platform, self.id))
+
+    def __repr__(self):
+        return f"VideoRecord({self.platform}:{self.id}, {self.title!r})"
@@ -0,0 +1,131 @@
+"""
+YouTube 频道 RSS/Atom 订阅源抓取
+每个频道的公开订阅源 https://www.youtube.com/feeds/videos.xml?channel_id=UCxxx 包含最近 15 个视频的
+标题、简介和发布时间，不消耗 API 配额。
+
+- 共用一个 aiohttp 会话（连接池复用 TCP/TLS 连接）
+- 结果缓存 (ResponseCache)：TTL 内直接复用解析结果；过期后用 ETag / Last-Modified 做条件请求，
+  订阅源未变化时服务器返回 304，沿用缓存结果，不需要下载和解析
+- 边下载边解析：XMLPullParser 按块喂入数据，每解析完一个 <entry> 就释放
+"""
+
+import contextlib
+import xml.etree.ElementTree as ET
+
+import aiohttp
+
+from video_record import VideoRecord
+
+FEED_URL = "https://www.youtube.com/feeds/videos.xml"
+_ATOM = '{http://www.w3.org/2005/Atom}'
+_YT = '{http://www.youtube.com/xml/schemas/2015}'
+_MEDIA = '{http://search.yahoo.com/mrss/}'
+
+
+def parse_entry(entry, channel_id):
+    """把一个 Atom <entry> 转成 VideoRecord（与 API 路径相同）"""
+    return VideoRecord.from_youtube(
+        entry.findtext(f'{_YT}videoId'),
+        channel_id,
+        entry.findtext(f'{_ATOM}author/{_ATOM}name', ''),
+        entry.findtext(f'{_ATOM}title', ''),
+        entry.findtext(f'{_MEDIA}group/{_MEDIA}description', ''),
+        entry.findtext(f'{_ATOM}published'),
+    )
+
+
+class YoutubeFeedFetcher:
+    """基于订阅源的 YouTube 抓取器，用作 async with 上下文管理共享会话
+
+    fetch() 返回 VideoRecord 列表；抓取失败返回 None，调用方应回退到 API 路径
+    """
+
+    def __init__(self, limiter, cache, pool_size=8, timeout=20, metrics=None):
+        self.limiter = limiter
+        self.cache = cache
+        self.metrics = metrics
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = None
+        self.downloaded_bytes = 0
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        return False
+
+    def _inc(self, channel_id, field, value=1):
+        if self.metrics is not None:
+            self.metrics.inc('youtube', channel_id, field, value)
+
+    def _request_timer(self, channel_id):
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.request('youtube', channel_id)
+
+    @staticmethod
+    def _records(cached, channel_id):
+        return [VideoRecord.from_dict(v, platform='youtube', channel=channel_id) for v in cached]
+
+    async def fetch(self, channel_id):
+        key = self.cache.make_key('youtube_feed', channel_id)
+        cached = self.cache.get_fresh('youtube_feed', key)
+        if cached is not None:
+            self._inc(channel_id, 'cache_hits')
+            return self._records(cached, channel_id)
+        try:
+            async with self.limiter:
+                with self._request_timer(channel_id):
+                    async with self.session.get(
+                        FEED_URL,
+                        params={'channel_id': channel_id},
+                        headers=self.cache.validators(key),
+                    ) as resp:
+                        if resp.status == 304:
+                            cached = self.cache.revalidate(key)
+                            if cached is not None:
+                                self._inc(channel_id, 'cache_hits')
+                                self.limiter.on_success()
+                                return self._records(cached, channel_id)
+                            print(f"⚠️  YouTube 订阅源 {channel_id} 返回 304 但本地缓存已丢失")
+                            return None
+                        if resp.status == 429 or resp.status >= 500:
+                            self._inc(channel_id, 'throttled')
+                            self.limiter.on_throttle()
+                            print(f"⚠️  YouTube 订阅源 {channel_id} 返回 HTTP {resp.status}")
+                            return None
+                        if resp.status != 200:
+                            print(f"⚠️  YouTube 订阅源 {channel_id} 返回 HTTP {resp.status}")
+                            return None
+
+                        parser = ET.XMLPullParser(events=('end',))
+                        videos = []
+                        size = 0
+                        async for chunk in resp.content.iter_chunked(16 * 1024):
+                            size += len(chunk)
+                            parser.feed(chunk)
+                            for _, elem in parser.read_events():
+                                if elem.tag == f'{_ATOM}entry':
+                                    videos.append(parse_entry(elem, channel_id))
+                                    elem.clear()
+                        parser.close()
+                        self.downloaded_bytes += size
+                        self._inc(channel_id, 'bytes', size)
+
+                        self.cache.store(
+                            'youtube_feed', key, [v.to_dict() for v in videos], size,
+                            etag=resp.headers.get('ETag'),
+                            last_modified=resp.headers.get('Last-Modified'),
+                        )
+            self.limiter.on_success()
+            return videos
+        except Exception as e:
+            print(f"⚠️  YouTube 订阅源 {channel_id} 抓取失败: {e}")
+            return None
@@ -0,0 +1,172 @@
+"""
+YouTube API 配额管理
+按每种 API 调用的单位成本记账，按太平洋时间的自然日持久化累计用量（与 YouTube 配额重置时间一致），
+运行前根据剩余配额和各频道的发布频率规划本次要轮询的频道，避免运行中途才遇到 quotaExceeded。
+"""
+
+import os
+import json
+import math
+import time
+import datetime
+import contextlib
+import contextvars
+
+# 我们用到的 API 调用的配额成本（单位）
+# 参考：https://developers.google.com/youtube/v3/determine_quota_cost
+API_COSTS = {
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'videos.list': 1,
+    'search.list': 100,
+}
+
+DEFAULT_DAILY_QUOTA = 10000
+DAY = 24 * 3600
+
+# track() 的计数器：asyncio 任务和 asyncio.to_thread 都会复制上下文，并发抓取的各频道互不干扰
+_tracked_spend = contextvars.ContextVar('youtube_quota_spend', default=None)
+
+
+def quota_day(ts=None):
+    """配额按太平洋时间午夜重置，这里与 get_time_config 一样按 UTC-8 计算"""
+    utc = datetime.datetime.utcfromtimestamp(ts if ts is not None else time.time())
+    return (utc - datetime.timedelta(hours=8)).strftime('%Y-%m-%d')
+
+
+def posts_per_day(posts):
+    """根据最近的发布时间估算每天发布数；记录不足两条时返回 None（未知）"""
+    if len(posts) < 2:
+        return None
+    span = max(posts) - min(posts)
+    return (len(posts) - 1) / max(span / DAY, 1 / 24)
+
+
+class QuotaExhausted(Exception):
+    """本地记账判断剩余配额不足以完成调用"""
+
+
+class QuotaBudget:
+    """YouTube 配额记账
+
+    状态文件结构：{"day": "2026-01-01", "used": 123, "exhausted": false, "last_polled": {"UCxxx": 1700000000}}
+    allowance: 分片模式的工作进程只能使用协调进程分配的份额（grant() 累加），为 None 时不限制
+    """
+
+    def __init__(self, file_path="youtube_quota.json", daily_limit=DEFAULT_DAILY_QUOTA, reserve=0, allowance=None):
+        self.file_path = file_path
+        self.daily_limit = daily_limit
+        self.reserve = reserve
+        self.allowance = allowance
+        self.state = self._load()
+        self.run_used = 0
+        self.run_calls = {}
+        self._roll_day()
+
+    def _load(self):
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+
+    def _roll_day(self):
+        today = quota_day()
+        if self.state.get('day') != today:
+            self.state['day'] = today
+            self.state['used'] = 0
+            self.state['exhausted'] = False
+        self.state.setdefault('last_polled', {})
+
+    @property
+    def used(self):
+        return self.state['used']
+
+    @property
+    def remaining(self):
+        if self.state['exhausted']:
+            return 0
+        remaining = max(0, self.daily_limit - self.reserve - self.state['used'])
+        if self.allowance is not None:
+            remaining = min(remaining, max(0, self.allowance - self.run_used))
+        return remaining
+
+    def can_afford(self, call, times=1):
+        return API_COSTS[call] * times <= self.remaining
+
+    def charge(self, call, times=1):
+        """记录一次（或多次）API 调用；剩余配额不足时抛出 QuotaExhausted，调用方应放弃这次请求"""
+        self._roll_day()
+        if not self.can_afford(call, times):
+            raise QuotaExhausted(f"YouTube 配额不足：{call} 需要 {API_COSTS[call] * times} 单位，剩余 {self.remaining}")
+        cost = API_COSTS[call] * times
+        self.state['used'] += cost
+        self.run_used += cost
+        self.run_calls[call] = self.run_calls.get(call, 0) + times
+        spend = _tracked_spend.get()
+        if spend is not None:
+            spend['used'] += cost
+
+    def grant(self, units):
+        """分片工作进程：领取到任务时加上协调进程分配给该任务的份额"""
+        self.allowance = (self.allowance or 0) + units
+
+    @contextlib.contextmanager
+    def track(self):
+        """统计 with 块内（当前 asyncio 任务及其 to_thread 线程）消耗的单位：产出 {'used': n}"""
+        spend = {'used': 0}
+        token = _tracked_spend.set(spend)
+        try:
+            yield spend
+        finally:
+            _tracked_spend.reset(token)
+
+    def record_used(self, units):
+        """记入其他进程（分片模式的工作进程）已消耗的配额"""
+        self._roll_day()
+        self.state['used'] += units
+        self.run_used += units
+
+    def mark_exhausted(self):
+        """API 返回 quotaExceeded：今天不再发起请求"""
+        self.state['exhausted'] = True
+
+    def mark_polled(self, channel_id, ts=None):
+        self.state['last_polled'][channel_id] = int(ts if ts is not None else time.time())
+
+    def plan(self, channel_ids, cost_per_channel, posts_lookup, fixed_cost=0, now=None):
+        """规划本次要轮询的频道
+
+        - cost_per_channel: 每个频道预计消耗的单位（含重试余量）
+        - posts_lookup(channel_id): 返回该频道最近的发布时间列表
+        - fixed_cost: 与频道数无关的固定开销（如批量查询频道元数据）
+        优先级 = 预计的未见新视频数 = 发布频率 × 距上次轮询的时间；没有历史的频道优先。
+        返回 (本次轮询的频道, 因配额不足跳过的频道)
+        """
+        now = now if now is not None else time.time()
+        affordable = (self.remaining - fixed_cost) // cost_per_channel if cost_per_channel else len(channel_ids)
+        affordable = max(0, int(affordable))
+        if affordable >= len(channel_ids):
+            return list(channel_ids), []
+
+        def priority(channel_id):
+            rate = posts_per_day(posts_lookup(channel_id))
+            last = self.state['last_polled'].get(channel_id)
+            if rate is None or last is None:
+                return math.inf
+            return rate * (now - last) / DAY
+
+        ranked = sorted(channel_ids, key=priority, reverse=True)
+        return ranked[:affordable], ranked[affordable:]
+
+    def report(self):
+        calls = ', '.join(f"{call} x{n}" for call, n in sorted(self.run_calls.items())) or "无调用"
+        status = "（已耗尽）" if self.state['exhausted'] else ""
+        print(f"YouTube 配额：本次消耗 {self.run_used} 单位（{calls}），"
+              f"今日({self.state['day']} PT)已用 {self.used}/{self.daily_limit}{status}")
+
+    def save(self):
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)